@@ -1,13 +1,11 @@
 """Base script for downloading Minecraft language files."""
 
-import json
 import sys
 import tomllib as tl
 from datetime import datetime
+from functools import cache
 from pathlib import Path
 
-import requests as r
-
 # The absolute path of the script's directory.
 SCRIPT_DIR = Path(__file__).resolve().parent
 
@@ -22,55 +20,122 @@ if not CONFIG_PATH.exists():
 with open(CONFIG_PATH, "rb") as f:
     config = tl.load(f)
 
-MINECRAFT_VERSION: str = config["version"]
+# The configured version, which may be "latest". Use `get_version_info()["id"]`
+# or the lazily resolved `MINECRAFT_VERSION` for the actual version ID.
+CONFIGURED_VERSION: str = config["version"]
 VERSIONS_DIR = SCRIPT_DIR / config["version_folder"]
 OUTPUT_DIR = SCRIPT_DIR / config["output_folder"]
+LEGACY_VERSIONS_DIR = SCRIPT_DIR / config["legacy_assets_output_folder"]
+OBJECTS_DIR = SCRIPT_DIR / config["object_folder"]
+HISTORY_PATH = SCRIPT_DIR / config["history_file"]
 REMOVE_CLIENT_JAR: bool = config["remove_client"]
 LANGUAGE_LIST: list[str] = config["language_list"]
+MAX_CONCURRENT_DOWNLOADS: int = config["max_concurrent_downloads"]
+HTTP_POOL_SIZE: int = config["http_pool_size"]
+MANIFEST_TTL: int = config["manifest_ttl"]
+USE_SNAPSHOT: bool = config["use_snapshot"]
+METRICS_FILE = SCRIPT_DIR / config["metrics_file"] if config["metrics_file"] else None
 
-VERSIONS_DIR.mkdir(exist_ok=True)
+# Client manifests and asset indexes are cached here, separately from the versions.
+MANIFEST_CACHE_DIR = VERSIONS_DIR / "manifests"
 
-version_manifest_path = VERSIONS_DIR / "version_manifest_v2.json"
-try:
-    print("Fetching version manifest 'version_manifest_v2.json'...\n")
-    manifest_response = r.get(
-        "https://piston-meta.mojang.com/mc/game/version_manifest_v2.json",
-        timeout=60,
-    )
-    manifest_response.raise_for_status()
-    version_manifest_json = manifest_response.json()
-    with open(version_manifest_path, "wb") as f:
-        f.write(manifest_response.content)
-except r.exceptions.RequestException:
-    if version_manifest_path.exists():
-        print("Failed to fetch version manifest. Using the existing local copy.\n")
-        with open(version_manifest_path, encoding="utf-8") as f:
-            version_manifest_json = json.load(f)
-    else:
+# The first version that uses the JSON format for language files.
+RELEASE_TIME_18W02A = datetime.fromisoformat("2018-01-10T11:54:55+00:00")
+
+
+@cache
+def get_version_manifest() -> dict:
+    """Load the version manifest, fetching it only if the cached copy is stale.
+
+    Returns:
+        dict: The version manifest.
+
+    """
+    # Imported here so that modules which only need the configuration do not pull in requests.
+    from downloader import VERSION_MANIFEST_URL, fetch_json
+
+    VERSIONS_DIR.mkdir(exist_ok=True)
+    version_manifest_path = VERSIONS_DIR / "version_manifest_v2.json"
+    print("Loading version manifest 'version_manifest_v2.json'...\n")
+    version_manifest_json = fetch_json(VERSION_MANIFEST_URL, version_manifest_path, MANIFEST_TTL)
+    if version_manifest_json is None:
         print("Failed to fetch version manifest and no local copy is available.")
         print("Please check your internet connection or provide a valid manifest file.")
         sys.exit()
+    return version_manifest_json
 
-if MINECRAFT_VERSION == "latest":
-    MINECRAFT_VERSION = version_manifest_json["latest"]["snapshot"]
 
-version_info: dict = next(
-    (v for v in version_manifest_json["versions"] if v["id"] == MINECRAFT_VERSION), {}
-)
+@cache
+def get_version_info(version: str = CONFIGURED_VERSION) -> dict:
+    """Look up a version in the version manifest.
 
-if not version_info:
-    print("The specified version could not be found in the version manifest.")
-    print("Please ensure the version number is correct.")
-    sys.exit()
+    Args:
+        version (str): The version ID, or "latest" for the newest snapshot.
 
-LANG_DIR = VERSIONS_DIR / MINECRAFT_VERSION
-print(f"Selected version: {MINECRAFT_VERSION}\n")
+    Returns:
+        dict: The manifest entry of the version.
 
-# Check if the selected version is 18w02a or newer, which uses JSON format.
-release_time_18w02a = datetime.fromisoformat("2018-01-10T11:54:55+00:00")
-release_time_chosen_version = datetime.fromisoformat(version_info["releaseTime"])
+    """
+    version_manifest_json = get_version_manifest()
+    if version == "latest":
+        version = version_manifest_json["latest"]["snapshot"]
 
-if release_time_18w02a > release_time_chosen_version:
-    print("Selected version uses the legacy .lang format for language files.")
-    print("Please choose version 18w02a or newer.")
-    sys.exit()
+    version_info: dict = next(
+        (v for v in version_manifest_json["versions"] if v["id"] == version), {}
+    )
+
+    if not version_info:
+        print("The specified version could not be found in the version manifest.")
+        print("Please ensure the version number is correct.")
+        sys.exit()
+
+    print(f"Selected version: {version}\n")
+    return version_info
+
+
+def is_legacy_version(version_info: dict) -> bool:
+    """Check whether a version predates 18w02a and uses .lang language files.
+
+    Args:
+        version_info (dict): The manifest entry of the version.
+
+    Returns:
+        bool: True if the version uses the legacy .lang format.
+
+    """
+    return RELEASE_TIME_18W02A > datetime.fromisoformat(version_info["releaseTime"])
+
+
+def get_lang_dir(version: str = CONFIGURED_VERSION) -> Path:
+    """Return the directory holding the language files of a version.
+
+    Legacy versions are looked up in the folder download_legacy.py writes them
+    to, which may be named after the minor version, such as "1.8" for 1.8.9.
+
+    Args:
+        version (str): The version ID, or "latest" for the newest snapshot.
+
+    Returns:
+        Path: The language file directory.
+
+    """
+    version_info = get_version_info(version)
+    version_id = version_info["id"]
+    if not is_legacy_version(version_info):
+        return VERSIONS_DIR / version_id
+    # Imported here so that modules which only need the configuration do not pull in requests.
+    from download_legacy import TARGET_VERSIONS
+
+    folder = next((name for name, vid in TARGET_VERSIONS.items() if vid == version_id), version_id)
+    return LEGACY_VERSIONS_DIR / folder
+
+
+def __getattr__(name: str):
+    """Resolve the selected version lazily, so importing this module does no I/O."""
+    if name == "version_info":
+        return get_version_info()
+    if name == "MINECRAFT_VERSION":
+        return get_version_info()["id"]
+    if name == "LANG_DIR":
+        return get_lang_dir()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
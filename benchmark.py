@@ -0,0 +1,916 @@
+"""Benchmarks for the translation tools.
+
+Every benchmark runs offline. Unless a language directory is given, synthetic
+language files shaped like the real ones are generated in a temporary directory.
+Downloads are served by the local stand-in in fake_mojang.py. Results can
+be saved as JSON and compared with an earlier run, for instance of another commit.
+"""
+
+import argparse
+import http.client
+import io
+import json
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable
+from contextlib import redirect_stdout
+from datetime import UTC, datetime
+from pathlib import Path
+from urllib.parse import urlencode
+
+from base import LANGUAGE_LIST, SCRIPT_DIR
+from changelog import diff_version_dirs, file_sha1, filter_delta
+from compact import load_compact_store
+from downloader import (
+    DownloadTask,
+    ObjectStore,
+    asset_url,
+    configure_http,
+    download_files,
+    fetch_json,
+)
+from extract import LINE_ESCAPES, classify_keys, filter_translations, is_valid_key
+from fake_mojang import FakeMojangServer
+from history import VersionDelta
+from init import (
+    TranslationStore,
+    find_language_file,
+    load_language_file,
+    load_language_files,
+    version_dirs,
+)
+from query import find_keys_by_source_string, find_keys_by_translation, run_batch
+from search import TranslationIndex
+from server import QueryServer, QueryService
+from snapshot import build_snapshot, open_snapshot
+
+# Key prefixes used to generate synthetic localization keys.
+SYNTHETIC_PREFIXES: tuple[str, ...] = (
+    "block.minecraft.",
+    "item.minecraft.",
+    "entity.minecraft.",
+    "biome.minecraft.",
+    "effect.minecraft.",
+    "enchantment.minecraft.",
+    "advancements.story.",
+    "gui.",
+    "options.",
+    "commands.",
+)
+
+# The number of concurrent downloads in the download benchmark.
+DOWNLOAD_WORKERS = 8
+
+# The number of concurrent clients and requests per client in the server load test.
+LOAD_TEST_CLIENTS = 8
+LOAD_TEST_REQUESTS = 250
+
+# Character ranges used to generate synthetic values for CJK languages.
+CJK_RANGES: dict[str, tuple[int, int]] = {
+    "zh": (0x4E00, 0x9FFF),
+    "lzh": (0x4E00, 0x9FFF),
+    "ja": (0x3041, 0x30FF),
+    "ko": (0xAC00, 0xD7A3),
+}
+
+
+def generate_language_files(
+    lang_dir: Path, lang_list: list[str], key_count: int, seed: int = 0
+) -> None:
+    """Write synthetic language files with the same keys in every language.
+
+    Args:
+        lang_dir (Path): The directory to write the files to.
+        lang_list (list[str]): The language codes to generate.
+        key_count (int): The number of keys in each file.
+        seed (int): The random seed, so runs are reproducible.
+
+    """
+    rng = random.Random(seed)
+    keys = [
+        f"{rng.choice(SYNTHETIC_PREFIXES)}{rng.randbytes(6).hex()}{'.title' * (i % 7 == 0)}"
+        for i in range(key_count)
+    ]
+    lang_dir.mkdir(parents=True, exist_ok=True)
+    for lang_code in lang_list:
+        char_range = CJK_RANGES.get(lang_code.split("_")[0])
+        data = {}
+        for key in keys:
+            if char_range:
+                value = "".join(chr(rng.randint(*char_range)) for _ in range(rng.randint(2, 8)))
+            else:
+                value = " ".join(
+                    "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(2, 9)))
+                    for _ in range(rng.randint(1, 5))
+                ).capitalize()
+            data[key] = value
+        with open(lang_dir / f"{lang_code}.json", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def time_call(func: Callable[[], object], repeat: int) -> float:
+    """Run a function several times and return the median duration.
+
+    Args:
+        func (Callable[[], object]): The function to time.
+        repeat (int): The number of runs.
+
+    Returns:
+        float: The median duration in seconds.
+
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def time_import(module: str, repeat: int) -> float:
+    """Measure the time a fresh interpreter takes to import a module.
+
+    Args:
+        module (str): The module to import.
+        repeat (int): The number of runs.
+
+    Returns:
+        float: The median import time in seconds.
+
+    """
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start)"
+    )
+    durations = [
+        float(
+            subprocess.run(
+                [sys.executable, "-c", code],
+                cwd=SCRIPT_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+        )
+        for _ in range(repeat)
+    ]
+    return statistics.median(durations)
+
+
+def bench_cold_start(lang_dir: Path, lang_list: list[str], repeat: int) -> dict[str, float]:
+    """Compare the cost of getting at the first translation.
+
+    Args:
+        lang_dir (Path): The directory containing language files.
+        lang_list (list[str]): The language codes to load.
+        repeat (int): The number of runs.
+
+    Returns:
+        dict[str, float]: The median duration of each step in seconds.
+
+    """
+    first_key = next(iter(TranslationStore(lang_list, lang_dir)["en_us"]))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        snapshot_path = build_snapshot(lang_list, lang_dir, Path(temp_dir) / "bench.snapshot")
+
+        def lookup_in_snapshot() -> None:
+            with open_snapshot(lang_list, lang_dir, snapshot_path) as snapshot:
+                snapshot.row(first_key)
+
+        snapshot_time = time_call(lookup_in_snapshot, repeat)
+
+    return {
+        "import init": time_import("init", repeat),
+        "eager load (all languages)": time_call(
+            lambda: load_language_files(lang_list, lang_dir), repeat
+        ),
+        "lazy load (en_us only)": time_call(
+            lambda: TranslationStore(lang_list, lang_dir)["en_us"], repeat
+        ),
+        "snapshot (all languages, one key)": snapshot_time,
+    }
+
+
+def sample_queries(
+    data: dict[str, str], count: int, seed: int = 0, min_length: int = 3, max_length: int = 8
+) -> list[str]:
+    """Pick substrings of random values to use as search queries.
+
+    Args:
+        data (dict[str, str]): The translations of one language.
+        count (int): The number of queries.
+        seed (int): The random seed, so runs are reproducible.
+        min_length (int): The minimum length of a query, unless the value is shorter.
+        max_length (int): The maximum length of a query.
+
+    Returns:
+        list[str]: The queries.
+
+    """
+    rng = random.Random(seed)
+    values = [value for value in data.values() if value]
+    queries = []
+    for _ in range(count):
+        value = rng.choice(values)
+        length = rng.randint(min(min_length, len(value)), min(max_length, len(value)))
+        start = rng.randint(0, len(value) - length)
+        queries.append(value[start : start + length])
+    return queries
+
+
+def bench_fuzzy_query(lang_dir: Path, lang_list: list[str], repeat: int) -> dict[str, float]:
+    """Compare linear scans with the n-gram index for substring queries.
+
+    Args:
+        lang_dir (Path): The directory containing language files.
+        lang_list (list[str]): The language codes to load.
+        repeat (int): The number of runs.
+
+    Returns:
+        dict[str, float]: The median duration of each batch of queries in seconds.
+
+    """
+    language_data = load_language_files(lang_list, lang_dir)
+    cjk_lang = next((lang for lang in ("zh_cn", "ja_jp", "ko_kr") if lang in lang_list), None)
+    source_queries = sample_queries(language_data["en_us"], 200)
+    results = {
+        "200 source queries (scan)": time_call(
+            lambda: [find_keys_by_source_string(language_data, q, False) for q in source_queries],
+            repeat,
+        ),
+    }
+
+    index = TranslationIndex(language_data)
+    start = time.perf_counter()
+    index.ngram("en_us")
+    results["build en_us index"] = time.perf_counter() - start
+    results["200 source queries (index)"] = time_call(
+        lambda: [
+            find_keys_by_source_string(language_data, q, False, index) for q in source_queries
+        ],
+        repeat,
+    )
+
+    if cjk_lang:
+        cjk_queries = sample_queries(language_data[cjk_lang], 200, min_length=1, max_length=3)
+        results[f"200 {cjk_lang} queries (scan)"] = time_call(
+            lambda: [find_keys_by_translation(language_data, cjk_lang, q) for q in cjk_queries],
+            repeat,
+        )
+        start = time.perf_counter()
+        index.ngram(cjk_lang)
+        results[f"build {cjk_lang} index"] = time.perf_counter() - start
+        results[f"200 {cjk_lang} queries (index)"] = time_call(
+            lambda: [
+                find_keys_by_translation(language_data, cjk_lang, q, index) for q in cjk_queries
+            ],
+            repeat,
+        )
+    return results
+
+
+def bench_exact_query(lang_dir: Path, lang_list: list[str], repeat: int) -> dict[str, float]:
+    """Compare linear scans with the reverse value index for exact source-string queries.
+
+    Args:
+        lang_dir (Path): The directory containing language files.
+        lang_list (list[str]): The language codes to load.
+        repeat (int): The number of runs.
+
+    Returns:
+        dict[str, float]: The median duration of each batch of queries in seconds.
+
+    """
+    language_data = load_language_files(lang_list, lang_dir)
+    rng = random.Random(0)
+    queries = rng.choices(list(language_data["en_us"].values()), k=1000)
+    index = TranslationIndex(language_data)
+    start = time.perf_counter()
+    index.values("en_us")
+    build_time = time.perf_counter() - start
+    return {
+        "1000 exact queries (scan)": time_call(
+            lambda: [find_keys_by_source_string(language_data, q) for q in queries], repeat
+        ),
+        "build en_us value index": build_time,
+        "1000 exact queries (index)": time_call(
+            lambda: [find_keys_by_source_string(language_data, q, index=index) for q in queries],
+            repeat,
+        ),
+    }
+
+
+def bench_batch_query(lang_dir: Path, lang_list: list[str], repeat: int) -> dict[str, float]:
+    """Measure the throughput of batch queries, including the index builds.
+
+    Args:
+        lang_dir (Path): The directory containing language files.
+        lang_list (list[str]): The language codes to load.
+        repeat (int): The number of runs.
+
+    Returns:
+        dict[str, float]: The number of queries per second for each output format.
+
+    """
+    language_data = load_language_files(lang_list, lang_dir)
+    en_us_data = language_data["en_us"]
+    rng = random.Random(0)
+    keys = list(en_us_data)
+    lines = []
+    for fuzzy_query in sample_queries(en_us_data, 500):
+        lines.append(f"key\t{rng.choice(keys)}")
+        lines.append(f"source\t{en_us_data[rng.choice(keys)]}")
+        lines.append(f"fuzzy\t{fuzzy_query}")
+    search_langs = [lang for lang in lang_list if lang != "en_us"]
+    for lang in search_langs:
+        for query in sample_queries(language_data[lang], 500 // len(search_langs), min_length=1):
+            lines.append(f"translation\t{query}\t{lang}")
+
+    return {
+        f"{output_format} ({len(lines)} queries)": len(lines)
+        / time_call(
+            lambda output_format=output_format: run_batch(
+                lines, io.StringIO(), language_data, lang_list, output_format
+            ),
+            repeat,
+        )
+        for output_format in ("jsonl", "tsv")
+    }
+
+
+def bench_key_classifier(lang_dir: Path, lang_list: list[str], repeat: int) -> dict[str, float]:
+    """Compare `is_valid_key` with the compiled classifier and mask-based filtering.
+
+    Args:
+        lang_dir (Path): The directory containing language files.
+        lang_list (list[str]): The language codes to load.
+        repeat (int): The number of runs.
+
+    Returns:
+        dict[str, float]: The median duration of each step in seconds.
+
+    """
+    language_data = load_language_files(lang_list, lang_dir)
+    keys = list(language_data["en_us"])
+
+    def filter_per_language() -> tuple[list[str], dict[str, list[str]]]:
+        translations = {
+            lang_code: [value for key, value in data.items() if is_valid_key(key)]
+            for lang_code, data in language_data.items()
+        }
+        return [key for key in keys if is_valid_key(key)], translations
+
+    if classify_keys(keys) != [is_valid_key(key) for key in keys]:
+        sys.exit("The compiled classifier disagrees with is_valid_key.")
+    if filter_translations(language_data) != filter_per_language():
+        sys.exit("Mask-based filtering disagrees with per-language filtering.")
+    return {
+        f"classify en_us keys (is_valid_key, {len(keys)})": time_call(
+            lambda: [is_valid_key(key) for key in keys], repeat
+        ),
+        f"classify en_us keys (compiled, {len(keys)})": time_call(
+            lambda: classify_keys(keys), repeat
+        ),
+        "filter all languages (per language)": time_call(filter_per_language, repeat),
+        "filter all languages (en_us mask)": time_call(
+            lambda: filter_translations(language_data), repeat
+        ),
+    }
+
+
+def bench_server(lang_dir: Path, lang_list: list[str], repeat: int) -> dict[str, float]:
+    """Load test the query server with concurrent keep-alive clients.
+
+    Args:
+        lang_dir (Path): The directory containing language files.
+        lang_list (list[str]): The language codes to serve.
+        repeat (int): Unused, as every request is a sample of its own.
+
+    Returns:
+        dict[str, float]: Latency percentiles in seconds.
+
+    """
+    service = QueryService(lang_list, lang_dir)
+    en_us_data = service.state.language_data["en_us"]
+    rng = random.Random(0)
+    keys = list(en_us_data)
+    search_langs = [lang for lang in lang_list if lang != "en_us"]
+    paths = []
+    for fuzzy_query in sample_queries(en_us_data, LOAD_TEST_REQUESTS):
+        lang = rng.choice(search_langs)
+        translation_query = sample_queries(service.state.language_data[lang], 1, rng.random())[0]
+        paths += [
+            f"/key?{urlencode({'q': rng.choice(keys)})}",
+            f"/source?{urlencode({'q': en_us_data[rng.choice(keys)]})}",
+            f"/fuzzy?{urlencode({'q': fuzzy_query})}",
+            f"/translation?{urlencode({'lang': lang, 'q': translation_query})}",
+        ]
+
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def client(client_id: int) -> None:
+        connection = http.client.HTTPConnection(host, port)
+        own_latencies = []
+        for i in range(LOAD_TEST_REQUESTS):
+            path = paths[(client_id * LOAD_TEST_REQUESTS + i) % len(paths)]
+            start = time.perf_counter()
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            own_latencies.append(time.perf_counter() - start)
+        connection.close()
+        with lock:
+            latencies.extend(own_latencies)
+
+    with QueryServer(("127.0.0.1", 0), service) as server:
+        host, port = server.server_address[:2]
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+        start = time.perf_counter()
+        clients = [threading.Thread(target=client, args=(i,)) for i in range(LOAD_TEST_CLIENTS)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        wall_time = time.perf_counter() - start
+        server.shutdown()
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        f"p50 ({LOAD_TEST_CLIENTS} clients)": quantiles[49],
+        f"p99 ({LOAD_TEST_CLIENTS} clients)": quantiles[98],
+        f"wall time ({len(latencies)} requests)": wall_time,
+    }
+
+
+def make_previous_version(lang_dir: Path, old_dir: Path, lang_list: list[str]) -> None:
+    """Write an earlier version of the language files, for diffing against them.
+
+    Half of the languages are copied unchanged. In the others, about 2% of the
+    keys are changed, removed or added, as between two consecutive snapshots.
+
+    Args:
+        lang_dir (Path): The directory containing the later language files.
+        old_dir (Path): The directory to write the earlier language files to.
+        lang_list (list[str]): The language codes.
+
+    """
+    rng = random.Random(0)
+    old_dir.mkdir(parents=True, exist_ok=True)
+    for i, lang_code in enumerate(lang_list):
+        lang_file = lang_dir / f"{lang_code}.json"
+        if i % 2:
+            shutil.copyfile(lang_file, old_dir / lang_file.name)
+            continue
+        data = load_language_file(lang_file)
+        for key in rng.sample(list(data), len(data) // 50):
+            edit = rng.randrange(3)
+            if edit == 0:
+                data[key] = f"{data[key]} (old)"
+            elif edit == 1:
+                del data[key]
+            else:
+                data[f"{key}.removed"] = data[key]
+        with open(old_dir / lang_file.name, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def diff_loaded(old_dir: Path, new_dir: Path, lang_list: list[str]) -> dict[str, VersionDelta]:
+    """Diff two versions by loading both completely and comparing every key.
+
+    Args:
+        old_dir (Path): The directory of the earlier version.
+        new_dir (Path): The directory of the later version.
+        lang_list (list[str]): The language codes to compare.
+
+    Returns:
+        dict[str, VersionDelta]: The changes of each language that changed.
+
+    """
+    old_data = load_language_files(lang_list, old_dir)
+    new_data = load_language_files(lang_list, new_dir)
+    deltas = {}
+    for lang_code in lang_list:
+        old, new = old_data[lang_code], new_data[lang_code]
+        delta = VersionDelta(
+            {k: v for k, v in new.items() if k not in old and is_valid_key(k)},
+            {k: v for k, v in old.items() if k not in new and is_valid_key(k)},
+            {
+                k: (old[k], v)
+                for k, v in new.items()
+                if k in old and old[k] != v and is_valid_key(k)
+            },
+        )
+        if any(delta):
+            deltas[lang_code] = delta
+    return deltas
+
+
+def diff_engine(old_dir: Path, new_dir: Path, lang_list: list[str]) -> dict[str, VersionDelta]:
+    """Diff two versions with the changelog diff engine.
+
+    Args:
+        old_dir (Path): The directory of the earlier version.
+        new_dir (Path): The directory of the later version.
+        lang_list (list[str]): The language codes to compare.
+
+    Returns:
+        dict[str, VersionDelta]: The changes of each language that changed.
+
+    """
+    deltas = {}
+    for lang_code, delta in diff_version_dirs(old_dir, new_dir, lang_list):
+        delta = filter_delta(delta)
+        if any(delta):
+            deltas[lang_code] = delta
+    return deltas
+
+
+def previous_version_dir(lang_dir: Path) -> Path | None:
+    """Find the recorded version before a version, among its sibling directories.
+
+    Version IDs are compared by name, which orders snapshots such as 25w01a
+    correctly but not every release, so `--previous-lang-dir` can name the
+    version explicitly.
+
+    Args:
+        lang_dir (Path): The directory of a version in a versions directory.
+
+    Returns:
+        Path | None: The version directory sorted right before it, or None.
+
+    """
+    earlier = [path for path in version_dirs(lang_dir.parent) if path.name < lang_dir.name]
+    return earlier[-1] if earlier else None
+
+
+def bench_changelog(
+    lang_dir: Path, lang_list: list[str], repeat: int, previous_dir: Path | None = None
+) -> dict[str, float]:
+    """Compare diffing two loaded versions with the changelog diff engine.
+
+    The first pair is the given version and a synthetic earlier one in which
+    half of the languages changed. If a previous version directory is given,
+    the real pair is timed too, over the languages both versions have. Between
+    consecutive versions most files are identical, which is the case the diff
+    engine skips by their SHA1 without parsing them.
+
+    Args:
+        lang_dir (Path): The directory containing the later language files.
+        lang_list (list[str]): The language codes to compare.
+        repeat (int): The number of runs.
+        previous_dir (Path | None): The directory of a real earlier version.
+
+    Returns:
+        dict[str, float]: The median duration of each approach in seconds.
+
+    """
+
+    def time_pair(old_dir: Path, langs: list[str], label: str) -> dict[str, float]:
+        expected = diff_loaded(old_dir, lang_dir, langs)
+        if diff_engine(old_dir, lang_dir, langs) != expected:
+            sys.exit(f"The changelog diff engine disagrees with a full comparison ({label}).")
+        changes = sum(len(part) for delta in expected.values() for part in delta)
+        unchanged = sum(
+            file_sha1(find_language_file(old_dir, lang))
+            == file_sha1(find_language_file(lang_dir, lang))
+            for lang in langs
+        )
+        detail = f"{label}, {changes} changes, {unchanged}/{len(langs)} files identical"
+        return {
+            f"load both and compare ({detail})": time_call(
+                lambda: diff_loaded(old_dir, lang_dir, langs), repeat
+            ),
+            f"diff engine ({detail})": time_call(
+                lambda: diff_engine(old_dir, lang_dir, langs), repeat
+            ),
+        }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        old_dir = Path(temp_dir)
+        make_previous_version(lang_dir, old_dir, lang_list)
+        results = time_pair(old_dir, lang_list, "synthetic")
+
+    if previous_dir is not None:
+        common = [
+            lang
+            for lang in lang_list
+            if find_language_file(previous_dir, lang).is_file()
+            and find_language_file(lang_dir, lang).is_file()
+        ]
+        results |= time_pair(previous_dir, common, f"{previous_dir.name} to {lang_dir.name}")
+    return results
+
+
+def bench_load(lang_dir: Path, lang_list: list[str], repeat: int) -> dict[str, float]:
+    """Compare loading the same language data from JSON and legacy .lang files.
+
+    Args:
+        lang_dir (Path): The directory containing language files.
+        lang_list (list[str]): The language codes to load.
+        repeat (int): The number of runs.
+
+    Returns:
+        dict[str, float]: The median duration of each loader in seconds.
+
+    """
+    language_data = load_language_files(lang_list, lang_dir)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        lang_file_dir = Path(temp_dir)
+        for lang_code, data in language_data.items():
+            lines = (f"{key}={value.translate(LINE_ESCAPES)}\n" for key, value in data.items())
+            with open(lang_file_dir / f"{lang_code}.lang", "w", encoding="utf-8") as f:
+                f.writelines(lines)
+        if load_language_files(lang_list, lang_file_dir) != language_data:
+            sys.exit("The .lang loader disagrees with the JSON loader.")
+        size = sum(find_language_file(lang_dir, lang).stat().st_size for lang in lang_list)
+        return {
+            f"JSON files ({size / 1048576:.1f} MB)": time_call(
+                lambda: load_language_files(lang_list, lang_dir), repeat
+            ),
+            ".lang files": time_call(lambda: load_language_files(lang_list, lang_file_dir), repeat),
+            "compact store from JSON": time_call(
+                lambda: load_compact_store(lang_list, lang_dir), repeat
+            ),
+        }
+
+
+def bench_download(lang_dir: Path, lang_list: list[str], repeat: int) -> dict[str, float]:
+    """Download a version's language files from a local fake of the Mojang servers.
+
+    Every response is delayed by `FAKE_SERVER_LATENCY`, so the cases show how
+    well requests overlap rather than the speed of the loopback interface.
+
+    Args:
+        lang_dir (Path): The directory containing the language files to serve.
+        lang_list (list[str]): The languages to download.
+        repeat (int): The number of runs.
+
+    Returns:
+        dict[str, float]: The median duration of each case in seconds.
+
+    """
+    server = FakeMojangServer()
+    server.add_release("bench", lang_dir, lang_list)
+    server.start()
+    configure_http(DOWNLOAD_WORKERS)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        runs = iter(range(sys.maxsize))
+
+        def download(workers: int, store: ObjectStore | None = None) -> None:
+            target = Path(temp_dir) / str(next(runs))
+            manifest = fetch_json(
+                server.url("/version_manifest_v2.json"), target / "version_manifest.json"
+            )
+            client_manifest = fetch_json(manifest["versions"][0]["url"], target / "client.json")
+            asset_index = fetch_json(client_manifest["assetIndex"]["url"], target / "index.json")
+            tasks = [
+                DownloadTask(
+                    asset_url(asset["hash"], server.url("/objects")),
+                    Path(name).name,
+                    target / Path(name).name,
+                    asset["hash"],
+                )
+                for name, asset in asset_index["objects"].items()
+            ]
+            with redirect_stdout(io.StringIO()):
+                results = download_files(tasks, workers, store or ObjectStore(target / "objects"))
+            if not all(results.values()):
+                sys.exit("The download benchmark failed to download every file.")
+
+        shared_store = ObjectStore(Path(temp_dir) / "shared")
+        download(DOWNLOAD_WORKERS, shared_store)
+        size = sum(len(body) for path, body in server.files.items() if path.startswith("/objects/"))
+        file_count = sum(1 for path in server.files if path.startswith("/objects/"))
+        results = {
+            f"serial ({file_count} files, {size / 1048576:.1f} MB)": time_call(
+                lambda: download(1), repeat
+            ),
+            f"{DOWNLOAD_WORKERS} concurrent downloads": time_call(
+                lambda: download(DOWNLOAD_WORKERS), repeat
+            ),
+            "from the object store": time_call(
+                lambda: download(DOWNLOAD_WORKERS, shared_store), repeat
+            ),
+        }
+    server.shutdown()
+    server.server_close()
+    return results
+
+
+def measure_memory(func: Callable[[], object]) -> tuple[int, int]:
+    """Measure the memory held by the result of a function and its peak usage.
+
+    Args:
+        func (Callable[[], object]): The function building the object to measure.
+
+    Returns:
+        tuple[int, int]: The retained and the peak allocated memory in bytes.
+
+    """
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return retained, peak
+
+
+def bench_memory(lang_dir: Path, lang_list: list[str], repeat: int) -> dict[str, float]:
+    """Compare the memory held by the dictionary and the compact representations.
+
+    Args:
+        lang_dir (Path): The directory containing language files.
+        lang_list (list[str]): The language codes to load.
+        repeat (int): Unused, as allocations do not vary between runs.
+
+    Returns:
+        dict[str, float]: The retained and peak memory of each representation in bytes.
+
+    """
+    dict_retained, dict_peak = measure_memory(lambda: load_language_files(lang_list, lang_dir))
+    compact_retained, compact_peak = measure_memory(lambda: load_compact_store(lang_list, lang_dir))
+    return {
+        "dict of dicts (retained)": dict_retained,
+        "dict of dicts (peak)": dict_peak,
+        "compact store (retained)": compact_retained,
+        "compact store (peak)": compact_peak,
+    }
+
+
+def format_value(value: float, unit: str) -> str:
+    """Format a benchmark result for display.
+
+    Args:
+        value (float): The result in seconds or bytes.
+        unit (str): The display unit, "ms", "MB" or "q/s".
+
+    Returns:
+        str: The formatted result.
+
+    """
+    if unit == "ms":
+        return f"{value * 1000:10.2f} ms"
+    if unit == "MB":
+        return f"{value / 1048576:10.2f} MB"
+    if unit == "q/s":
+        return f"{value:10.0f} queries/s"
+    return f"{value:10.2f} {unit}"
+
+
+def print_results(title: str, results: dict[str, float], unit: str = "ms") -> None:
+    """Print benchmark results as an aligned table.
+
+    Args:
+        title (str): The name of the benchmark.
+        results (dict[str, float]): The result of each case.
+        unit (str): The display unit of the results.
+
+    """
+    print(f"\n{title}")
+    width = max(len(name) for name in results)
+    for name, value in results.items():
+        print(f"  {name:<{width}}  {format_value(value, unit)}")
+
+
+def print_comparison(previous: dict, current: dict) -> None:
+    """Print how each result changed since an earlier run.
+
+    Args:
+        previous (dict): The results file of the earlier run.
+        current (dict): The results of this run, in the same format.
+
+    """
+    print(f"\nCompared with {previous.get('commit') or 'the earlier run'}:")
+    for name, benchmark in current["benchmarks"].items():
+        earlier = previous.get("benchmarks", {}).get(name, {}).get("results", {})
+        # Rates are better when higher, durations and sizes when lower.
+        higher_is_better = benchmark["unit"] == "q/s"
+        for case, value in benchmark["results"].items():
+            if not earlier.get(case):
+                continue
+            change = value / earlier[case] - 1
+            better = change > 0 if higher_is_better else change < 0
+            verdict = "better" if better else "worse"
+            print(f"  {name}: {case}  {change:+.1%} ({verdict})")
+
+
+def run_metadata() -> dict:
+    """Describe the code and machine the benchmarks ran on."""
+    commit = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        cwd=SCRIPT_DIR,
+        capture_output=True,
+        text=True,
+        check=False,
+    ).stdout.strip()
+    return {
+        "commit": commit or None,
+        "date": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+# Benchmark names mapped to their title, function and display unit.
+BENCHMARKS = {
+    "cold-start": ("Cold start", bench_cold_start, "ms"),
+    "load": ("Language file loading", bench_load, "ms"),
+    "memory": ("Memory", bench_memory, "MB"),
+    "fuzzy-query": ("Fuzzy query", bench_fuzzy_query, "ms"),
+    "exact-query": ("Exact query", bench_exact_query, "ms"),
+    "batch-query": ("Batch query throughput", bench_batch_query, "q/s"),
+    "key-classifier": ("Key classification", bench_key_classifier, "ms"),
+    "server": ("Query server latency", bench_server, "ms"),
+    "changelog": ("Version diff", bench_changelog, "ms"),
+    "download": ("Download from a local fake server", bench_download, "ms"),
+}
+
+
+def main() -> None:
+    """Run the selected benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        default=list(BENCHMARKS),
+        help=f"The benchmarks to run: {', '.join(BENCHMARKS)} (default: all).",
+    )
+    parser.add_argument(
+        "--lang-dir",
+        type=Path,
+        help="A directory of real language files to use instead of synthetic ones.",
+    )
+    parser.add_argument(
+        "--previous-lang-dir",
+        type=Path,
+        help="The real version before --lang-dir for the changelog benchmark "
+        "(default: the sibling directory sorted right before it).",
+    )
+    parser.add_argument(
+        "--keys", type=int, default=10000, help="The number of keys per synthetic file."
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="The number of runs per case.")
+    parser.add_argument(
+        "--json", type=Path, help="Save the results to a JSON file, for later comparison."
+    )
+    parser.add_argument(
+        "--compare", type=Path, help="A JSON results file of an earlier run to compare with."
+    )
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+    previous_dir = args.previous_lang_dir
+    if previous_dir is None and args.lang_dir is not None:
+        previous_dir = previous_version_dir(args.lang_dir)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        lang_dir = args.lang_dir
+        if lang_dir is None:
+            lang_dir = Path(temp_dir)
+            print(f"Generating synthetic language files ({args.keys} keys each)...")
+            generate_language_files(lang_dir, LANGUAGE_LIST, args.keys)
+
+        report = {
+            **run_metadata(),
+            "lang_dir": str(args.lang_dir) if args.lang_dir else None,
+            "previous_lang_dir": str(previous_dir) if previous_dir else None,
+            "keys": None if args.lang_dir else args.keys,
+            "repeat": args.repeat,
+            "benchmarks": {},
+        }
+        for name in args.benchmarks:
+            title, bench, unit = BENCHMARKS[name]
+            if bench is bench_changelog:
+                results = bench_changelog(lang_dir, LANGUAGE_LIST, args.repeat, previous_dir)
+            else:
+                results = bench(lang_dir, LANGUAGE_LIST, args.repeat)
+            print_results(title, results, unit)
+            report["benchmarks"][name] = {"title": title, "unit": unit, "results": results}
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nSaved the results to '{args.json}'.")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
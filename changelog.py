@@ -0,0 +1,264 @@
+"""Changelogs of the translations between two versions.
+
+Compares two downloaded version directories, or two versions recorded in the
+history database, across every configured language. Only the keys accepted by
+`extract.is_valid_key` are reported. Language files whose SHA1 hashes match are
+skipped without being parsed, and each language is written out as soon as it
+has been compared, so the changelog never has to be held in memory as a whole.
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import TextIO
+
+from base import HISTORY_PATH, LANGUAGE_LIST, VERSIONS_DIR
+from extract import VALID_KEY_PATTERN
+from history import HistoryStore, VersionDelta, compute_delta
+from init import find_language_file, load_language_file
+
+
+def file_sha1(path: Path) -> str | None:
+    """Hash a file.
+
+    Args:
+        path (Path): The path of the file.
+
+    Returns:
+        str | None: The SHA1 hex digest, or None if the file does not exist.
+
+    """
+    try:
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "sha1").hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def filter_delta(delta: VersionDelta) -> VersionDelta:
+    """Keep only the changes of keys that are valid for extraction.
+
+    Args:
+        delta (VersionDelta): The changes of a language.
+
+    Returns:
+        VersionDelta: The changes of the keys accepted by `extract.is_valid_key`.
+
+    """
+    match = VALID_KEY_PATTERN.match
+    return VersionDelta(*({key: v for key, v in part.items() if match(key)} for part in delta))
+
+
+def diff_version_dirs(
+    old_dir: Path, new_dir: Path, lang_list: list[str]
+) -> Iterator[tuple[str, VersionDelta]]:
+    """Compare the language files of two version directories.
+
+    Args:
+        old_dir (Path): The directory of the earlier version.
+        new_dir (Path): The directory of the later version.
+        lang_list (list[str]): The languages to compare.
+
+    Yields:
+        tuple[str, VersionDelta]: Each language whose files differ, with its
+            changes. A missing file counts as an empty language.
+
+    """
+    for lang_code in lang_list:
+        old_file = find_language_file(old_dir, lang_code)
+        new_file = find_language_file(new_dir, lang_code)
+        if file_sha1(old_file) == file_sha1(new_file):
+            continue
+        old = load_language_file(old_file) if old_file.is_file() else {}
+        new = load_language_file(new_file) if new_file.is_file() else {}
+        yield lang_code, compute_delta(old, new)
+
+
+def diff_history(
+    store: HistoryStore, old_name: str, new_name: str, lang_list: list[str]
+) -> Iterator[tuple[str, VersionDelta]]:
+    """Compare two versions recorded in the history database.
+
+    Args:
+        store (HistoryStore): The history store.
+        old_name (str): The earlier version ID.
+        new_name (str): The later version ID.
+        lang_list (list[str]): The languages to compare.
+
+    Yields:
+        tuple[str, VersionDelta]: Each language with its changes.
+
+    Raises:
+        KeyError: If either version is not recorded.
+
+    """
+    for lang_code in lang_list:
+        yield lang_code, store.diff(old_name, new_name, lang_code)
+
+
+def change_count(delta: VersionDelta) -> int:
+    """Return the number of keys added, removed or changed in a delta."""
+    return len(delta.added) + len(delta.removed) + len(delta.changed)
+
+
+def write_json_changelog(
+    output: TextIO, old: str, new: str, changes: Iterator[tuple[str, VersionDelta]]
+) -> dict[str, int]:
+    """Write a changelog as one JSON object, language by language.
+
+    Args:
+        output (TextIO): Where to write the changelog.
+        old (str): The name of the earlier version.
+        new (str): The name of the later version.
+        changes (Iterator[tuple[str, VersionDelta]]): The changes of each language.
+
+    Returns:
+        dict[str, int]: The number of changes written for each language.
+
+    """
+    counts = {}
+    output.write(f'{{"old": {json.dumps(old)}, "new": {json.dumps(new)}, "languages": {{')
+    for lang_code, delta in changes:
+        if not change_count(delta):
+            continue
+        entry = {
+            "added": delta.added,
+            "removed": delta.removed,
+            "changed": {key: {"old": o, "new": n} for key, (o, n) in delta.changed.items()},
+        }
+        separator = ", " if counts else ""
+        output.write(f"{separator}\n{json.dumps(lang_code)}: ")
+        output.write(json.dumps(entry, ensure_ascii=False))
+        counts[lang_code] = change_count(delta)
+    output.write("\n}}\n")
+    return counts
+
+
+def _markdown_text(text: str) -> str:
+    """Quote a key or value as inline code on a single line."""
+    text = text.replace("\n", "\\n")
+    return f"`` {text} ``" if "`" in text else f"`{text}`"
+
+
+def write_markdown_changelog(
+    output: TextIO, old: str, new: str, changes: Iterator[tuple[str, VersionDelta]]
+) -> dict[str, int]:
+    """Write a changelog as a Markdown document with one section per language.
+
+    Args:
+        output (TextIO): Where to write the changelog.
+        old (str): The name of the earlier version.
+        new (str): The name of the later version.
+        changes (Iterator[tuple[str, VersionDelta]]): The changes of each language.
+
+    Returns:
+        dict[str, int]: The number of changes written for each language.
+
+    """
+    counts = {}
+    output.write(f"# Translation changes from {old} to {new}\n")
+    for lang_code, delta in changes:
+        if not change_count(delta):
+            continue
+        output.write(f"\n## {lang_code}\n")
+        sections = [
+            (
+                "Added",
+                [f"{_markdown_text(k)}: {_markdown_text(v)}" for k, v in delta.added.items()],
+            ),
+            (
+                "Removed",
+                [f"{_markdown_text(k)}: {_markdown_text(v)}" for k, v in delta.removed.items()],
+            ),
+            (
+                "Changed",
+                [
+                    f"{_markdown_text(k)}: {_markdown_text(o)} → {_markdown_text(n)}"
+                    for k, (o, n) in delta.changed.items()
+                ],
+            ),
+        ]
+        for title, lines in sections:
+            if lines:
+                output.write(f"\n### {title}\n\n")
+                output.writelines(f"- {line}\n" for line in lines)
+        counts[lang_code] = change_count(delta)
+    if not counts:
+        output.write("\nNo changes.\n")
+    return counts
+
+
+# Changelog formats mapped to the functions writing them.
+FORMATS: dict[
+    str, Callable[[TextIO, str, str, Iterator[tuple[str, VersionDelta]]], dict[str, int]]
+] = {
+    "json": write_json_changelog,
+    "markdown": write_markdown_changelog,
+}
+
+
+def resolve_version_dir(version: str) -> Path:
+    """Find the directory of a version given by ID or path.
+
+    Args:
+        version (str): A version ID in the versions directory, or a directory path.
+
+    Returns:
+        Path: The directory holding the version's language files.
+
+    """
+    path = Path(version)
+    return path if path.is_dir() else VERSIONS_DIR / version
+
+
+def main() -> None:
+    """Write a changelog of the translations between two versions."""
+    parser = argparse.ArgumentParser(description="Write a changelog between two versions.")
+    parser.add_argument("old", help="The earlier version ID or directory.")
+    parser.add_argument("new", help="The later version ID or directory.")
+    parser.add_argument(
+        "--history",
+        action="store_true",
+        help="Compare versions recorded in the history database instead of directories.",
+    )
+    parser.add_argument("--db", type=Path, default=HISTORY_PATH, help="The history database.")
+    parser.add_argument("--format", choices=list(FORMATS), default="markdown")
+    parser.add_argument(
+        "--lang", nargs="+", default=LANGUAGE_LIST, help="The languages to compare."
+    )
+    parser.add_argument("--output", "-o", type=Path, help="The output file (default: stdout).")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.db) if args.history else None
+    if store:
+        recorded = {name for name, _ in store.versions()}
+        missing = [v for v in (args.old, args.new) if v not in recorded]
+        changes = diff_history(store, args.old, args.new, args.lang)
+    else:
+        old_dir, new_dir = resolve_version_dir(args.old), resolve_version_dir(args.new)
+        missing = [str(d) for d in (old_dir, new_dir) if not d.is_dir()]
+        changes = diff_version_dirs(old_dir, new_dir, args.lang)
+    if missing:
+        print(f"Version not found: {', '.join(missing)}")
+        sys.exit(1)
+
+    filtered = ((lang_code, filter_delta(delta)) for lang_code, delta in changes)
+    old_name, new_name = Path(args.old).name, Path(args.new).name
+    write_changelog = FORMATS[args.format]
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            counts = write_changelog(f, old_name, new_name, filtered)
+    else:
+        counts = write_changelog(sys.stdout, old_name, new_name, filtered)
+    if store:
+        store.close()
+
+    summary = f"{sum(counts.values())} changes in {len(counts)} of {len(args.lang)} languages."
+    print(summary, file=sys.stdout if args.output else sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Compact columnar storage for translations.
+
+Instead of one dictionary per language, every key is stored once in a shared
+key table, and each language holds a list of values indexed by key ID. Equal
+values are stored once across all languages. A language whose keys do not
+follow the key IDs also keeps its key order, so it iterates like its file.
+"""
+
+from array import array
+from collections.abc import ItemsView, Iterator, Mapping
+from itertools import pairwise
+from pathlib import Path
+
+from init import find_language_file, load_language_file
+
+
+class KeyTable:
+    """An append-only table that assigns consecutive IDs to localization keys."""
+
+    __slots__ = ("ids", "keys")
+
+    def __init__(self) -> None:
+        """Initialize an empty table."""
+        self.keys: list[str] = []
+        self.ids: dict[str, int] = {}
+
+    def add(self, key: str) -> int:
+        """Add a key to the table if it is not already present.
+
+        Args:
+            key (str): The localization key.
+
+        Returns:
+            int: The ID of the key.
+
+        """
+        key_id = self.ids.get(key)
+        if key_id is None:
+            key_id = self.ids[key] = len(self.keys)
+            self.keys.append(key)
+        return key_id
+
+    def __len__(self) -> int:
+        """Return the number of keys in the table."""
+        return len(self.keys)
+
+
+class TranslationRow:
+    """The translations of one key in every language of a store."""
+
+    __slots__ = ("key", "key_id", "values")
+
+    def __init__(self, key: str, key_id: int, values: tuple[str | None, ...]) -> None:
+        """Initialize the row.
+
+        Args:
+            key (str): The localization key.
+            key_id (int): The ID of the key in the key table.
+            values (tuple[str | None, ...]): The translation in each language of
+                the store, in the store's language order, or None where missing.
+
+        """
+        self.key = key
+        self.key_id = key_id
+        self.values = values
+
+    def __repr__(self) -> str:
+        """Return a readable representation of the row."""
+        return f"TranslationRow({self.key!r}, {self.values!r})"
+
+
+class LanguageColumn(Mapping[str, str]):
+    """A read-only view of one language in a compact store, usable like its dictionary."""
+
+    __slots__ = ("column", "key_table", "order")
+
+    def __init__(
+        self, key_table: KeyTable, column: list[str | None], order: array | None = None
+    ) -> None:
+        """Initialize the view.
+
+        Args:
+            key_table (KeyTable): The shared key table.
+            column (list[str | None]): The values of the language indexed by key ID.
+            order (array | None): The key IDs of the language in its file order,
+                or None if that is key ID order.
+
+        """
+        self.key_table = key_table
+        self.column = column
+        self.order = order
+
+    def __getitem__(self, key: str) -> str:
+        """Return the translation of a key."""
+        key_id = self.key_table.ids[key]
+        value = self.column[key_id] if key_id < len(self.column) else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the keys translated in this language, in its file order."""
+        keys = self.key_table.keys
+        if self.order is not None:
+            return map(keys.__getitem__, self.order)
+        return (keys[key_id] for key_id, value in enumerate(self.column) if value is not None)
+
+    def __len__(self) -> int:
+        """Return the number of keys translated in this language."""
+        if self.order is not None:
+            return len(self.order)
+        return sum(value is not None for value in self.column)
+
+    def items(self) -> "ColumnItems":
+        """Return a view of the translated keys and their values."""
+        return ColumnItems(self)
+
+
+class ColumnItems(ItemsView[str, str]):
+    """An items view of a language column that walks the column without key lookups."""
+
+    _mapping: LanguageColumn
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        """Iterate over the translated keys and their values in the language's file order."""
+        keys = self._mapping.key_table.keys
+        column = self._mapping.column
+        if self._mapping.order is not None:
+            for key_id in self._mapping.order:
+                yield keys[key_id], column[key_id]
+            return
+        for key_id, value in enumerate(column):
+            if value is not None:
+                yield keys[key_id], value
+
+
+class CompactTranslationStore(Mapping[str, LanguageColumn]):
+    """A read-only mapping of language codes to translations backed by columns.
+
+    The store can be used wherever a dictionary of language dictionaries is
+    expected. For cross-language lookups, `row` resolves the key once and
+    returns its values in every language.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty store."""
+        self.key_table = KeyTable()
+        self.columns: dict[str, list[str | None]] = {}
+        # The key IDs of each language in its file order, where it is not key ID order.
+        self.orders: dict[str, array] = {}
+
+    def add_language(
+        self, lang_code: str, data: Mapping[str, str], value_pool: dict[str, str] | None = None
+    ) -> None:
+        """Add the translations of a language to the store.
+
+        Args:
+            lang_code (str): The language code.
+            data (Mapping[str, str]): The translations keyed by localization key.
+            value_pool (dict[str, str] | None): A pool of values shared while adding
+                several languages, so that equal values are stored once. It is only
+                needed during loading and can be discarded afterwards.
+
+        """
+        column: list[str | None] = [None] * len(self.key_table)
+        pool = {} if value_pool is None else value_pool
+        order = array("I")
+        for key, value in data.items():
+            key_id = self.key_table.add(key)
+            if key_id >= len(column):
+                column.extend([None] * (key_id + 1 - len(column)))
+            column[key_id] = pool.setdefault(value, value)
+            order.append(key_id)
+        self.columns[lang_code] = column
+        if any(a >= b for a, b in pairwise(order)):
+            self.orders[lang_code] = order
+        else:
+            self.orders.pop(lang_code, None)
+
+    def row(self, key: str) -> TranslationRow | None:
+        """Return the translations of a key in every language.
+
+        Args:
+            key (str): The localization key.
+
+        Returns:
+            TranslationRow | None: The row of the key, or None if the key is unknown.
+
+        """
+        key_id = self.key_table.ids.get(key)
+        if key_id is None:
+            return None
+        values = tuple(
+            column[key_id] if key_id < len(column) else None for column in self.columns.values()
+        )
+        return TranslationRow(key, key_id, values)
+
+    def __getitem__(self, lang_code: str) -> LanguageColumn:
+        """Return a view of the translations of a language."""
+        return LanguageColumn(self.key_table, self.columns[lang_code], self.orders.get(lang_code))
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the language codes in the store."""
+        return iter(self.columns)
+
+    def __len__(self) -> int:
+        """Return the number of languages in the store."""
+        return len(self.columns)
+
+    def __contains__(self, lang_code: object) -> bool:
+        """Check whether a language is in the store."""
+        return lang_code in self.columns
+
+    @classmethod
+    def from_language_data(
+        cls, language_data: Mapping[str, Mapping[str, str]]
+    ) -> "CompactTranslationStore":
+        """Build a store from existing language data.
+
+        Args:
+            language_data (Mapping[str, Mapping[str, str]]): The translations of each language.
+
+        Returns:
+            CompactTranslationStore: The new store.
+
+        """
+        store = cls()
+        value_pool: dict[str, str] = {}
+        for lang_code, data in language_data.items():
+            store.add_language(lang_code, data, value_pool)
+        return store
+
+
+def load_compact_store(lang_list: list[str], lang_dir: Path) -> CompactTranslationStore:
+    """Load language files into a compact store one at a time.
+
+    Only one parsed language dictionary is alive at any time, so the peak
+    memory stays close to the size of the finished store.
+
+    Args:
+        lang_list (list[str]): The language codes to load.
+        lang_dir (Path): The directory containing language files.
+
+    Returns:
+        CompactTranslationStore: The loaded store.
+
+    """
+    store = CompactTranslationStore()
+    value_pool: dict[str, str] = {}
+    for lang_code in lang_list:
+        data = load_language_file(find_language_file(lang_dir, lang_code))
+        store.add_language(lang_code, data, value_pool)
+    return store
@@ -1,14 +1,36 @@
 """Minecraft legacy language file downloader."""
 
-import hashlib
+import argparse
+import io
 import json
+import os
 import sys
+import threading
+import time
 import tomllib as tl
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager, redirect_stdout
 from pathlib import Path
+from typing import TextIO
 from zipfile import ZipFile
 
 import requests as r
 
+from downloader import (
+    REQUEST_LOG,
+    VERSION_MANIFEST_URL,
+    ObjectStore,
+    RemoteZipError,
+    asset_url,
+    cache_file_name,
+    configure_http,
+    download_file,
+    download_zip_member,
+    fetch_json,
+)
+from metrics import METRICS, write_metrics
+
 TARGET_VERSIONS = {
     #    "legacy": "1.7",
     "1.7.3": "1.7.3",
@@ -49,49 +71,21 @@ with open(CONFIG_PATH, "rb") as f:
 OUTPUT_DIR = SCRIPT_DIR / config["legacy_assets_output_folder"]
 REMOVE_CLIENT_JAR: bool = config["remove_client"]
 LANGUAGE_LIST: list[str] = config["language_list"]
+OBJECTS_DIR = SCRIPT_DIR / config["object_folder"]
+MANIFEST_TTL: int = config["manifest_ttl"]
+MAX_CONCURRENT_DOWNLOADS: int = config["max_concurrent_downloads"]
+MAX_CONCURRENT_JAR_DOWNLOADS: int = config["max_concurrent_jar_downloads"]
+HTTP_POOL_SIZE: int = config["http_pool_size"]
+METRICS_FILE = SCRIPT_DIR / config["metrics_file"] if config["metrics_file"] else None
 
+# Client manifests and asset indexes are cached here, separately from the versions.
+MANIFEST_CACHE_DIR = OUTPUT_DIR / "manifests"
 
-def get_response(url: str) -> r.Response | None:
-    """Send a GET request to the specified URL and return the response."""
-    try:
-        resp = r.get(url, timeout=120)
-        resp.raise_for_status()
-        return resp
-    except r.exceptions.RequestException as e:
-        print(f"An error occurred during the request: {e}")
-        return None
-
-
-def download_file(url: str, file_name: str, file_path: Path, expected_sha1: str) -> bool:
-    """Download a file, verify its SHA1 checksum, and retry on failure."""
-    for attempt in range(3):
-        print(f"Downloading '{file_name}' (Attempt {attempt + 1}/3)...")
-        response = get_response(url)
-        if not response:
-            print(f"Download failed for '{file_name}'. Retrying...\n")
-            continue
-
-        with open(file_path, "wb") as f:
-            f.write(response.content)
-
-        with open(file_path, "rb") as f:
-            actual_sha1 = hashlib.file_digest(f, "sha1").hexdigest()
+# The timeout in seconds for every request made by this script.
+REQUEST_TIMEOUT = 120
 
-        if actual_sha1 == expected_sha1:
-            size_in_bytes = file_path.stat().st_size
-            size_mb = round(size_in_bytes / 1048576, 2)
-            print(f"SHA1 checksum consistent for {file_name}. File size: {size_mb:.2f} MB")
-            return True
-
-        print(
-            f"SHA1 checksum mismatch for {file_name}. Expected {expected_sha1}, got {actual_sha1}."
-        )
-        print(f"Retrying (Attempt {attempt + 2}/3).\n")
-    else:
-        print(f"Failed to download '{file_name}' correctly after 3 attempts.\n")
-        if file_path.exists():
-            file_path.unlink()
-        return False
+# Records the versions completed by an unfinished run, so a restarted run skips them.
+JOURNAL_PATH = OUTPUT_DIR / "journal.json"
 
 
 def extract_en_us_from_jar(client_jar_path: Path, version_output_dir: Path, lang_base_path: str):
@@ -117,136 +111,442 @@ def extract_en_us_from_jar(client_jar_path: Path, version_output_dir: Path, lang
         print(f"An error occurred during extraction: {e}")
 
 
-def main():
-    """Download and extract language files for all target versions."""
-    OUTPUT_DIR.mkdir(exist_ok=True)
+class ThreadOutput(io.TextIOBase):
+    """A replacement for stdout that sends each thread's output to its own buffer.
 
-    version_manifest_path = OUTPUT_DIR / "version_manifest_v2.json"
-    print("Fetching global version manifest...")
-    manifest_response = get_response(
-        "https://piston-meta.mojang.com/mc/game/version_manifest_v2.json"
-    )
+    Threads that have not set a buffer write to the wrapped stream directly.
+    """
 
-    if manifest_response:
-        version_manifest_json = manifest_response.json()
-        with open(version_manifest_path, "wb") as f:
-            f.write(manifest_response.content)
-        print("Successfully fetched global manifest.\n")
-    elif version_manifest_path.exists():
-        print("Failed to fetch manifest. Using local copy.\n")
-        with open(version_manifest_path, encoding="utf-8") as f:
-            version_manifest_json = json.load(f)
-    else:
-        print("Failed to fetch manifest and no local copy is available. Exiting.")
-        sys.exit()
+    def __init__(self, stream: TextIO) -> None:
+        """Wrap a stream.
 
-    for output_folder_name, version_id in TARGET_VERSIONS.items():
-        print(f"--- Processing version: {version_id} ({output_folder_name}) ---")
-        version_info: dict = next(
-            (v for v in version_manifest_json["versions"] if v["id"] == version_id), {}
-        )
+        Args:
+            stream (TextIO): The stream for output that is not captured.
 
-        if not version_info:
-            print(f"Version '{version_id}' not found in manifest. Skipping.\n")
-            continue
+        """
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text: str) -> int:
+        """Write text to the current thread's buffer, or to the stream."""
+        return (getattr(self.local, "buffer", None) or self.stream).write(text)
+
+    def flush(self) -> None:
+        """Flush the wrapped stream."""
+        self.stream.flush()
+
+    @contextmanager
+    def capture(self, buffer: io.StringIO) -> Iterator[None]:
+        """Send the current thread's output to a buffer within the block.
+
+        Args:
+            buffer (io.StringIO): The buffer to write to.
+
+        """
+        previous = getattr(self.local, "buffer", None)
+        self.local.buffer = buffer
+        try:
+            yield
+        finally:
+            self.local.buffer = previous
+
+
+class VersionJob:
+    """The state of one target version as it moves through the pipeline."""
+
+    def __init__(self, output_folder_name: str, version_id: str) -> None:
+        """Initialize the job.
+
+        Args:
+            output_folder_name (str): The name of the version's output folder.
+            version_id (str): The version ID in the version manifest.
+
+        """
+        self.output_folder_name = output_folder_name
+        self.version_id = version_id
+        self.version_output_dir = OUTPUT_DIR / output_folder_name
+        self.temp_download_dir = OUTPUT_DIR / version_id
 
         # Determine the correct language path based on the version folder name
         legacy_folders = ["legacy", "1.7.3", "1.7.4"]
-        lang_base_path = "lang/" if output_folder_name in legacy_folders else "minecraft/lang/"
+        self.lang_base_path = "lang/" if output_folder_name in legacy_folders else "minecraft/lang/"
+
+        # The output of each stage, printed together once the version is done.
+        self.metadata_log = io.StringIO()
+        self.jar_log = io.StringIO()
+        # Whether any step of the version failed, so it has to be redone.
+        self.failed = False
+        # The time spent in each stage, in seconds.
+        self.metadata_time = 0.0
+        self.jar_time = 0.0
+        # The client.jar stage, once it is submitted to the jar pool.
+        self.jar_future: Future | None = None
+
+    @property
+    def busy_time(self) -> float:
+        """The total time spent processing the version, in seconds."""
+        return self.metadata_time + self.jar_time
+
+    def report(self) -> str:
+        """Return the collected output of the version as one block."""
+        return (
+            f"--- Processing version: {self.version_id} ({self.output_folder_name}) ---\n"
+            f"{self.metadata_log.getvalue()}{self.jar_log.getvalue()}"
+            f"--- Finished processing {self.version_id} in {self.busy_time:.1f} s. ---\n"
+        )
 
-        version_output_dir = OUTPUT_DIR / output_folder_name
-        version_output_dir.mkdir(exist_ok=True)
-        temp_download_dir = OUTPUT_DIR / version_id
-        temp_download_dir.mkdir(exist_ok=True)
 
-        version_manifest_resp = get_response(version_info["url"])
-        if not version_manifest_resp:
-            print(f"Could not fetch manifest for {version_id}. Skipping.\n")
-            continue
+def download_language_assets(
+    job: VersionJob, client_manifest: dict, object_store: ObjectStore
+) -> None:
+    """Download the non-en_us language files of a version from its asset index."""
+    version_id, lang_base_path = job.version_id, job.lang_base_path
+    if "assetIndex" not in client_manifest:
+        print(f"Version {version_id} does not have an assetIndex. Skipping asset downloads.")
+        return
+
+    print(f"Found asset index. Searching for non-en_us languages with path '{lang_base_path}'...")
+    asset_index_info = client_manifest["assetIndex"]
+    asset_index_sha1 = asset_index_info.get("sha1")
+    asset_index = fetch_json(
+        asset_index_info["url"],
+        MANIFEST_CACHE_DIR / "indexes" / cache_file_name(asset_index_info["url"], asset_index_sha1),
+        timeout=REQUEST_TIMEOUT,
+        expected_sha1=asset_index_sha1,
+    )
+    if not asset_index:
+        print(f"Could not fetch asset index for {version_id}. Skipping asset downloads.\n")
+        job.failed = True
+        return
 
-        client_manifest = version_manifest_resp.json()
+    asset_objects = asset_index.get("objects", {})
+    versions_1_15_and_up = ["1.15", "1.16", "1.17", "1.18", "1.19"]
 
-        if "assetIndex" in client_manifest:
-            print(
-                "Found asset index. "
-                f"Searching for non-en_us languages with path '{lang_base_path}'..."
-            )
-            asset_index_info = client_manifest["assetIndex"]
-            asset_index_resp = get_response(asset_index_info["url"])
+    for lang_code in LANGUAGE_LIST:
+        if lang_code == "en_us":
+            continue
 
-            if asset_index_resp:
-                asset_objects = asset_index_resp.json().get("objects", {})
-                versions_1_15_and_up = ["1.15", "1.16", "1.17", "1.18", "1.19"]
+        if lang_code in ["lzh", "zh_hk"] and version_id not in versions_1_15_and_up:
+            print(f"Skipping '{lang_code}' for version {version_id} (older than 1.15).")
+            continue
 
-                for lang_code in LANGUAGE_LIST:
-                    if lang_code == "en_us":
-                        continue
+        lang_parts = lang_code.split("_")
+        lang_code_upper = (
+            f"{lang_parts[0]}_{lang_parts[1].upper()}" if len(lang_parts) > 1 else lang_code
+        )
 
-                    if lang_code in ["lzh", "zh_hk"] and version_id not in versions_1_15_and_up:
-                        print(f"Skipping '{lang_code}' for version {version_id} (older than 1.15).")
-                        continue
+        if lang_code in ["lzh", "zh_hk"]:
+            search_keys = [(f"{lang_base_path}{lang_code}.json", f"{lang_code}.json")]
+        else:
+            search_keys = [
+                (f"{lang_base_path}{lang_code}.json", f"{lang_code}.json"),
+                (f"{lang_base_path}{lang_code}.lang", f"{lang_code}.lang"),
+                (f"{lang_base_path}{lang_code_upper}.lang", f"{lang_code_upper}.lang"),
+            ]
 
-                    lang_parts = lang_code.split("_")
-                    lang_code_upper = (
-                        f"{lang_parts[0]}_{lang_parts[1].upper()}"
-                        if len(lang_parts) > 1
-                        else lang_code
-                    )
-
-                    if lang_code in ["lzh", "zh_hk"]:
-                        search_keys = [(f"{lang_base_path}{lang_code}.json", f"{lang_code}.json")]
-                    else:
-                        search_keys = [
-                            (f"{lang_base_path}{lang_code}.json", f"{lang_code}.json"),
-                            (f"{lang_base_path}{lang_code}.lang", f"{lang_code}.lang"),
-                            (f"{lang_base_path}{lang_code_upper}.lang", f"{lang_code_upper}.lang"),
-                        ]
-
-                    found_asset = False
-                    for key, out_name in search_keys:
-                        if key in asset_objects:
-                            asset = asset_objects[key]
-                            file_hash = asset["hash"]
-                            file_url = f"https://resources.download.minecraft.net/{file_hash[:2]}/{file_hash}"
-                            download_file(
-                                file_url, out_name, version_output_dir / out_name, file_hash
-                            )
-                            found_asset = True
-                            break
-
-                    if not found_asset:
-                        print(
-                            f"Language '{lang_code}' not found in asset index with specified paths."
-                        )
-            else:
-                print(f"Could not fetch asset index for {version_id}. Skipping asset downloads.\n")
+        found_asset = False
+        for key, out_name in search_keys:
+            if key in asset_objects:
+                asset = asset_objects[key]
+                file_hash = asset["hash"]
+                print(f"Downloading '{out_name}' ({file_hash})...")
+                if not download_file(
+                    asset_url(file_hash),
+                    out_name,
+                    job.version_output_dir / out_name,
+                    file_hash,
+                    timeout=REQUEST_TIMEOUT,
+                    store=object_store,
+                ):
+                    job.failed = True
+                found_asset = True
+                break
+
+        if not found_asset:
+            print(f"Language '{lang_code}' not found in asset index with specified paths.")
+
+
+def download_en_us(job: VersionJob, client_manifest: dict) -> None:
+    """Download the client.jar of a version and extract en_us from it."""
+    version_id = job.version_id
+    print(f"\nHandling 'en_us' via client.jar (searching in '{job.lang_base_path}')...")
+    client_downloads = client_manifest.get("downloads", {})
+    client_jar_info = client_downloads.get("client", {})
+    client_url = client_jar_info.get("url")
+    client_sha1 = client_jar_info.get("sha1")
+
+    if client_url and REMOVE_CLIENT_JAR:
+        # The archive is not kept, so only en_us is read from it with range requests.
+        members = [
+            (f"{job.lang_base_path}{file_name}", job.version_output_dir / file_name)
+            for file_name in ("en_us.json", "en_us.lang")
+        ]
+        try:
+            member_name = download_zip_member(client_url, members, timeout=REQUEST_TIMEOUT)
+        except RemoteZipError as e:
+            print(f"{e} Falling back to downloading the whole client.jar.")
         else:
-            print(f"Version {version_id} does not have an assetIndex. Skipping asset downloads.")
-
-        if "en_us" in LANGUAGE_LIST:
-            print(f"\nHandling 'en_us' via client.jar (searching in '{lang_base_path}')...")
-            client_downloads = client_manifest.get("downloads", {})
-            client_jar_info = client_downloads.get("client", {})
-            client_url = client_jar_info.get("url")
-            client_sha1 = client_jar_info.get("sha1")
-
-            if client_url and client_sha1:
-                client_jar_path = temp_download_dir / "client.jar"
-                if download_file(client_url, f"{version_id}.jar", client_jar_path, client_sha1):
-                    extract_en_us_from_jar(client_jar_path, version_output_dir, lang_base_path)
-
-                if REMOVE_CLIENT_JAR and client_jar_path.exists():
-                    print(f"Removing temporary file {client_jar_path.name}...")
-                    client_jar_path.unlink()
+            if member_name:
+                print(f"  Extracted '{member_name}' from the remote client.jar.")
             else:
-                print(f"No client.jar info found for {version_id} to extract en_us. Skipping.\n")
+                print("  - 'en_us' language file not found in this version's JAR.")
+            return
+
+    if client_url and client_sha1:
+        job.temp_download_dir.mkdir(exist_ok=True)
+        client_jar_path = job.temp_download_dir / "client.jar"
+        print(f"Downloading '{version_id}.jar' ({client_sha1})...")
+        if download_file(
+            client_url,
+            f"{version_id}.jar",
+            client_jar_path,
+            client_sha1,
+            timeout=REQUEST_TIMEOUT,
+        ):
+            extract_en_us_from_jar(client_jar_path, job.version_output_dir, job.lang_base_path)
+        else:
+            job.failed = True
+
+        if REMOVE_CLIENT_JAR and client_jar_path.exists():
+            print(f"Removing temporary file {client_jar_path.name}...")
+            client_jar_path.unlink()
 
         try:
-            if not any(temp_download_dir.iterdir()):
-                temp_download_dir.rmdir()
+            if not any(job.temp_download_dir.iterdir()):
+                job.temp_download_dir.rmdir()
         except OSError:
             pass
-        print(f"--- Finished processing {version_id}. ---\n")
+    else:
+        print(f"No client.jar info found for {version_id} to extract en_us. Skipping.\n")
+
+
+def run_jar_stage(job: VersionJob, client_manifest: dict, output: ThreadOutput) -> None:
+    """Run the client.jar stage of a version, capturing its output."""
+    start = time.perf_counter()
+    with output.capture(job.jar_log):
+        download_en_us(job, client_manifest)
+    job.jar_time = time.perf_counter() - start
+    METRICS.observe("stage", job.jar_time, stage="jar")
+
+
+def run_metadata_stage(
+    job: VersionJob,
+    version_manifest: dict,
+    object_store: ObjectStore,
+    jar_pool: ThreadPoolExecutor | None,
+    output: ThreadOutput,
+) -> Future | None:
+    """Run the metadata and language asset stage of a version, capturing its output.
+
+    As soon as the client manifest is known, the client.jar stage is handed to
+    the jar pool, so the large download overlaps with the asset downloads.
+
+    Args:
+        job (VersionJob): The version to process.
+        version_manifest (dict): The global version manifest.
+        object_store (ObjectStore): The store of shared asset objects.
+        jar_pool (ThreadPoolExecutor | None): The pool for client.jar stages. If
+            None, the client.jar stage runs in this thread after the assets.
+        output (ThreadOutput): The output used to capture the version's log.
+
+    Returns:
+        Future | None: The pending client.jar stage, if one was submitted.
+
+    """
+    start = time.perf_counter()
+    jar_future = None
+    with output.capture(job.metadata_log):
+        version_info: dict = next(
+            (v for v in version_manifest["versions"] if v["id"] == job.version_id), {}
+        )
+        client_manifest = None
+        if not version_info:
+            print(f"Version '{job.version_id}' not found in manifest. Skipping.\n")
+        else:
+            job.version_output_dir.mkdir(exist_ok=True)
+            client_manifest_url = version_info["url"]
+            client_manifest_sha1 = version_info.get("sha1")
+            client_manifest = fetch_json(
+                client_manifest_url,
+                MANIFEST_CACHE_DIR
+                / "versions"
+                / cache_file_name(client_manifest_url, client_manifest_sha1),
+                timeout=REQUEST_TIMEOUT,
+                expected_sha1=client_manifest_sha1,
+            )
+            if client_manifest is None:
+                print(f"Could not fetch manifest for {job.version_id}. Skipping.\n")
+                job.failed = True
+
+        if client_manifest is not None:
+            if "en_us" in LANGUAGE_LIST and jar_pool is not None:
+                # Kept on the job too, so the stage is still awaited if this one raises.
+                jar_future = jar_pool.submit(run_jar_stage, job, client_manifest, output)
+                job.jar_future = jar_future
+            download_language_assets(job, client_manifest, object_store)
+    job.metadata_time = time.perf_counter() - start
+    METRICS.observe("stage", job.metadata_time, stage="metadata")
+
+    if client_manifest is not None and "en_us" in LANGUAGE_LIST and jar_pool is None:
+        run_jar_stage(job, client_manifest, output)
+    return jar_future
+
+
+def read_journal() -> dict[str, str]:
+    """Read the versions completed by an unfinished earlier run.
+
+    The journal is ignored if it was written for a different language list.
+
+    Returns:
+        dict[str, str]: The version ID of each completed output folder.
+
+    """
+    try:
+        with open(JOURNAL_PATH, encoding="utf-8") as f:
+            journal = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if not isinstance(journal, dict) or journal.get("languages") != LANGUAGE_LIST:
+        return {}
+    return journal.get("completed", {})
+
+
+def write_journal(completed: dict[str, str]) -> None:
+    """Record the completed versions of the current run, replacing the journal atomically.
+
+    Args:
+        completed (dict[str, str]): The version ID of each completed output folder.
+
+    """
+    temp_path = JOURNAL_PATH.with_name(f"{JOURNAL_PATH.name}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"languages": LANGUAGE_LIST, "completed": completed}, f, indent=2)
+    os.replace(temp_path, JOURNAL_PATH)
+
+
+def main():
+    """Download and extract language files for all target versions.
+
+    Versions are processed concurrently. Manifests, asset indexes and language
+    assets go through one pool and client.jar downloads through another, so the
+    small requests of some versions overlap with the large downloads of others.
+    The output of each version is collected and printed as one block when the
+    version is done.
+    """
+    parser = argparse.ArgumentParser(description="Download legacy Minecraft language files.")
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Ignore the journal of an interrupted run and process every version.",
+    )
+    parser.add_argument(
+        "--serial",
+        action="store_true",
+        help="Process one version at a time, to compare against the pipelined run.",
+    )
+    args = parser.parse_args()
+
+    # The metrics are written even if the run exits early or is interrupted.
+    try:
+        OUTPUT_DIR.mkdir(exist_ok=True)
+        object_store = ObjectStore(OBJECTS_DIR)
+        configure_http(HTTP_POOL_SIZE)
+
+        version_manifest_path = OUTPUT_DIR / "version_manifest_v2.json"
+        print("Loading global version manifest...")
+        version_manifest_json = fetch_json(
+            VERSION_MANIFEST_URL, version_manifest_path, MANIFEST_TTL, timeout=REQUEST_TIMEOUT
+        )
+        if version_manifest_json is None:
+            print("Failed to fetch manifest and no local copy is available. Exiting.")
+            sys.exit()
+        print("Successfully loaded global manifest.\n")
+
+        # Versions completed by an interrupted run are skipped. Interrupted
+        # downloads of the others resume from their partial files.
+        completed = {} if args.fresh else read_journal()
+        jobs = []
+        for output_folder_name, version_id in TARGET_VERSIONS.items():
+            if completed.get(output_folder_name) == version_id:
+                print(f"Skipping {version_id} ({output_folder_name}), completed by an earlier run.")
+            else:
+                jobs.append(VersionJob(output_folder_name, version_id))
+        if len(jobs) < len(TARGET_VERSIONS):
+            print(
+                f"Resuming an interrupted run. {len(jobs)} versions left. Use --fresh to redo all.\n"
+            )
+        completed = {
+            name: version_id
+            for name, version_id in completed.items()
+            if TARGET_VERSIONS.get(name) == version_id
+        }
+        write_journal(completed)
+        metadata_workers = 1 if args.serial else MAX_CONCURRENT_DOWNLOADS
+        start = time.perf_counter()
+        output = ThreadOutput(sys.stdout)
+        with (
+            redirect_stdout(output),
+            ThreadPoolExecutor(metadata_workers) as metadata_pool,
+            ThreadPoolExecutor(MAX_CONCURRENT_JAR_DOWNLOADS) as jar_pool,
+        ):
+            pending = {
+                metadata_pool.submit(
+                    run_metadata_stage,
+                    job,
+                    version_manifest_json,
+                    object_store,
+                    None if args.serial else jar_pool,
+                    output,
+                ): job
+                for job in jobs
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = pending.pop(future)
+                    try:
+                        next_stage = future.result()
+                    except (r.RequestException, OSError, ValueError) as e:
+                        # The error goes into the log of the stage that raised it. A
+                        # client.jar stage submitted before the metadata stage failed
+                        # is still awaited, so its output and errors are reported too.
+                        job.failed = True
+                        is_jar_stage = future is job.jar_future
+                        log = job.jar_log if is_jar_stage else job.metadata_log
+                        log.write(f"An error occurred while processing the version: {e}\n")
+                        next_stage = None if is_jar_stage else job.jar_future
+                    if next_stage is not None:
+                        pending[next_stage] = job
+                        continue
+                    print(job.report())
+                    if not job.failed:
+                        completed[job.output_folder_name] = job.version_id
+                        write_journal(completed)
+        wall_time = time.perf_counter() - start
+        METRICS.count("versions", len(completed), result="completed")
+        METRICS.count("versions", len(TARGET_VERSIONS) - len(completed), result="failed")
+
+        # A complete run needs no journal. Otherwise, the next run redoes only the
+        # versions that failed.
+        failed = [name for name in TARGET_VERSIONS if name not in completed]
+        if failed:
+            print(
+                f"{len(failed)} versions did not complete: {', '.join(failed)}. Run again to retry."
+            )
+        else:
+            JOURNAL_PATH.unlink(missing_ok=True)
+
+        busy_time = sum(job.busy_time for job in jobs)
+        print(f"Processed {len(jobs)} versions in {wall_time:.1f} s.")
+        if not args.serial and wall_time > 0:
+            print(
+                f"Overlapped {busy_time:.1f} s of per-version work ({busy_time / wall_time:.1f}x). "
+                "Run with --serial to measure the sequential baseline."
+            )
+        print("\nHTTP requests by host:")
+        REQUEST_LOG.print_summary()
+    finally:
+        write_metrics(METRICS_FILE, "download_legacy")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,943 @@
+"""Concurrent downloader for Minecraft assets."""
+
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import shutil
+import statistics
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import urlsplit
+from zipfile import BadZipFile, ZipFile
+
+import requests as r
+from requests.adapters import HTTPAdapter
+
+from metrics import METRICS
+
+# The URL of the global version manifest.
+VERSION_MANIFEST_URL = "https://piston-meta.mojang.com/mc/game/version_manifest_v2.json"
+
+# The base URL of the Mojang asset server.
+RESOURCES_URL = "https://resources.download.minecraft.net"
+
+# The number of bytes read from the network and hashed at a time.
+CHUNK_SIZE = 64 * 1024
+
+# The default number of kept-alive connections per host.
+HTTP_POOL_SIZE = 8
+
+# The number of hosts whose connection pools are kept.
+HTTP_HOST_POOLS = 8
+
+# The default number of attempts for a request or download.
+RETRY_ATTEMPTS = 3
+
+# The base and the cap of the exponential backoff between attempts, in seconds.
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+# Response statuses that are worth retrying.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# The number of most recent requests kept for timing metrics.
+REQUEST_LOG_SIZE = 10000
+
+# The number of bytes first read from the end of a remote zip archive. It covers
+# the end of central directory record with the longest possible comment and the
+# ZIP64 locator in front of it.
+ZIP_TAIL_SIZE = 66 * 1024
+
+# The minimum number of bytes requested by a range read, so that the many small
+# reads of `zipfile` do not each become a request.
+RANGE_READ_AHEAD = 64 * 1024
+
+# The number of bytes allowed for the local header of a zip member besides its
+# file name: the 30 fixed bytes and any extra fields.
+ZIP_LOCAL_HEADER_ALLOWANCE = 1024
+
+# Parses a `Content-Range` header into its first byte, last byte and total size.
+CONTENT_RANGE_PATTERN = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+class DownloadTask(NamedTuple):
+    """A single file to be downloaded and verified."""
+
+    url: str
+    file_name: str
+    file_path: Path
+    expected_sha1: str
+    # Whether the file may be taken from and added to the object store.
+    shared: bool = True
+
+
+class RequestTiming(NamedTuple):
+    """The outcome and duration of one HTTP request attempt."""
+
+    url: str
+    # The response status, or None if no response was received.
+    status: int | None
+    # The zero-based attempt number.
+    attempt: int
+    # The number of seconds until the response headers arrived or the request failed.
+    seconds: float
+
+
+class RequestLog:
+    """A thread-safe record of the most recent HTTP requests, for timing metrics."""
+
+    def __init__(self, max_size: int = REQUEST_LOG_SIZE) -> None:
+        """Initialize an empty log.
+
+        Args:
+            max_size (int): The number of most recent requests to keep.
+
+        """
+        self.lock = threading.Lock()
+        self.timings: deque[RequestTiming] = deque(maxlen=max_size)
+
+    def add(self, timing: RequestTiming) -> None:
+        """Record a request attempt."""
+        with self.lock:
+            self.timings.append(timing)
+
+    def snapshot(self) -> list[RequestTiming]:
+        """Return the recorded request attempts, oldest first."""
+        with self.lock:
+            return list(self.timings)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Summarize the recorded requests by host.
+
+        Returns:
+            dict[str, dict[str, float]]: For each host, the number of requests,
+                retries and failures and the median and maximum time until the
+                response headers arrived, in seconds.
+
+        """
+        by_host: dict[str, list[RequestTiming]] = {}
+        for timing in self.snapshot():
+            by_host.setdefault(urlsplit(timing.url).netloc, []).append(timing)
+        return {
+            host: {
+                "requests": len(timings),
+                "retries": sum(timing.attempt > 0 for timing in timings),
+                "failures": sum(timing.status is None for timing in timings),
+                "median": statistics.median(timing.seconds for timing in timings),
+                "max": max(timing.seconds for timing in timings),
+            }
+            for host, timings in by_host.items()
+        }
+
+    def print_summary(self) -> None:
+        """Print the per-host request summary."""
+        for host, stats in self.summary().items():
+            print(
+                f"{host}: {stats['requests']} requests, {stats['retries']} retries, "
+                f"{stats['failures']} failures, median {stats['median'] * 1000:.0f} ms, "
+                f"max {stats['max'] * 1000:.0f} ms"
+            )
+
+
+# The timings of the requests made through `http_get`.
+REQUEST_LOG = RequestLog()
+
+_session: r.Session | None = None
+_session_lock = threading.Lock()
+
+
+def _new_session(pool_size: int) -> r.Session:
+    """Create a session that keeps up to `pool_size` connections alive per host."""
+    session = r.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_HOST_POOLS, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def configure_http(pool_size: int = HTTP_POOL_SIZE) -> None:
+    """Replace the shared HTTP session with one of the given pool size.
+
+    The session keeps connections alive and pools them per host, so repeated
+    requests to the same server skip the TCP and TLS handshakes.
+
+    Args:
+        pool_size (int): The number of connections kept per host. It should be
+            at least the number of threads downloading at the same time.
+
+    """
+    global _session
+    session = _new_session(pool_size)
+    with _session_lock:
+        previous, _session = _session, session
+    if previous is not None:
+        previous.close()
+
+
+def get_session() -> r.Session:
+    """Return the shared HTTP session, creating it with default settings if needed."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _new_session(HTTP_POOL_SIZE)
+        return _session
+
+
+def backoff_delay(attempt: int) -> float:
+    """Return a randomized delay before retrying, with exponential backoff and full jitter.
+
+    Args:
+        attempt (int): The zero-based number of the attempt that failed.
+
+    Returns:
+        float: The delay in seconds.
+
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def http_get(
+    url: str,
+    headers: dict[str, str] | None = None,
+    timeout: int = 60,
+    stream: bool = False,
+    attempts: int = RETRY_ATTEMPTS,
+) -> r.Response:
+    """Send a GET request through the shared session, retrying transient failures.
+
+    Connection errors, timeouts and the statuses in `RETRY_STATUSES` are
+    retried after `backoff_delay`. Every attempt is recorded in `REQUEST_LOG`
+    and counted in `METRICS` by host and status.
+
+    Args:
+        url (str): The URL to request.
+        headers (dict[str, str] | None): Extra request headers.
+        timeout (int): The request timeout in seconds.
+        stream (bool): If True, the body is not read until it is iterated over.
+        attempts (int): The maximum number of attempts.
+
+    Returns:
+        r.Response: The response of the last attempt, whatever its status.
+
+    Raises:
+        r.exceptions.RequestException: If the last attempt got no response.
+
+    """
+    session = get_session()
+    host = urlsplit(url).netloc
+    for attempt in range(attempts):
+        if attempt:
+            METRICS.count("http_retries", host=host)
+            time.sleep(backoff_delay(attempt - 1))
+        start = time.perf_counter()
+        try:
+            resp = session.get(url, headers=headers, timeout=timeout, stream=stream)
+        except (r.exceptions.ConnectionError, r.exceptions.Timeout):
+            elapsed = time.perf_counter() - start
+            REQUEST_LOG.add(RequestTiming(url, None, attempt, elapsed))
+            METRICS.count("http_requests", host=host, status="error")
+            METRICS.observe("http_request", elapsed, host=host)
+            if attempt + 1 == attempts:
+                raise
+            continue
+        elapsed = resp.elapsed.total_seconds()
+        REQUEST_LOG.add(RequestTiming(url, resp.status_code, attempt, elapsed))
+        METRICS.count("http_requests", host=host, status=resp.status_code)
+        METRICS.observe("http_request", elapsed, host=host)
+        if resp.status_code not in RETRY_STATUSES or attempt + 1 == attempts:
+            return resp
+        resp.close()
+    raise ValueError("attempts must be at least 1")
+
+
+class ObjectStore:
+    """A content-addressed store of verified files, laid out like the launcher's `objects/`.
+
+    Each file lives at `<root>/<first two hex digits>/<sha1>`. Files are only
+    added after their checksum has been verified, so a present object can be
+    reused by any version without touching the network.
+    """
+
+    def __init__(self, root: Path) -> None:
+        """Initialize the store.
+
+        Args:
+            root (Path): The root directory of the store.
+
+        """
+        self.root = root
+
+    def path(self, file_hash: str) -> Path:
+        """Return the location of an object in the store.
+
+        Args:
+            file_hash (str): The SHA1 hash of the object.
+
+        Returns:
+            Path: The path of the object.
+
+        """
+        return self.root / file_hash[:2] / file_hash
+
+    def has(self, file_hash: str) -> bool:
+        """Check whether an object is present in the store.
+
+        Args:
+            file_hash (str): The SHA1 hash of the object.
+
+        Returns:
+            bool: True if the object is present, False otherwise.
+
+        """
+        return self.path(file_hash).is_file()
+
+    def link(self, file_hash: str, file_path: Path) -> None:
+        """Place a stored object at the given path.
+
+        A hard link is used where possible, falling back to a copy when the
+        store and the destination are on different file systems.
+
+        Args:
+            file_hash (str): The SHA1 hash of the object.
+            file_path (Path): The destination path.
+
+        """
+        _link_or_copy(self.path(file_hash), file_path)
+
+    def add(self, file_path: Path, file_hash: str) -> None:
+        """Add a verified file to the store.
+
+        Args:
+            file_path (Path): The file to add.
+            file_hash (str): The SHA1 hash of the file.
+
+        """
+        object_path = self.path(file_hash)
+        if object_path.is_file():
+            return
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        _link_or_copy(file_path, object_path)
+
+
+def _temp_path(file_path: Path) -> Path:
+    """Name a temporary file next to a file, unique across threads and processes."""
+    return file_path.with_name(f"{file_path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    """Hard link a file to a new path, or copy it if linking is not possible.
+
+    The target is created under a temporary name and then renamed, so it is
+    replaced atomically if it already exists. A target that is already a link
+    to the source is left alone, as renaming over it would be a no-op that
+    leaves the temporary name behind.
+
+    A copy is only ever written into a file created for it, never into an
+    existing file, which could be a hard link to a stored object.
+
+    Args:
+        source (Path): The existing file.
+        target (Path): The path to create.
+
+    """
+    if target.exists() and os.path.samefile(source, target):
+        return
+    temp_path = _temp_path(target)
+    try:
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            with open(source, "rb") as src, open(temp_path, "xb") as dst:
+                shutil.copyfileobj(src, dst)
+        os.replace(temp_path, target)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def asset_url(file_hash: str, base_url: str = RESOURCES_URL) -> str:
+    """Build the download URL of an asset object from its SHA1 hash.
+
+    Args:
+        file_hash (str): The SHA1 hash of the asset.
+        base_url (str): The base URL of the asset server.
+
+    Returns:
+        str: The URL of the asset object.
+
+    """
+    return f"{base_url}/{file_hash[:2]}/{file_hash}"
+
+
+def format_size(size_in_bytes: int) -> str:
+    """Format a file size for display.
+
+    Args:
+        size_in_bytes (int): The size in bytes.
+
+    Returns:
+        str: The size with a human-readable unit.
+
+    """
+    size_mb = round(size_in_bytes / 1048576, 2)
+    size_kb = round(size_in_bytes / 1024, 2)
+    size_str = f"{size_mb} MB" if size_in_bytes > 1048576 else f"{size_kb} KB"
+    return f"{size_in_bytes} B ({size_str})"
+
+
+def get_response(
+    url: str, timeout: int = 60, stream: bool = False, attempts: int = RETRY_ATTEMPTS
+) -> r.Response | None:
+    """Send a GET request to the specified URL and return the response.
+
+    Args:
+        url (str): The URL to request.
+        timeout (int): The request timeout in seconds.
+        stream (bool): If True, the body is not read until it is iterated over.
+        attempts (int): The maximum number of attempts, see `http_get`.
+
+    Returns:
+        r.Response | None: The response object, or None if the request failed.
+
+    """
+    try:
+        resp = http_get(url, timeout=timeout, stream=stream, attempts=attempts)
+        resp.raise_for_status()
+        return resp
+    except r.exceptions.RequestException as e:
+        print(f"An error occurred during the request: {e}")
+        return None
+
+
+def _read_json(file_path: Path, expected_sha1: str | None = None) -> dict | None:
+    """Read a JSON file, returning None if it is missing, invalid or has another SHA1 hash."""
+    try:
+        data = file_path.read_bytes()
+    except OSError:
+        return None
+    if expected_sha1 is not None and hashlib.sha1(data).hexdigest() != expected_sha1:
+        return None
+    try:
+        return json.loads(data)
+    except ValueError:
+        return None
+
+
+def cache_file_name(url: str, expected_sha1: str | None = None) -> str:
+    """Name the local copy of a document so that different documents never share it.
+
+    Mojang reuses file names such as `17.json` across versions and keeps the
+    SHA1 hash in the directory of the URL, so the file name alone is not
+    enough. The name is prefixed with the expected hash, or with a hash of the
+    URL if none is known.
+
+    Args:
+        url (str): The URL of the document.
+        expected_sha1 (str | None): The SHA1 hash of the document, if known.
+
+    Returns:
+        str: The file name of the local copy.
+
+    """
+    prefix = expected_sha1 or hashlib.sha1(url.encode()).hexdigest()
+    return f"{prefix}-{url.rsplit('/', 1)[-1]}"
+
+
+def _write_atomic(file_path: Path, data: bytes) -> None:
+    """Write bytes to a file through a temporary file and an atomic rename."""
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = _temp_path(file_path)
+    try:
+        with open(temp_path, "xb") as f:
+            f.write(data)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def fetch_json(
+    url: str,
+    cache_path: Path,
+    max_age: float | None = None,
+    timeout: int = 60,
+    expected_sha1: str | None = None,
+) -> dict | None:
+    """Fetch a JSON document, keeping a local copy to avoid repeated downloads.
+
+    A cached copy younger than `max_age` seconds is used without any network
+    request. Once it is older, it is revalidated with `If-None-Match` and
+    `If-Modified-Since`, so an unchanged document costs a 304 response instead
+    of a full download. If the request fails, the cached copy is used as a
+    fallback. The validators are kept next to the copy in a `.meta` file.
+
+    Args:
+        url (str): The URL of the document.
+        cache_path (Path): The path of the local copy.
+        max_age (float | None): The number of seconds a local copy stays fresh.
+            None means the document never changes, such as the client manifests
+            and asset indexes, which are addressed by their SHA1 hash.
+        timeout (int): The request timeout in seconds.
+        expected_sha1 (str | None): The SHA1 hash of the document, if known. A
+            local copy or a response with another hash is not used.
+
+    Returns:
+        dict | None: The parsed document, or None if it is neither reachable
+            nor cached.
+
+    """
+    meta_path = cache_path.with_name(f"{cache_path.name}.meta")
+    meta = _read_json(meta_path) or {}
+    cached = _read_json(cache_path, expected_sha1)
+
+    if cached is not None and (
+        max_age is None or time.time() - meta.get("fetched_at", 0) < max_age
+    ):
+        METRICS.count("json_documents", source="cache")
+        return cached
+
+    headers = {}
+    if cached is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        resp = http_get(url, headers=headers, timeout=timeout)
+        if cached is not None and resp.status_code == 304:
+            meta["fetched_at"] = time.time()
+            _write_atomic(meta_path, json.dumps(meta).encode())
+            METRICS.count("json_documents", source="revalidated")
+            return cached
+        resp.raise_for_status()
+        actual_sha1 = hashlib.sha1(resp.content).hexdigest()
+        if expected_sha1 is not None and actual_sha1 != expected_sha1:
+            raise ValueError(
+                f"SHA1 mismatch for {url}: expected {expected_sha1}, got {actual_sha1}"
+            )
+        document = resp.json()
+    except (r.exceptions.RequestException, ValueError) as e:
+        print(f"An error occurred during the request: {e}")
+        if cached is not None:
+            print(f"Using the existing local copy of '{cache_path.name}'.")
+            METRICS.count("json_documents", source="fallback")
+        return cached
+
+    _write_atomic(cache_path, resp.content)
+    meta = {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "fetched_at": time.time(),
+    }
+    _write_atomic(meta_path, json.dumps(meta).encode())
+    METRICS.count("json_documents", source="network")
+    return document
+
+
+class RemoteZipError(Exception):
+    """Raised when a remote zip archive cannot be read with range requests."""
+
+
+class HTTPRangeFile(io.RawIOBase):
+    """A read-only, seekable file over a remote resource, read with HTTP Range requests.
+
+    Fetched ranges are kept, and every request reads at least
+    `RANGE_READ_AHEAD` bytes, so reading a zip archive's central directory and
+    one member takes only a few requests. The end of the resource is fetched
+    when the file is opened, which also tells its size.
+    """
+
+    def __init__(self, url: str, timeout: int = 60) -> None:
+        """Open the remote resource.
+
+        Args:
+            url (str): The URL of the resource.
+            timeout (int): The request timeout in seconds.
+
+        Raises:
+            RemoteZipError: If the request fails or the server ignores ranges.
+
+        """
+        super().__init__()
+        self.url = url
+        self.timeout = timeout
+        self.position = 0
+        self.request_count = 0
+        self.bytes_fetched = 0
+        self.blocks: list[tuple[int, bytes]] = []
+        start, data, self.size = self._fetch(f"bytes=-{ZIP_TAIL_SIZE}")
+        self.blocks.append((start, data))
+
+    def _fetch(self, byte_range: str) -> tuple[int, bytes, int]:
+        """Request a range of the resource.
+
+        Args:
+            byte_range (str): The value of the `Range` header.
+
+        Returns:
+            tuple[int, bytes, int]: The offset of the data, the data, and the
+                total size of the resource.
+
+        Raises:
+            RemoteZipError: If the request fails or the server ignores ranges.
+
+        """
+        try:
+            resp = http_get(self.url, headers={"Range": byte_range}, timeout=self.timeout)
+            resp.raise_for_status()
+        except r.exceptions.RequestException as e:
+            raise RemoteZipError(f"Range request failed: {e}") from e
+        content_range = CONTENT_RANGE_PATTERN.fullmatch(resp.headers.get("Content-Range", ""))
+        if resp.status_code != 206 or content_range is None:
+            resp.close()
+            raise RemoteZipError("The server does not support range requests.")
+        self.request_count += 1
+        self.bytes_fetched += len(resp.content)
+        return int(content_range[1]), resp.content, int(content_range[3])
+
+    def prefetch(self, start: int, length: int) -> None:
+        """Fetch a range in one request ahead of the reads that will need it.
+
+        Args:
+            start (int): The offset of the range.
+            length (int): The length of the range in bytes.
+
+        """
+        end = min(start + length, self.size)
+        if start >= end or any(s <= start and end <= s + len(d) for s, d in self.blocks):
+            return
+        self.blocks.append(self._fetch(f"bytes={start}-{end - 1}")[:2])
+
+    def readable(self) -> bool:
+        """Return True, as the file can be read."""
+        return True
+
+    def seekable(self) -> bool:
+        """Return True, as the file supports random access."""
+        return True
+
+    def tell(self) -> int:
+        """Return the current position."""
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Move to a new position, without any request.
+
+        Args:
+            offset (int): The offset relative to `whence`.
+            whence (int): `io.SEEK_SET`, `io.SEEK_CUR` or `io.SEEK_END`.
+
+        Returns:
+            int: The new position.
+
+        """
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.size}[whence]
+        self.position = max(0, base + offset)
+        return self.position
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:
+        """Read bytes at the current position, fetching them if needed.
+
+        Args:
+            buffer (bytearray | memoryview): The buffer to fill.
+
+        Returns:
+            int: The number of bytes read, 0 at the end of the resource.
+
+        """
+        size = min(len(buffer), self.size - self.position)
+        if size <= 0:
+            return 0
+        end = self.position + size
+        for start, data in self.blocks:
+            if start <= self.position and end <= start + len(data):
+                break
+        else:
+            last = min(self.position + max(size, RANGE_READ_AHEAD), self.size) - 1
+            start, data, _ = self._fetch(f"bytes={self.position}-{last}")
+            self.blocks.append((start, data))
+        offset = self.position - start
+        buffer[:size] = data[offset : offset + size]
+        self.position = end
+        return size
+
+
+def download_zip_member(url: str, members: list[tuple[str, Path]], timeout: int = 60) -> str | None:
+    """Extract one member of a remote zip archive without downloading the whole archive.
+
+    Only the end of the archive, its central directory and the member itself
+    are requested. The member is checked against the CRC-32 recorded in the
+    archive before it is written.
+
+    Args:
+        url (str): The URL of the archive.
+        members (list[tuple[str, Path]]): Candidate members and the path to write
+            each to. The first one present in the archive is extracted.
+        timeout (int): The request timeout in seconds.
+
+    Returns:
+        str | None: The name of the extracted member, or None if the archive
+            holds none of the candidates.
+
+    Raises:
+        RemoteZipError: If the archive cannot be read with range requests or the
+            member is corrupt. Downloading the whole archive is the fallback.
+
+    """
+    try:
+        with HTTPRangeFile(url, timeout) as remote, ZipFile(remote) as archive:
+            names = set(archive.namelist())
+            for member_name, file_path in members:
+                if member_name in names:
+                    info = archive.getinfo(member_name)
+                    remote.prefetch(
+                        info.header_offset,
+                        ZIP_LOCAL_HEADER_ALLOWANCE
+                        + len(info.orig_filename.encode())
+                        + info.compress_size,
+                    )
+                    data = archive.read(member_name)
+                    break
+            else:
+                return None
+            METRICS.count("range_requests", remote.request_count, host=urlsplit(url).netloc)
+            METRICS.count("range_bytes", remote.bytes_fetched, host=urlsplit(url).netloc)
+            fetched = format_size(remote.bytes_fetched)
+            total = format_size(remote.size)
+            print(
+                f"Read '{member_name}' with {remote.request_count} range requests "
+                f"({fetched} of {total})."
+            )
+    # A corrupt or truncated deflate stream raises zlib.error or EOFError, not OSError.
+    except (BadZipFile, OSError, EOFError, zlib.error) as e:
+        raise RemoteZipError(f"Could not read the remote archive: {e}") from e
+    _write_atomic(file_path, data)
+    return member_name
+
+
+def stream_to_file(response: r.Response, file_path: Path, append: bool = False) -> tuple[str, int]:
+    """Write a streamed response body to a file while hashing it.
+
+    Only one chunk is held in memory at a time, so peak memory does not depend
+    on the size of the file.
+
+    Args:
+        response (r.Response): A response opened with `stream=True`.
+        file_path (Path): The path to write the body to.
+        append (bool): If True, the body is appended to the existing file, and
+            the digest and size cover the whole file.
+
+    Returns:
+        tuple[str, int]: The SHA1 hex digest and the size of the file in bytes.
+
+    """
+    sha1 = hashlib.sha1()
+    size = 0
+    if append:
+        with open(file_path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                sha1.update(chunk)
+                size += len(chunk)
+    existing = size
+    with open(file_path, "ab" if append else "wb") as f:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            sha1.update(chunk)
+            f.write(chunk)
+            size += len(chunk)
+    METRICS.count("download_bytes", size - existing, host=urlsplit(response.url).netloc)
+    return sha1.hexdigest(), size
+
+
+def _partial_offset(part_path: Path) -> int:
+    """Return the size of a partial download, or 0 if there is none."""
+    try:
+        return part_path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _has_sha1(file_path: Path, expected_sha1: str) -> bool:
+    """Check whether a file exists and has the given SHA1 hash."""
+    try:
+        with open(file_path, "rb") as f:
+            return hashlib.file_digest(f, "sha1").hexdigest() == expected_sha1
+    except FileNotFoundError:
+        return False
+
+
+def download_file(
+    url: str,
+    file_name: str,
+    file_path: Path,
+    expected_sha1: str,
+    attempts: int = RETRY_ATTEMPTS,
+    timeout: int = 60,
+    store: ObjectStore | None = None,
+) -> bool:
+    """Download a file, verify its SHA1 checksum, and retry on failure.
+
+    The body is streamed into a `.part` file next to the destination and
+    hashed as it arrives. The partial file is renamed to `file_path` only once
+    its checksum matches, so the destination never holds a partial or corrupt
+    download.
+
+    An interrupted transfer leaves the partial file behind, and the next
+    attempt, in this run or a later one, continues it with a Range request. If
+    the server ignores the range, the download starts over. A partial file
+    that fails the checksum is discarded.
+
+    If an object store is given, it is checked first and the file is taken from
+    it without any network request. Otherwise, a destination that already
+    holds the expected file is kept as it is. Newly verified files are added to
+    the store.
+
+    Args:
+        url (str): The URL to download from.
+        file_name (str): The name of the file for logging purposes.
+        file_path (Path): The path to save the file.
+        expected_sha1 (str): The expected SHA1 hash of the file.
+        attempts (int): The maximum number of download attempts.
+        timeout (int): The request timeout in seconds.
+        store (ObjectStore | None): The object store to reuse and fill.
+
+    Returns:
+        bool: True if the file was downloaded and verified, False otherwise.
+
+    """
+    if store is not None and store.has(expected_sha1):
+        store.link(expected_sha1, file_path)
+        print(f"Using cached object for {file_name} ({expected_sha1}).\n")
+        METRICS.count("object_store_hits")
+        return True
+    if _has_sha1(file_path, expected_sha1):
+        print(f"'{file_name}' is already up to date ({expected_sha1}).\n")
+        METRICS.count("existing_file_hits")
+        if store is not None:
+            store.add(file_path, expected_sha1)
+        return True
+
+    host = urlsplit(url).netloc
+    start = time.perf_counter()
+    part_path = file_path.with_name(f"{file_path.name}.part")
+    for attempt in range(attempts):
+        if attempt:
+            time.sleep(backoff_delay(attempt - 1))
+        offset = _partial_offset(part_path)
+        headers = {"Range": f"bytes={offset}-"} if offset else None
+        # Each attempt covers the request and the checksum, so the request is not
+        # retried on its own as well.
+        try:
+            response = http_get(url, headers=headers, timeout=timeout, stream=True, attempts=1)
+            if response.status_code == 416:
+                # The partial file is at least as long as the file. It is checked
+                # as is below.
+                response.close()
+                response = None
+            else:
+                response.raise_for_status()
+        except r.exceptions.RequestException as e:
+            print(f"An error occurred during the request: {e}")
+            print(f"Download failed for '{file_name}' (Attempt {attempt + 1}/{attempts}).\n")
+            continue
+
+        if response is None:
+            with open(part_path, "rb") as f:
+                actual_sha1 = hashlib.file_digest(f, "sha1").hexdigest()
+            size_in_bytes = offset
+        else:
+            content_range = CONTENT_RANGE_PATTERN.fullmatch(
+                response.headers.get("Content-Range", "")
+            )
+            resume = (
+                response.status_code == 206
+                and content_range is not None
+                and int(content_range[1]) == offset
+            )
+            if resume:
+                print(f"Resuming '{file_name}' from {format_size(offset)}...")
+            elif offset:
+                print(f"The server ignored the range. Restarting '{file_name}'...")
+            try:
+                with response:
+                    actual_sha1, size_in_bytes = stream_to_file(response, part_path, resume)
+            except r.exceptions.RequestException as e:
+                print(f"Download of '{file_name}' was interrupted: {e}\n")
+                continue
+
+        if actual_sha1 == expected_sha1:
+            os.replace(part_path, file_path)
+            if store is not None:
+                store.add(file_path, expected_sha1)
+            METRICS.observe("download", time.perf_counter() - start, host=host)
+            size_str = format_size(size_in_bytes)
+            print(f"SHA1 checksum consistent for {file_name}. File size: {size_str}\n")
+            return True
+
+        print(
+            f"SHA1 checksum mismatch for {file_name}. "
+            f"Expected {expected_sha1}, got {actual_sha1} (Attempt {attempt + 1}/{attempts}).\n"
+        )
+        part_path.unlink(missing_ok=True)
+        METRICS.count("checksum_mismatches", host=host)
+
+    # A partial file left by an interruption is kept, so a later run can resume it.
+    print(f"Failed to download '{file_name}' correctly after {attempts} attempts.\n")
+    METRICS.count("download_failures", host=host)
+    return False
+
+
+def download_files(
+    tasks: list[DownloadTask],
+    max_workers: int = 8,
+    store: ObjectStore | None = None,
+    on_complete: Callable[[DownloadTask, bool], object] | None = None,
+) -> dict[Path, bool]:
+    """Download several files concurrently using a bounded worker pool.
+
+    Each task goes through `download_file`, so checksum verification and retries
+    behave exactly as in a serial run. Only tasks marked as shared use the
+    store. With `max_workers` set to 1, the tasks are processed one after
+    another in the given order.
+
+    Args:
+        tasks (list[DownloadTask]): The files to download.
+        max_workers (int): The maximum number of concurrent downloads.
+        store (ObjectStore | None): The object store to reuse and fill.
+        on_complete (Callable[[DownloadTask, bool], object] | None): Called from
+            the worker thread with each task and its result as soon as it
+            finishes, so the file can be processed while others still download.
+
+    Returns:
+        dict[Path, bool]: Whether each destination path was downloaded successfully.
+
+    """
+
+    def run(task: DownloadTask) -> bool:
+        ok = download_file(
+            task.url,
+            task.file_name,
+            task.file_path,
+            task.expected_sha1,
+            store=store if task.shared else None,
+        )
+        if on_complete is not None:
+            on_complete(task, ok)
+        return ok
+
+    if max_workers <= 1 or len(tasks) <= 1:
+        return {task.file_path: run(task) for task in tasks}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(run, tasks)
+        return {task.file_path: ok for task, ok in zip(tasks, results, strict=True)}
@@ -1,9 +1,54 @@
 """Minecraft Translation Extractor."""
 
+import argparse
+import hashlib
+import json
+import os
 import re
+import time
+from collections.abc import Iterable, Mapping
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import compress
+from operator import itemgetter
+from pathlib import Path
 
-from base import LANGUAGE_LIST, OUTPUT_DIR
-from init import language_data
+from base import (
+    LANGUAGE_LIST,
+    LEGACY_VERSIONS_DIR,
+    METRICS_FILE,
+    OUTPUT_DIR,
+    VERSIONS_DIR,
+    get_lang_dir,
+)
+from init import (
+    check_language_files,
+    find_language_file,
+    get_language_data,
+    load_language_file,
+    version_dirs,
+)
+from metrics import METRICS, write_metrics
+
+# The version of the extraction rules and output format. Bump it when they change
+# in a way the rule constants below do not show, so existing outputs are rebuilt.
+RULES_VERSION = 1
+
+# The file in the output directory recording the inputs of the current outputs.
+MANIFEST_FILE_NAME = "extract_manifest.json"
+
+# The files written by aligned extraction besides the per-language files.
+COVERAGE_FILE_NAME = "coverage.json"
+TSV_FILE_NAME = "translations.tsv"
+
+# The output options of plain extraction, as recorded in the manifest.
+DEFAULT_OPTIONS: dict[str, object] = {"aligned": False, "placeholder": None}
+
+# Written by aligned extraction in place of a translation a language does not have.
+MISSING_PLACEHOLDER = "<missing>"
+
+# Line breaks and tabs in values are escaped in aligned output, so every key
+# takes exactly one line.
+LINE_ESCAPES = str.maketrans({"\\": "\\\\", "\n": "\\n", "\r": "\\r", "\t": "\\t"})
 
 # Prefixes for keys that should generally be included.
 VALID_PREFIXES: tuple[str, ...] = (
@@ -39,6 +84,27 @@ EXCLUDED_KEYS: set[str] = {
 }
 
 
+def _alternatives(strings: Iterable[str]) -> str:
+    """Join literal strings into a regex alternation."""
+    return "|".join(re.escape(string) for string in strings)
+
+
+# All rules of `is_valid_key` in one pattern, which matches exactly the valid keys.
+# The alternatives and lookaheads mirror the rules in order, so a key is decided
+# by a single match instead of several passes.
+VALID_KEY_PATTERN = re.compile(
+    # Rule 1: Advancement titles.
+    rf"{ADVANCEMENT_TITLE_PATTERN.pattern}"
+    # Rule 2: A valid prefix.
+    rf"|(?={_alternatives(VALID_PREFIXES)})"
+    # Rule 3: Not an excluded key or a pottery shard.
+    rf"(?!(?:{_alternatives(sorted(EXCLUDED_KEYS))})\Z)"
+    r"(?!(?s:.*)pottery_shard)"
+    # Rules 4 and 5: An item effect, or not a hierarchical container key.
+    rf"(?:{ITEM_EFFECT_PATTERN.pattern}|(?!{INVALID_HIERARCHICAL_KEY_PATTERN.pattern}))"
+)
+
+
 def is_valid_key(key: str) -> bool:
     """Determine if a localization key is valid for extraction based on a set of rules.
 
@@ -72,28 +138,609 @@ def is_valid_key(key: str) -> bool:
     return True
 
 
-OUTPUT_DIR.mkdir(exist_ok=True)
+def classify_keys(keys: Iterable[str]) -> list[bool]:
+    """Decide for each of several keys whether it is valid for extraction.
 
-# Filter translations based on valid keys.
-output_translations: dict[str, list[str]] = {
-    lang_code: [value for key, value in data.items() if is_valid_key(key)]
-    for lang_code, data in language_data.items()
-}
+    Gives the same result as calling `is_valid_key` on each key.
+
+    Args:
+        keys (Iterable[str]): The localization keys.
+
+    Returns:
+        list[bool]: A mask with True for each valid key, in the order of the keys.
+
+    """
+    match = VALID_KEY_PATTERN.match
+    return [match(key) is not None for key in keys]
+
+
+def filter_translations(
+    language_data: Mapping[str, dict[str, str]],
+) -> tuple[list[str], dict[str, list[str]]]:
+    """Filter the keys and translations of every language by `is_valid_key`.
+
+    The keys of en_us are classified once. Languages with the same keys in the
+    same order, which is the usual case, are filtered by applying that mask by
+    position. Keys only found in other languages are classified as needed.
+
+    Args:
+        language_data (Mapping[str, dict[str, str]]): The translations of each language.
+
+    Returns:
+        tuple[list[str], dict[str, list[str]]]: The valid keys of en_us and the
+            translations of the valid keys in each language.
+
+    """
+    en_us_keys = tuple(language_data.get("en_us", {}))
+    en_us_mask = classify_keys(en_us_keys)
+    decisions = dict(zip(en_us_keys, en_us_mask))
+    match = VALID_KEY_PATTERN.match
+
+    # Filter translations based on valid keys.
+    output_translations: dict[str, list[str]] = {}
+    for lang_code, data in language_data.items():
+        items = list(data.items())
+        keys = tuple(map(itemgetter(0), items))
+        if keys == en_us_keys:
+            mask = en_us_mask
+        else:
+            mask = [
+                valid if (valid := decisions.get(key)) is not None else match(key) is not None
+                for key in keys
+            ]
+        output_translations[lang_code] = list(compress(map(itemgetter(1), items), mask))
+
+    # Filter the keys themselves.
+    output_keys: list[str] = list(compress(en_us_keys, en_us_mask))
+    return output_keys, output_translations
+
+
+def align_translations(
+    language_data: Mapping[str, Mapping[str, str]],
+) -> tuple[list[str], dict[str, list[str | None]]]:
+    """Look up the valid en_us keys in every language.
+
+    Unlike `filter_translations`, every language gets one entry per valid
+    en_us key, in the order of en_us, whatever keys the language itself has.
+
+    Args:
+        language_data (Mapping[str, Mapping[str, str]]): The translations of each language.
+
+    Returns:
+        tuple[list[str], dict[str, list[str | None]]]: The valid keys of en_us,
+            and the translation of each of them in each language, or None
+            where the language lacks the key.
+
+    """
+    en_us_keys = list(language_data.get("en_us", {}))
+    output_keys = list(compress(en_us_keys, classify_keys(en_us_keys)))
+    columns = {
+        lang_code: list(map(data.get, output_keys)) for lang_code, data in language_data.items()
+    }
+    return output_keys, columns
+
+
+def coverage_report(
+    output_keys: list[str], columns: dict[str, list[str | None]]
+) -> dict[str, dict]:
+    """Count the translated and missing keys of each language.
+
+    Args:
+        output_keys (list[str]): The valid keys of en_us.
+        columns (dict[str, list[str | None]]): The aligned translations of each language.
+
+    Returns:
+        dict[str, dict]: The number of translated and missing keys, the share
+            of translated keys and the missing keys of each language.
+
+    """
+    report = {}
+    for lang_code, column in columns.items():
+        missing_keys = list(compress(output_keys, (value is None for value in column)))
+        translated = len(column) - len(missing_keys)
+        report[lang_code] = {
+            "translated": translated,
+            "missing": len(missing_keys),
+            "coverage": round(translated / len(column), 4) if column else 1.0,
+            "missing_keys": missing_keys,
+        }
+    return report
+
+
+def format_aligned(column: list[str | None], placeholder: str) -> list[str]:
+    """Prepare aligned translations for line-based output.
+
+    Args:
+        column (list[str | None]): The aligned translations of a language.
+        placeholder (str): The text written for missing translations.
+
+    Returns:
+        list[str]: One escaped line per key.
+
+    """
+    lines = []
+    for value in column:
+        if value is None:
+            value = placeholder
+        # Most values have nothing to escape, which is cheaper to check than to translate.
+        elif not value.isprintable() or "\\" in value:
+            value = value.translate(LINE_ESCAPES)
+        lines.append(value)
+    return lines
+
+
+def write_text_atomic(file_path: Path, text: str) -> None:
+    """Write a text file through a temporary file and an atomic rename.
+
+    Readers see either the old or the new file, never a partly written one.
+
+    Args:
+        file_path (Path): The path of the file.
+        text (str): The content of the file.
+
+    """
+    temp_path = file_path.with_name(f"{file_path.name}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, file_path)
+
+
+def write_output(
+    output_keys: list[str],
+    output_translations: dict[str, list[str]],
+    lang_list: list[str],
+    output_dir: Path,
+    write_keys: bool = True,
+) -> None:
+    """Write the filtered keys and translations to text files.
+
+    Args:
+        output_keys (list[str]): The filtered keys.
+        output_translations (dict[str, list[str]]): The filtered translations of each language.
+        lang_list (list[str]): The languages to write.
+        output_dir (Path): The directory to write the files to.
+        write_keys (bool): If False, key.txt is left as it is.
+
+    """
+    output_dir.mkdir(exist_ok=True)
+
+    # Write filtered translations to .txt files, each with a final newline.
+    for lang_name in lang_list:
+        output_file = output_dir / f"{lang_name}.txt"
+        write_text_atomic(output_file, "\n".join(output_translations.get(lang_name, [])) + "\n")
+
+    # Write filtered keys to key.txt.
+    if write_keys:
+        write_text_atomic(output_dir / "key.txt", "\n".join(output_keys) + "\n")
+
+
+def write_aligned_output(
+    output_keys: list[str],
+    columns: dict[str, list[str | None]],
+    lang_list: list[str],
+    output_dir: Path,
+    placeholder: str,
+    write_keys: bool = True,
+) -> None:
+    """Write aligned translations, where line N of every file belongs to line N of key.txt.
+
+    Args:
+        output_keys (list[str]): The valid keys of en_us.
+        columns (dict[str, list[str | None]]): The aligned translations of each language.
+        lang_list (list[str]): The languages to write.
+        output_dir (Path): The directory to write the files to.
+        placeholder (str): The text written for missing translations.
+        write_keys (bool): If False, key.txt is left as it is.
+
+    """
+    output_dir.mkdir(exist_ok=True)
+    for lang_name in lang_list:
+        lines = format_aligned(columns[lang_name], placeholder)
+        write_text_atomic(output_dir / f"{lang_name}.txt", "\n".join(lines) + "\n")
+    if write_keys:
+        write_text_atomic(output_dir / "key.txt", "\n".join(output_keys) + "\n")
+
+
+def write_tsv(
+    output_keys: list[str],
+    columns: dict[str, list[str | None]],
+    lang_list: list[str],
+    file_path: Path,
+    placeholder: str,
+) -> None:
+    """Write aligned translations as one table with a column per language.
+
+    Args:
+        output_keys (list[str]): The valid keys of en_us.
+        columns (dict[str, list[str | None]]): The aligned translations of each language.
+        lang_list (list[str]): The languages to write, in column order.
+        file_path (Path): The path of the TSV file.
+        placeholder (str): The text written for missing translations.
+
+    """
+    table = [output_keys, *(format_aligned(columns[lang], placeholder) for lang in lang_list)]
+    rows = ["\t".join(row) for row in zip(*table, strict=True)]
+    write_text_atomic(file_path, "\n".join(["\t".join(["key", *lang_list]), *rows]) + "\n")
+
+
+def print_coverage(report: dict[str, dict]) -> None:
+    """Print the coverage of each language as a table."""
+    print("Coverage of the valid en_us keys:")
+    for lang_code, entry in report.items():
+        print(
+            f"  {lang_code:<8}{entry['coverage']:>9.2%}"
+            f"  ({entry['translated']} translated, {entry['missing']} missing)"
+        )
+
+
+def rules_fingerprint() -> str:
+    """Identify the extraction rules, so outputs are rebuilt when they change.
+
+    Returns:
+        str: The rules version and a hash of the compiled rule pattern.
+
+    """
+    pattern_hash = hashlib.sha1(VALID_KEY_PATTERN.pattern.encode()).hexdigest()
+    return f"{RULES_VERSION}:{pattern_hash}"
+
+
+def read_manifest(output_dir: Path) -> dict:
+    """Read the extraction manifest of an output directory.
+
+    Args:
+        output_dir (Path): The output directory.
+
+    Returns:
+        dict: The manifest, or an empty one if it is missing or unreadable.
+
+    """
+    try:
+        with open(output_dir / MANIFEST_FILE_NAME, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def fingerprint_inputs(lang_list: list[str], lang_dir: Path, manifest: dict) -> dict[str, dict]:
+    """Record the size, modification time and SHA1 hash of each language file.
+
+    A file whose size and modification time match the manifest is not hashed
+    again, and its recorded hash is reused.
+
+    Args:
+        lang_list (list[str]): The language codes.
+        lang_dir (Path): The directory containing language files.
+        manifest (dict): The previous manifest.
+
+    Returns:
+        dict[str, dict]: The fingerprint of each language file.
+
+    """
+    previous_inputs = manifest.get("inputs", {})
+    inputs = {}
+    for lang_code in lang_list:
+        lang_file = find_language_file(lang_dir, lang_code)
+        stat = lang_file.stat()
+        fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        previous = previous_inputs.get(lang_code, {})
+        if all(previous.get(name) == value for name, value in fingerprint.items()):
+            fingerprint["sha1"] = previous.get("sha1")
+        else:
+            with open(lang_file, "rb") as f:
+                fingerprint["sha1"] = hashlib.file_digest(f, "sha1").hexdigest()
+        inputs[lang_code] = fingerprint
+    return inputs
+
+
+def stale_languages(
+    lang_list: list[str], inputs: dict[str, dict], manifest: dict, output_dir: Path
+) -> list[str]:
+    """Find the languages whose output files need to be regenerated.
+
+    Args:
+        lang_list (list[str]): The language codes.
+        inputs (dict[str, dict]): The current fingerprint of each language file.
+        manifest (dict): The manifest of the existing outputs.
+        output_dir (Path): The output directory.
+
+    Returns:
+        list[str]: The languages whose input or rules changed or whose output is missing.
+
+    """
+    if manifest.get("rules") != rules_fingerprint():
+        return list(lang_list)
+    previous_inputs = manifest.get("inputs", {})
+    return [
+        lang_code
+        for lang_code in lang_list
+        if previous_inputs.get(lang_code, {}).get("sha1") != inputs[lang_code]["sha1"]
+        or not (output_dir / f"{lang_code}.txt").exists()
+    ]
+
+
+def extract_language(
+    lang_file: Path, lang_code: str, output_dir: Path, write_keys: bool
+) -> tuple[int, float]:
+    """Extract one language file on its own, as a task of bulk extraction.
+
+    Gives the same output as `filter_translations` and `write_output` do for
+    the language, as every language is filtered by its own keys.
+
+    Args:
+        lang_file (Path): The language file.
+        lang_code (str): The language code.
+        output_dir (Path): The directory to write the output to.
+        write_keys (bool): If True, key.txt is written from this language's keys.
+
+    Returns:
+        tuple[int, float]: The number of keys read and the CPU seconds spent.
+
+    """
+    start = time.process_time()
+    data = load_language_file(lang_file)
+    keys = list(data)
+    mask = classify_keys(keys)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    write_text_atomic(
+        output_dir / f"{lang_code}.txt", "\n".join(compress(data.values(), mask)) + "\n"
+    )
+    if write_keys:
+        write_text_atomic(output_dir / "key.txt", "\n".join(compress(keys, mask)) + "\n")
+    return len(keys), time.process_time() - start
+
+
+def bulk_manifest(inputs: dict[str, dict]) -> dict:
+    """Return the manifest of a version extracted one language at a time.
+
+    Args:
+        inputs (dict[str, dict]): The fingerprints of the version's language files.
+
+    Returns:
+        dict: The manifest, with the default options.
+
+    """
+    return {"rules": rules_fingerprint(), "options": DEFAULT_OPTIONS, "inputs": inputs}
+
+
+def extract_all_versions(
+    versions_dirs: list[Path], output_root: Path, lang_list: list[str], force: bool, workers: int
+) -> None:
+    """Extract every version under some directories, one language per process task.
+
+    Each version is written to its own directory under the output root, with
+    its own manifest, so languages that did not change are skipped. A version's
+    manifest is written once all of its languages are done. Directories that
+    do not exist are skipped, and a version found in several directories is
+    taken from the first.
+
+    Args:
+        versions_dirs (list[Path]): The directories of versions.
+        output_root (Path): The directory to write each version's output to.
+        lang_list (list[str]): The languages to extract, where a version has them.
+        force (bool): If True, every output is regenerated.
+        workers (int): The number of worker processes.
+
+    """
+    # Each task is a language file, its code, its output directory and whether
+    # it writes key.txt.
+    tasks: list[tuple[Path, str, Path, bool]] = []
+    manifests: dict[Path, dict] = {}
+    pending: dict[Path, int] = {}
+    for version_dir in (
+        version_dir
+        for versions_dir in versions_dirs
+        if versions_dir.is_dir()
+        for version_dir in version_dirs(versions_dir)
+    ):
+        output_dir = output_root / version_dir.name
+        if output_dir in manifests:
+            continue
+        lang_files = {lang: find_language_file(version_dir, lang) for lang in lang_list}
+        langs = [lang for lang, lang_file in lang_files.items() if lang_file.is_file()]
+        manifest = {} if force else read_manifest(output_dir)
+        inputs = fingerprint_inputs(langs, version_dir, manifest)
+        stale = stale_languages(langs, inputs, manifest, output_dir)
+        if manifest.get("options", DEFAULT_OPTIONS) != DEFAULT_OPTIONS:
+            stale = langs
+        if "en_us" in langs and "en_us" not in stale and not (output_dir / "key.txt").exists():
+            stale.append("en_us")
+        tasks += [(lang_files[lang], lang, output_dir, lang == "en_us") for lang in stale]
+        manifests[output_dir] = bulk_manifest(inputs)
+        pending[output_dir] = len(stale)
+
+    print(f"Extracting {len(tasks)} language files of {len(manifests)} versions...")
+    # The largest files go first, so no worker is left with a long task at the end.
+    tasks.sort(key=lambda task: task[0].stat().st_size, reverse=True)
+    total_keys = 0
+    cpu_time = 0.0
+    failed: set[Path] = set()
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(extract_language, *task): task for task in tasks}
+        for future in as_completed(futures):
+            lang_file, _, output_dir, _ = futures[future]
+            try:
+                key_count, elapsed = future.result()
+            except (OSError, ValueError) as e:
+                print(f"Failed to extract {lang_file}: {e}")
+                failed.add(output_dir)
+                METRICS.count("extract_failures")
+            else:
+                total_keys += key_count
+                cpu_time += elapsed
+                # The workers' own metrics stay in their processes, so the task
+                # is recorded here with the CPU time it reported.
+                METRICS.observe("extract_language_cpu", elapsed)
+                METRICS.count("keys_read", key_count)
+            pending[output_dir] -= 1
+            if not pending[output_dir] and output_dir not in failed:
+                print(f"Extracted {output_dir.name}.")
+    wall_time = time.perf_counter() - start
+    METRICS.observe("stage", wall_time, stage="extract_all")
+
+    # Versions with nothing to do get their manifest too, recording new hashes.
+    for output_dir, manifest in manifests.items():
+        if output_dir not in failed and manifest != read_manifest(output_dir):
+            output_dir.mkdir(parents=True, exist_ok=True)
+            text = json.dumps(manifest, indent=2) + "\n"
+            write_text_atomic(output_dir / MANIFEST_FILE_NAME, text)
+
+    print(f"\nExtracted {len(tasks)} files of {len(manifests)} versions in {wall_time:.2f} s.")
+    if tasks:
+        print(
+            f"{total_keys} keys at {total_keys / wall_time:,.0f} keys/s with {workers} "
+            f"processes on {os.cpu_count()} cores; {cpu_time:.2f} s of CPU time "
+            f"({cpu_time / wall_time:.1f}x the wall time)."
+        )
+    if failed:
+        names = ", ".join(sorted(output_dir.name for output_dir in failed))
+        print(f"Failed versions, redone on the next run: {names}")
+
+
+def main() -> None:
+    """Extract the translations of the configured version.
+
+    Only the outputs of languages whose files or rules changed since the last
+    run are regenerated, unless `--force` is given.
+    """
+    parser = argparse.ArgumentParser(description="Extract Minecraft translations.")
+    parser.add_argument(
+        "--force", action="store_true", help="Regenerate every output, even if it is up to date."
+    )
+    parser.add_argument(
+        "--aligned",
+        action="store_true",
+        help=(
+            "Write one line per valid en_us key in every language, with a placeholder "
+            f"for missing translations, and a coverage report in {COVERAGE_FILE_NAME}."
+        ),
+    )
+    parser.add_argument(
+        "--placeholder",
+        default=MISSING_PLACEHOLDER,
+        help="The text written for missing translations in aligned output.",
+    )
+    parser.add_argument(
+        "--tsv",
+        action="store_true",
+        help=f"With --aligned, also write every language as a column of {TSV_FILE_NAME}.",
+    )
+    parser.add_argument(
+        "--all-versions",
+        action="store_true",
+        help=(
+            f"Extract every version in '{VERSIONS_DIR.name}' and "
+            f"'{LEGACY_VERSIONS_DIR.name}' to its own directory "
+            f"in '{OUTPUT_DIR.name}', spread across processes."
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="The number of processes for --all-versions (default: the number of cores).",
+    )
+    args = parser.parse_args()
+    if args.tsv and not args.aligned:
+        parser.error("--tsv requires --aligned")
+    if args.all_versions and args.aligned:
+        parser.error("--all-versions does not support --aligned")
+
+    # The metrics are written even if the extraction fails or is interrupted.
+    try:
+        if args.all_versions:
+            extract_all_versions(
+                [VERSIONS_DIR, LEGACY_VERSIONS_DIR],
+                OUTPUT_DIR,
+                LANGUAGE_LIST,
+                args.force,
+                args.jobs,
+            )
+            return
+
+        lang_dir = get_lang_dir()
+        check_language_files(LANGUAGE_LIST, lang_dir)
+        manifest = {} if args.force else read_manifest(OUTPUT_DIR)
+        with METRICS.span("stage", stage="fingerprint"):
+            inputs = fingerprint_inputs(LANGUAGE_LIST, lang_dir, manifest)
+        stale = stale_languages(LANGUAGE_LIST, inputs, manifest, OUTPUT_DIR)
+        options = {
+            "aligned": args.aligned,
+            "placeholder": args.placeholder if args.aligned else None,
+        }
+        # Aligned files follow the en_us keys, so they all change when en_us does.
+        if manifest.get("options", DEFAULT_OPTIONS) != options or (
+            args.aligned and "en_us" in stale
+        ):
+            stale = list(LANGUAGE_LIST)
+        write_keys = "en_us" in stale or not (OUTPUT_DIR / "key.txt").exists()
+        write_table = args.tsv and (stale or not (OUTPUT_DIR / TSV_FILE_NAME).exists())
+
+        if args.aligned and (stale or write_keys or write_table):
+            # The coverage report and the table cover every language.
+            language_data = get_language_data()
+            with METRICS.span("stage", stage="load"):
+                languages = {lang_code: language_data[lang_code] for lang_code in LANGUAGE_LIST}
+            with METRICS.span("stage", stage="filter"):
+                output_keys, columns = align_translations(languages)
+            with METRICS.span("stage", stage="write"):
+                write_aligned_output(
+                    output_keys, columns, stale, OUTPUT_DIR, args.placeholder, write_keys
+                )
+                if write_table:
+                    write_tsv(
+                        output_keys,
+                        columns,
+                        LANGUAGE_LIST,
+                        OUTPUT_DIR / TSV_FILE_NAME,
+                        args.placeholder,
+                    )
+            report = coverage_report(output_keys, columns)
+            write_text_atomic(
+                OUTPUT_DIR / COVERAGE_FILE_NAME,
+                json.dumps(report, ensure_ascii=False, indent=2) + "\n",
+            )
+            print_coverage(report)
+        elif stale or write_keys:
+            language_data = get_language_data()
+            needed = set(stale) | ({"en_us"} if write_keys else set())
+            with METRICS.span("stage", stage="load"):
+                languages = {
+                    lang_code: language_data[lang_code]
+                    for lang_code in LANGUAGE_LIST
+                    if lang_code in needed
+                }
+            with METRICS.span("stage", stage="filter"):
+                output_keys, output_translations = filter_translations(languages)
+            with METRICS.span("stage", stage="write"):
+                write_output(output_keys, output_translations, stale, OUTPUT_DIR, write_keys)
+
+        # Outputs of options no longer in use would otherwise go stale unnoticed.
+        if not args.tsv:
+            (OUTPUT_DIR / TSV_FILE_NAME).unlink(missing_ok=True)
+        if not args.aligned:
+            (OUTPUT_DIR / COVERAGE_FILE_NAME).unlink(missing_ok=True)
 
-# Filter the keys themselves.
-output_keys: list[str] = [key for key in language_data.get("en_us", {}).keys() if is_valid_key(key)]
+        # The manifest is written last, so an interrupted run is redone next time.
+        new_manifest = {"rules": rules_fingerprint(), "options": options, "inputs": inputs}
+        if new_manifest != manifest:
+            write_text_atomic(
+                OUTPUT_DIR / MANIFEST_FILE_NAME, json.dumps(new_manifest, indent=2) + "\n"
+            )
 
-# Write filtered translations to .txt files.
-for lang_name in LANGUAGE_LIST:
-    output_file = OUTPUT_DIR / f"{lang_name}.txt"
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("\n".join(output_translations.get(lang_name, [])))
-        f.write("\n")  # Add a final newline
+        file_count = len(stale) + write_keys + bool(write_table)
+        if not file_count:
+            print("Extraction is up to date. No files changed.")
+        else:
+            print(
+                f"Extraction complete. Updated {file_count} of "
+                f"{len(LANGUAGE_LIST) + 1 + args.tsv} files in '{OUTPUT_DIR.name}' directory."
+            )
+        METRICS.count("files_written", file_count)
+    finally:
+        write_metrics(METRICS_FILE, "extract")
 
-# Write filtered keys to key.txt.
-key_output_file = OUTPUT_DIR / "key.txt"
-with open(key_output_file, "w", encoding="utf-8") as f:
-    f.write("\n".join(output_keys))
-    f.write("\n")  # Add a final newline
 
-print(f"Extraction complete. Files saved in '{OUTPUT_DIR.name}' directory.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""A local stand-in for the Mojang download servers.
+
+Serves the version manifest, client manifests, asset indexes, asset objects
+and client archives from memory, built from directories of language files. It
+answers conditional requests and byte ranges like the real servers, so the
+downloader, the remote zip reader and the watcher can be exercised offline by
+benchmarks and tests.
+"""
+
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+import zipfile
+from datetime import UTC, datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from init import find_language_file, load_language_file
+
+# The delay in seconds the server adds to each response, as on a real connection.
+FAKE_SERVER_LATENCY = 0.02
+
+# A Range header asking for one range of bytes, such as "bytes=0-99", "bytes=100-"
+# or "bytes=-100".
+BYTE_RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class FakeMojangHandler(BaseHTTPRequestHandler):
+    """Serves the documents of a `FakeMojangServer`."""
+
+    # Unlike a real server, the handler writes the headers and the body separately,
+    # which would otherwise stall on delayed acknowledgements.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "FakeMojangServer"
+
+    def byte_range(self, size: int) -> tuple[int, int] | None:
+        """Read the single byte range requested by the Range header, if any.
+
+        Args:
+            size (int): The size of the document.
+
+        Returns:
+            tuple[int, int] | None: The first and last byte of the range, or
+                None if the whole document is to be sent because there is no
+                Range header or it is malformed.
+
+        Raises:
+            ValueError: If the range lies past the end of the document.
+
+        """
+        match = BYTE_RANGE_PATTERN.fullmatch(self.headers.get("Range", ""))
+        if match is None or match.group(1) == match.group(2) == "":
+            return None
+        first, last = match.groups()
+        if first == "":
+            # A suffix range covers the last bytes of the document.
+            if int(last) == 0 or size == 0:
+                raise ValueError("empty suffix range")
+            return max(size - int(last), 0), size - 1
+        if last and int(last) < int(first):
+            return None
+        if int(first) >= size:
+            raise ValueError("range starts past the end")
+        return int(first), min(int(last), size - 1) if last else size - 1
+
+    def do_GET(self) -> None:
+        """Answer a GET request after the server's latency.
+
+        Documents are revalidated by ETag, and a single byte range is answered
+        with a partial response, as the download resumption and remote zip
+        reads of the downloader expect.
+        """
+        body = self.server.files.get(self.path)
+        time.sleep(self.server.latency)
+        if body is None:
+            self.send_response(HTTPStatus.NOT_FOUND)
+            body = b""
+        else:
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            size = len(body)
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                body = b""
+            else:
+                try:
+                    byte_range = self.byte_range(size)
+                except ValueError:
+                    self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    body = b""
+                else:
+                    if byte_range is None:
+                        self.send_response(HTTPStatus.OK)
+                    else:
+                        first, last = byte_range
+                        self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                        self.send_header("Content-Range", f"bytes {first}-{last}/{size}")
+                        body = body[first : last + 1]
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        """Keep requests out of the output."""
+
+
+class FakeMojangServer(ThreadingHTTPServer):
+    """A local stand-in for the version manifest, piston and resources servers.
+
+    Serves a fixed set of documents by path, each after a fixed delay. Use
+    `add_release` to publish a version built from a directory of language files.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = FAKE_SERVER_LATENCY) -> None:
+        """Bind the server to a free local port.
+
+        Args:
+            latency (float): The delay in seconds before each response.
+
+        """
+        super().__init__(("127.0.0.1", 0), FakeMojangHandler)
+        self.latency = latency
+        self.files: dict[str, bytes] = {}
+        self.versions: list[dict] = []
+        self.latest: dict[str, str] = {}
+
+    def url(self, path: str) -> str:
+        """Return the URL of a path on the server."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def add(self, path: str, body: bytes) -> str:
+        """Serve a document and return its URL."""
+        self.files[path] = body
+        return self.url(path)
+
+    def add_package(self, file_name: str, body: bytes) -> dict[str, str]:
+        """Serve a document under its SHA1 hash, as piston-meta does.
+
+        Like the real asset indexes, documents of different versions may
+        share a file name, and only the directory tells them apart.
+
+        Returns:
+            dict[str, str]: The URL and SHA1 hash of the document.
+
+        """
+        sha1 = hashlib.sha1(body).hexdigest()
+        return {"url": self.add(f"/v1/packages/{sha1}/{file_name}", body), "sha1": sha1}
+
+    def add_release(
+        self, version_id: str, lang_dir: Path, lang_list: list[str], release: bool = False
+    ) -> None:
+        """Publish a version whose language files are those of a directory.
+
+        The other languages become assets in the asset index, and en_us goes
+        into the client archive, as on the real servers. The version becomes
+        the latest snapshot of the version manifest, and the latest release
+        too if it is a release or the first version published.
+
+        Args:
+            version_id (str): The version ID.
+            lang_dir (Path): The directory containing language files.
+            lang_list (list[str]): The languages to publish.
+            release (bool): If True, the version is published as a release.
+
+        """
+        objects = {}
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as client_jar:
+            for lang_code in lang_list:
+                lang_file = find_language_file(lang_dir, lang_code)
+                data = lang_file.read_bytes()
+                if lang_file.suffix == ".lang":
+                    data = json.dumps(load_language_file(lang_file), ensure_ascii=False).encode()
+                if lang_code == "en_us":
+                    client_jar.writestr("assets/minecraft/lang/en_us.json", data)
+                    continue
+                file_hash = hashlib.sha1(data).hexdigest()
+                self.add(f"/objects/{file_hash[:2]}/{file_hash}", data)
+                objects[f"minecraft/lang/{lang_code}.json"] = {"hash": file_hash, "size": len(data)}
+        jar = archive.getvalue()
+        client_manifest = {
+            "id": version_id,
+            "assetIndex": self.add_package("index.json", json.dumps({"objects": objects}).encode()),
+            "downloads": {
+                "client": {
+                    "url": self.add(f"/clients/{version_id}.jar", jar),
+                    "sha1": hashlib.sha1(jar).hexdigest(),
+                }
+            },
+        }
+        self.versions.insert(
+            0,
+            {
+                "id": version_id,
+                "type": "release" if release else "snapshot",
+                **self.add_package(f"{version_id}.json", json.dumps(client_manifest).encode()),
+                "releaseTime": datetime.now(UTC).isoformat(timespec="seconds"),
+            },
+        )
+        self.latest["snapshot"] = version_id
+        if release or "release" not in self.latest:
+            self.latest["release"] = version_id
+        manifest = {"latest": self.latest, "versions": self.versions}
+        self.add("/version_manifest_v2.json", json.dumps(manifest).encode())
+
+    def start(self) -> None:
+        """Serve requests on a background thread."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
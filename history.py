@@ -0,0 +1,494 @@
+"""Cross-version translation history stored as deltas in SQLite.
+
+Instead of a full copy of every language of every version, the history keeps
+one row per change: a key that was added, removed or changed in a language
+from one version to the next. The state of a language at any version is the
+latest change of each key up to that version, so storage and queries grow with
+the number of changes rather than with versions times keys.
+
+Versions are ordered by release time and may be recorded in any order. A
+version recorded between two others takes over the delta of the later one.
+"""
+
+import argparse
+import sqlite3
+import sys
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from typing import NamedTuple, Self
+
+from base import (
+    HISTORY_PATH,
+    LANGUAGE_LIST,
+    LEGACY_VERSIONS_DIR,
+    VERSIONS_DIR,
+    get_version_manifest,
+)
+from download_legacy import TARGET_VERSIONS
+from init import find_language_file, load_language_file, version_dirs
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    release_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS versions_by_release_time ON versions (release_time);
+
+CREATE TABLE IF NOT EXISTS keys (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE
+);
+
+-- The languages recorded for each version. A version without a language
+-- carries no changes for it.
+CREATE TABLE IF NOT EXISTS version_languages (
+    version_id INTEGER NOT NULL REFERENCES versions (id),
+    lang TEXT NOT NULL,
+    PRIMARY KEY (lang, version_id)
+);
+
+-- One row per key whose value differs from the previous version of the
+-- language. A NULL value means that the key was removed.
+CREATE TABLE IF NOT EXISTS changes (
+    lang TEXT NOT NULL,
+    key_id INTEGER NOT NULL REFERENCES keys (id),
+    version_id INTEGER NOT NULL REFERENCES versions (id),
+    value TEXT,
+    PRIMARY KEY (lang, key_id, version_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS changes_by_version ON changes (version_id, lang);
+"""
+
+
+class VersionDelta(NamedTuple):
+    """The changes of one language from one version to another."""
+
+    added: dict[str, str]
+    removed: dict[str, str]
+    # The old and the new value of each changed key.
+    changed: dict[str, tuple[str, str]]
+
+
+def compute_delta(old: Mapping[str, str], new: Mapping[str, str]) -> VersionDelta:
+    """Compare two states of a language.
+
+    Args:
+        old (Mapping[str, str]): The earlier translations.
+        new (Mapping[str, str]): The later translations.
+
+    Returns:
+        VersionDelta: The added, removed and changed keys.
+
+    """
+    old_get = old.get
+    delta = VersionDelta({}, {key: value for key, value in old.items() if key not in new}, {})
+    # Only the keys whose value differs are looked at twice.
+    for key, value in new.items():
+        if old_get(key) != value:
+            if key in old:
+                delta.changed[key] = (old[key], value)
+            else:
+                delta.added[key] = value
+    return delta
+
+
+class HistoryStore:
+    """A SQLite database of the translations of many versions, stored as deltas."""
+
+    def __init__(self, path: Path) -> None:
+        """Open the database, creating it if needed.
+
+        Args:
+            path (Path): The path of the database file.
+
+        """
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database."""
+        self.connection.close()
+
+    def __enter__(self) -> Self:
+        """Return the store for use in a with statement."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close the database at the end of a with statement."""
+        self.close()
+
+    def versions(self) -> list[tuple[str, str]]:
+        """Return the recorded versions.
+
+        Returns:
+            list[tuple[str, str]]: The name and release time of each version,
+                oldest first.
+
+        """
+        return self.connection.execute(
+            "SELECT name, release_time FROM versions ORDER BY release_time"
+        ).fetchall()
+
+    def _version(self, name: str) -> tuple[int, str]:
+        """Return the ID and release time of a recorded version.
+
+        Raises:
+            KeyError: If the version is not recorded.
+
+        """
+        row = self.connection.execute(
+            "SELECT id, release_time FROM versions WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return row
+
+    def _neighbour(self, lang: str, release_time: str, later: bool) -> tuple[int, str] | None:
+        """Find the closest version before or after a release time that has a language."""
+        comparison, order = (">", "ASC") if later else ("<", "DESC")
+        return self.connection.execute(
+            f"""
+            SELECT v.id, v.release_time FROM versions v
+            JOIN version_languages l ON l.version_id = v.id AND l.lang = ?
+            WHERE v.release_time {comparison} ?
+            ORDER BY v.release_time {order} LIMIT 1
+            """,
+            (lang, release_time),
+        ).fetchone()
+
+    def _key_ids(self, keys: Iterator[str]) -> dict[str, int]:
+        """Return the IDs of keys, adding the keys that are not known yet."""
+        keys = list(keys)
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO keys (key) VALUES (?)", ((key,) for key in keys)
+        )
+        key_ids = {}
+        # Looked up in batches to stay below SQLite's limit on parameters.
+        for i in range(0, len(keys), 500):
+            batch = keys[i : i + 500]
+            key_ids.update(
+                self.connection.execute(
+                    f"SELECT key, id FROM keys WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+            )
+        return key_ids
+
+    def _write_delta(self, version_id: int, lang: str, delta: VersionDelta) -> None:
+        """Replace the stored changes of a language in a version."""
+        self.connection.execute(
+            "DELETE FROM changes WHERE version_id = ? AND lang = ?", (version_id, lang)
+        )
+        rows = [
+            *((key, value) for key, value in delta.added.items()),
+            *((key, None) for key in delta.removed),
+            *((key, new) for key, (_, new) in delta.changed.items()),
+        ]
+        key_ids = self._key_ids(key for key, _ in rows)
+        self.connection.executemany(
+            "INSERT INTO changes (lang, key_id, version_id, value) VALUES (?, ?, ?, ?)",
+            ((lang, key_ids[key], version_id, value) for key, value in rows),
+        )
+
+    def state_at(self, release_time: str, lang: str) -> dict[str, str]:
+        """Reconstruct a language as of a release time.
+
+        Args:
+            release_time (str): The release time, inclusive.
+            lang (str): The language code.
+
+        Returns:
+            dict[str, str]: The translations keyed by localization key.
+
+        """
+        rows = self.connection.execute(
+            """
+            SELECT k.key, c.value FROM changes c
+            JOIN versions v ON v.id = c.version_id
+            JOIN keys k ON k.id = c.key_id
+            WHERE c.lang = ? AND v.release_time <= ?
+            ORDER BY v.release_time
+            """,
+            (lang, release_time),
+        )
+        state: dict[str, str] = {}
+        for key, value in rows:
+            if value is None:
+                state.pop(key, None)
+            else:
+                state[key] = value
+        return state
+
+    def add_version(
+        self, name: str, release_time: str, language_data: Mapping[str, Mapping[str, str]]
+    ) -> dict[str, VersionDelta]:
+        """Record the translations of a version as changes from the version before it.
+
+        If a later version is already recorded, its changes are recomputed
+        against the new version. A version that is already recorded is replaced.
+
+        Args:
+            name (str): The version ID.
+            release_time (str): The release time in ISO 8601 format, which
+                orders the versions.
+            language_data (Mapping[str, Mapping[str, str]]): The translations of
+                each language of the version.
+
+        Returns:
+            dict[str, VersionDelta]: The changes of each language.
+
+        """
+        with self.connection:
+            if self.connection.execute("SELECT 1 FROM versions WHERE name = ?", (name,)).fetchone():
+                self._remove_version(name)
+            version_id = self.connection.execute(
+                "INSERT INTO versions (name, release_time) VALUES (?, ?)", (name, release_time)
+            ).lastrowid
+
+            deltas = {}
+            for lang, data in language_data.items():
+                previous = self._neighbour(lang, release_time, later=False)
+                following = self._neighbour(lang, release_time, later=True)
+                old = self.state_at(previous[1], lang) if previous else {}
+                new = dict(data)
+                if following:
+                    next_state = self.state_at(following[1], lang)
+                    self._write_delta(following[0], lang, compute_delta(new, next_state))
+                deltas[lang] = compute_delta(old, new)
+                self._write_delta(version_id, lang, deltas[lang])
+                self.connection.execute(
+                    "INSERT INTO version_languages (version_id, lang) VALUES (?, ?)",
+                    (version_id, lang),
+                )
+        return deltas
+
+    def _remove_version(self, name: str) -> None:
+        """Remove a version, folding its changes into the version after it."""
+        version_id, release_time = self._version(name)
+        langs = [
+            lang
+            for (lang,) in self.connection.execute(
+                "SELECT lang FROM version_languages WHERE version_id = ?", (version_id,)
+            )
+        ]
+        for lang in langs:
+            following = self._neighbour(lang, release_time, later=True)
+            if following:
+                previous = self._neighbour(lang, release_time, later=False)
+                old = self.state_at(previous[1], lang) if previous else {}
+                next_state = self.state_at(following[1], lang)
+                self._write_delta(following[0], lang, compute_delta(old, next_state))
+        self.connection.execute("DELETE FROM changes WHERE version_id = ?", (version_id,))
+        self.connection.execute("DELETE FROM version_languages WHERE version_id = ?", (version_id,))
+        self.connection.execute("DELETE FROM versions WHERE id = ?", (version_id,))
+
+    def language_data(self, name: str, lang: str) -> dict[str, str]:
+        """Reconstruct a language of a recorded version.
+
+        Args:
+            name (str): The version ID.
+            lang (str): The language code.
+
+        Returns:
+            dict[str, str]: The translations, or an empty dict if the version
+                does not have the language.
+
+        Raises:
+            KeyError: If the version is not recorded.
+
+        """
+        version_id, release_time = self._version(name)
+        has_language = self.connection.execute(
+            "SELECT 1 FROM version_languages WHERE version_id = ? AND lang = ?",
+            (version_id, lang),
+        ).fetchone()
+        return self.state_at(release_time, lang) if has_language else {}
+
+    def key_history(self, key: str, lang: str = "en_us") -> list[tuple[str, str | None]]:
+        """Return every value a key has had in a language.
+
+        Args:
+            key (str): The localization key.
+            lang (str): The language code.
+
+        Returns:
+            list[tuple[str, str | None]]: The version in which each value
+                appeared, oldest first. None means that the key was removed.
+
+        """
+        return self.connection.execute(
+            """
+            SELECT v.name, c.value FROM keys k
+            JOIN changes c ON c.lang = ? AND c.key_id = k.id
+            JOIN versions v ON v.id = c.version_id
+            WHERE k.key = ?
+            ORDER BY v.release_time
+            """,
+            (lang, key),
+        ).fetchall()
+
+    def diff(self, old_name: str, new_name: str, lang: str = "en_us") -> VersionDelta:
+        """Compare a language between two recorded versions.
+
+        Only the keys changed by the versions in between are looked at.
+
+        Args:
+            old_name (str): The earlier version ID.
+            new_name (str): The later version ID.
+            lang (str): The language code.
+
+        Returns:
+            VersionDelta: The keys added, removed and changed from the earlier
+                version to the later one.
+
+        Raises:
+            KeyError: If either version is not recorded.
+
+        """
+        _, old_time = self._version(old_name)
+        _, new_time = self._version(new_name)
+        if old_time > new_time:
+            delta = self.diff(new_name, old_name, lang)
+            return VersionDelta(
+                delta.removed,
+                delta.added,
+                {key: (new, old) for key, (old, new) in delta.changed.items()},
+            )
+
+        old: dict[str, str] = {}
+        new: dict[str, str] = {}
+        rows = self.connection.execute(
+            """
+            WITH touched AS (
+                SELECT DISTINCT c.key_id FROM changes c
+                JOIN versions v ON v.id = c.version_id
+                WHERE c.lang = ? AND v.release_time > ? AND v.release_time <= ?
+            )
+            SELECT k.key, c.value, v.release_time > ? FROM touched t
+            JOIN changes c ON c.lang = ? AND c.key_id = t.key_id
+            JOIN versions v ON v.id = c.version_id
+            JOIN keys k ON k.id = t.key_id
+            WHERE v.release_time <= ?
+            ORDER BY v.release_time
+            """,
+            (lang, old_time, new_time, old_time, lang, new_time),
+        )
+        for key, value, after_old in rows:
+            for state in (new,) if after_old else (old, new):
+                if value is None:
+                    state.pop(key, None)
+                else:
+                    state[key] = value
+        return compute_delta(old, new)
+
+    def change_count(self) -> int:
+        """Return the number of stored changes."""
+        return self.connection.execute("SELECT COUNT(*) FROM changes").fetchone()[0]
+
+
+def import_versions(store: HistoryStore, versions_dirs: list[Path]) -> None:
+    """Record every downloaded version that is not recorded yet.
+
+    The versions are recorded in order of release time, so each one only adds
+    its changes on top of the one before, instead of changing the delta of a
+    later version. The folders of the legacy output directory are named as in
+    `download_legacy.TARGET_VERSIONS`, such as "1.8" for 1.8.9, and are
+    recorded under the version they hold. Directories that do not exist are
+    skipped, and a version found in several directories is taken from the first.
+
+    Args:
+        store (HistoryStore): The history store.
+        versions_dirs (list[Path]): The directories of versions.
+
+    """
+    release_times = {v["id"]: v["releaseTime"] for v in get_version_manifest()["versions"]}
+    recorded = {name for name, _ in store.versions()}
+    pending: dict[str, Path] = {}
+    for versions_dir in versions_dirs:
+        if not versions_dir.is_dir():
+            continue
+        is_legacy = versions_dir.resolve() == LEGACY_VERSIONS_DIR.resolve()
+        folder_versions = TARGET_VERSIONS if is_legacy else {}
+        for version_dir in version_dirs(versions_dir):
+            name = folder_versions.get(version_dir.name, version_dir.name)
+            if name in recorded or name in pending:
+                continue
+            if name not in release_times:
+                print(f"Skipping '{version_dir.name}', which is not in the version manifest.")
+                continue
+            pending[name] = version_dir
+
+    for name, version_dir in sorted(pending.items(), key=lambda item: release_times[item[0]]):
+        lang_files = {lang: find_language_file(version_dir, lang) for lang in LANGUAGE_LIST}
+        language_data = {
+            lang: load_language_file(lang_file)
+            for lang, lang_file in lang_files.items()
+            if lang_file.is_file()
+        }
+        deltas = store.add_version(name, release_times[name], language_data)
+        change_count = sum(
+            len(delta.added) + len(delta.removed) + len(delta.changed) for delta in deltas.values()
+        )
+        print(f"Recorded {name} ({len(language_data)} languages, {change_count} changes).")
+
+
+def print_delta(delta: VersionDelta) -> None:
+    """Print the changes of a language between two versions."""
+    for key, value in delta.added.items():
+        print(f"+ {key}: {value}")
+    for key, value in delta.removed.items():
+        print(f"- {key}: {value}")
+    for key, (old, new) in delta.changed.items():
+        print(f"~ {key}: {old} -> {new}")
+    print(
+        f"\n{len(delta.added)} added, {len(delta.removed)} removed, {len(delta.changed)} changed."
+    )
+
+
+def main() -> None:
+    """Import versions into the history or query it."""
+    parser = argparse.ArgumentParser(description="Query the translation history of versions.")
+    parser.add_argument("--db", type=Path, default=HISTORY_PATH, help="The history database.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="Record the downloaded versions.")
+    import_parser.add_argument(
+        "versions_dirs",
+        nargs="*",
+        type=Path,
+        default=[VERSIONS_DIR, LEGACY_VERSIONS_DIR],
+        help="The versions directories (default: the versions and legacy output folders).",
+    )
+    commands.add_parser("versions", help="List the recorded versions.")
+    key_parser = commands.add_parser("key", help="Show every value of a key over time.")
+    key_parser.add_argument("key")
+    key_parser.add_argument("--lang", default="en_us")
+    diff_parser = commands.add_parser("diff", help="Show what changed between two versions.")
+    diff_parser.add_argument("old")
+    diff_parser.add_argument("new")
+    diff_parser.add_argument("--lang", default="en_us")
+    args = parser.parse_args()
+
+    with HistoryStore(args.db) as store:
+        if args.command == "import":
+            import_versions(store, args.versions_dirs)
+            print(f"The history holds {store.change_count()} changes.")
+        elif args.command == "versions":
+            for name, release_time in store.versions():
+                print(f"{name}\t{release_time}")
+        elif args.command == "key":
+            history = store.key_history(args.key, args.lang)
+            if not history:
+                print(f"Key '{args.key}' has no history in {args.lang}.")
+            for name, value in history:
+                print(f"{name}\t{'(removed)' if value is None else value}")
+        else:
+            try:
+                print_delta(store.diff(args.old, args.new, args.lang))
+            except KeyError as e:
+                print(f"Version {e} is not recorded.")
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,72 @@
 """Initializes language files."""
 
 import json
+import re
 import sys
+from collections.abc import Iterable, Iterator, Mapping
+from functools import cache
 from pathlib import Path
 
-from base import LANG_DIR, LANGUAGE_LIST
+from base import LANGUAGE_LIST, USE_SNAPSHOT, get_lang_dir
+from metrics import METRICS
+
+# Backslash escapes in legacy .lang values. Unknown escapes are kept as they are.
+LANG_ESCAPE_PATTERN = re.compile(r"\\(u[0-9a-fA-F]{4}|.)")
+LANG_ESCAPES: dict[str, str] = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", "=": "="}
+
+
+def language_file_names(lang_code: str) -> list[str]:
+    """Return the possible names of a language file, in order of preference.
+
+    Versions from 18w02a on use JSON files. Older versions use .lang files,
+    named with an upper-case region before 1.11, such as en_US.lang.
+
+    Args:
+        lang_code (str): The language code, such as "en_us".
+
+    Returns:
+        list[str]: The file names.
+
+    """
+    language, _, region = lang_code.partition("_")
+    names = [f"{lang_code}.json", f"{lang_code}.lang"]
+    if region:
+        names.append(f"{language}_{region.upper()}.lang")
+    return names
+
+
+def find_language_file(lang_dir: Path, lang_code: str) -> Path:
+    """Find the file of a language in either format.
+
+    Args:
+        lang_dir (Path): The directory containing language files.
+        lang_code (str): The language code.
+
+    Returns:
+        Path: The first existing file, or the path of the JSON file if there is none.
+
+    """
+    for name in language_file_names(lang_code):
+        if (lang_dir / name).is_file():
+            return lang_dir / name
+    return lang_dir / f"{lang_code}.json"
+
+
+def version_dirs(versions_dir: Path) -> Iterator[Path]:
+    """Yield the version directories holding language files.
+
+    Args:
+        versions_dir (Path): The directory of versions.
+
+    Yields:
+        Path: Each directory with at least one configured language file.
+
+    """
+    for path in sorted(versions_dir.iterdir()):
+        if path.is_dir() and any(
+            find_language_file(path, lang).is_file() for lang in LANGUAGE_LIST
+        ):
+            yield path
 
 
 def check_missing_files(lang_list: list[str], lang_dir: Path) -> list[str]:
@@ -21,10 +83,77 @@ def check_missing_files(lang_list: list[str], lang_dir: Path) -> list[str]:
     return [
         f"{lang_code}.json"
         for lang_code in lang_list
-        if not (lang_dir / f"{lang_code}.json").exists()
+        if not find_language_file(lang_dir, lang_code).exists()
     ]
 
 
+def _unescape(match: re.Match[str]) -> str:
+    """Replace one backslash escape of a .lang value."""
+    escape = match.group(1)
+    if len(escape) == 5:
+        return chr(int(escape[1:], 16))
+    return LANG_ESCAPES.get(escape, match.group(0))
+
+
+def parse_lang_lines(lines: Iterable[str]) -> dict[str, str]:
+    """Parse the lines of a legacy .lang file.
+
+    Each line holds a key and a value separated by the first "=". Blank lines,
+    comments starting with "#" and lines without "=" are skipped. Backslash
+    escapes in values, such as "\\n" and "\\u00e9", are replaced by the
+    characters they stand for. Lines are consumed one at a time, so any
+    iterable of lines can be parsed without holding it in memory.
+
+    Args:
+        lines (Iterable[str]): The lines, with or without line breaks.
+
+    Returns:
+        dict[str, str]: The translations keyed by localization key.
+
+    """
+    translations = {}
+    for line in lines:
+        key, separator, value = line.partition("=")
+        if not separator or key[:1] == "#":
+            continue
+        value = value.rstrip("\r\n")
+        if "\\" in value:
+            value = LANG_ESCAPE_PATTERN.sub(_unescape, value)
+        translations[key] = value
+    return translations
+
+
+def load_language_file(lang_file: Path) -> dict[str, str]:
+    """Load a single language file in JSON or legacy .lang format.
+
+    A .lang file is read as UTF-8, ignoring a byte order mark, or as Latin-1
+    if it is not valid UTF-8.
+
+    Args:
+        lang_file (Path): The path of the language file. Files ending in
+            ".lang" are parsed as .lang files, all others as JSON.
+
+    Returns:
+        dict[str, str]: The translations keyed by localization key.
+
+    """
+    if lang_file.suffix == ".lang":
+        with METRICS.span("language_file_load", format="lang"):
+            # Decoding the whole file and splitting it in one go is faster than
+            # reading it line by line, and keeps up with the JSON parser. Only
+            # "\n" ends a line: values may hold "\x85" or "\u2028", which
+            # str.splitlines() would treat as line breaks. A trailing "\r" is
+            # stripped by the parser.
+            data = lang_file.read_bytes()
+            try:
+                text = data.decode("utf-8-sig")
+            except UnicodeDecodeError:
+                text = data.decode("latin-1")
+            return parse_lang_lines(text.split("\n"))
+    with METRICS.span("language_file_load", format="json"), open(lang_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
 def load_language_files(lang_list: list[str], lang_dir: Path) -> dict[str, dict[str, str]]:
     """Load language files from the specified directory.
 
@@ -38,26 +167,82 @@ def load_language_files(lang_list: list[str], lang_dir: Path) -> dict[str, dict[
     """
     lang_data = {}
     for lang_code in lang_list:
-        lang_file = lang_dir / f"{lang_code}.json"
+        lang_file = find_language_file(lang_dir, lang_code)
         try:
-            with open(lang_file, encoding="utf-8") as f:
-                lang_data[lang_code] = json.load(f)
+            lang_data[lang_code] = load_language_file(lang_file)
         except (FileNotFoundError, json.JSONDecodeError) as e:
             print(f"Error: Could not read language file {lang_file} - {e}")
             sys.exit(1)
     return lang_data
 
 
-def main(lang_list: list[str], lang_dir: Path) -> dict[str, dict[str, str]]:
-    """Check for and load language files.
+class TranslationStore(Mapping[str, dict[str, str]]):
+    """A read-only mapping of language codes to translations, loaded on first access.
+
+    Creating a store does no I/O. Each language file is parsed the first time
+    its language is looked up and kept for later lookups, so a caller that only
+    needs one language never pays for the others.
+    """
+
+    def __init__(self, lang_list: list[str], lang_dir: Path) -> None:
+        """Initialize the store.
+
+        Args:
+            lang_list (list[str]): The language codes available in the store.
+            lang_dir (Path): The directory containing language files.
+
+        """
+        self.lang_list = list(lang_list)
+        self.lang_dir = lang_dir
+        self._loaded: dict[str, dict[str, str]] = {}
+
+    def __getitem__(self, lang_code: str) -> dict[str, str]:
+        """Return the translations of a language, loading its file if needed.
+
+        Raises:
+            KeyError: If the language is not in the store's language list.
+
+        """
+        if lang_code not in self._loaded:
+            if lang_code not in self.lang_list:
+                raise KeyError(lang_code)
+            self._loaded[lang_code] = load_language_file(
+                find_language_file(self.lang_dir, lang_code)
+            )
+        return self._loaded[lang_code]
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the language codes in the store."""
+        return iter(self.lang_list)
+
+    def __len__(self) -> int:
+        """Return the number of languages in the store."""
+        return len(self.lang_list)
+
+    def __contains__(self, lang_code: object) -> bool:
+        """Check whether a language is in the store without loading it."""
+        return lang_code in self.lang_list
+
+    def is_loaded(self, lang_code: str) -> bool:
+        """Check whether a language has already been loaded.
+
+        Args:
+            lang_code (str): The language code.
+
+        Returns:
+            bool: True if the language file has been parsed, False otherwise.
+
+        """
+        return lang_code in self._loaded
+
+
+def check_language_files(lang_list: list[str], lang_dir: Path) -> None:
+    """Exit with a message if any of the language files is missing.
 
     Args:
         lang_list (list[str]): The list of language codes.
         lang_dir (Path): The directory of language files.
 
-    Returns:
-        dict[str, dict[str, str]]: The loaded language data.
-
     """
     missing_files = check_missing_files(lang_list, lang_dir)
     if missing_files:
@@ -67,8 +252,46 @@ def main(lang_list: list[str], lang_dir: Path) -> dict[str, dict[str, str]]:
         print("Please modify the language list in the configuration and try again.")
         sys.exit(1)
 
-    return load_language_files(lang_list, lang_dir)
+
+def main(lang_list: list[str], lang_dir: Path) -> TranslationStore:
+    """Check for language files and open a store over them.
+
+    Args:
+        lang_list (list[str]): The list of language codes.
+        lang_dir (Path): The directory of language files.
+
+    Returns:
+        TranslationStore: The lazily loaded language data.
+
+    """
+    check_language_files(lang_list, lang_dir)
+    return TranslationStore(lang_list, lang_dir)
+
+
+@cache
+def get_language_data() -> Mapping[str, Mapping[str, str]]:
+    """Return the language data for the configured version and languages.
+
+    If snapshots are enabled in the configuration, the data is served from the
+    version's memory-mapped snapshot, which is built or rebuilt as needed.
+
+    Returns:
+        Mapping[str, Mapping[str, str]]: The lazily loaded language data.
+
+    """
+    lang_dir = get_lang_dir()
+    if not USE_SNAPSHOT:
+        return main(LANGUAGE_LIST, lang_dir)
+
+    # Imported here, as the snapshot module builds on this one.
+    from snapshot import load_snapshot
+
+    check_language_files(LANGUAGE_LIST, lang_dir)
+    return load_snapshot(LANGUAGE_LIST, lang_dir)
 
 
-# Load language data upon module import.
-language_data: dict[str, dict[str, str]] = main(LANGUAGE_LIST, LANG_DIR)
+def __getattr__(name: str):
+    """Provide `language_data` lazily, so importing this module does no I/O."""
+    if name == "language_data":
+        return get_language_data()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
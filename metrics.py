@@ -0,0 +1,245 @@
+"""Timing spans and counters for the pipeline scripts, written to a metrics file.
+
+A span times a block of work, and a counter adds up a quantity such as bytes or
+retries. Both are aggregated in memory by name and labels, so recording is
+cheap and memory stays bounded however many files a run handles. At the end of
+a run, the aggregates are written either as JSON lines, appended to the file so
+it keeps the history of scheduled runs, or in the Prometheus text format,
+replacing the file, for example for the node exporter's textfile collector.
+"""
+
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+
+# The prefix of every metric name in Prometheus output.
+METRIC_PREFIX = "minecraft_translation"
+
+# A metric name with its labels, sorted by label name.
+type SeriesKey = tuple[str, tuple[tuple[str, str], ...]]
+
+
+def _series_key(name: str, labels: dict[str, object]) -> SeriesKey:
+    """Build the key of a series from its name and labels."""
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def _prometheus_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    """Format labels for the Prometheus text format, escaping their values."""
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Metrics:
+    """A thread-safe collection of span timings and counters."""
+
+    def __init__(self) -> None:
+        """Initialize an empty collection, starting the run clock."""
+        self.lock = threading.Lock()
+        self.started = time.time()
+        # The count, total seconds and maximum seconds of each span series.
+        self.spans: dict[SeriesKey, list[float]] = {}
+        self.counters: dict[SeriesKey, float] = {}
+
+    def observe(self, name: str, seconds: float, **labels: object) -> None:
+        """Record one timing of a span.
+
+        Args:
+            name (str): The span name.
+            seconds (float): The duration in seconds.
+            **labels (object): Labels distinguishing the series, such as a host.
+
+        """
+        key = _series_key(name, labels)
+        with self.lock:
+            stats = self.spans.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    @contextmanager
+    def span(self, name: str, **labels: object) -> Iterator[None]:
+        """Time the enclosed block as a span, whether or not it raises.
+
+        Args:
+            name (str): The span name.
+            **labels (object): Labels distinguishing the series.
+
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def count(self, name: str, value: float = 1, **labels: object) -> None:
+        """Add to a counter.
+
+        Args:
+            name (str): The counter name.
+            value (float): The amount to add.
+            **labels (object): Labels distinguishing the series.
+
+        """
+        key = _series_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def reset(self) -> None:
+        """Discard every recorded series and restart the run clock."""
+        with self.lock:
+            self.started = time.time()
+            self.spans.clear()
+            self.counters.clear()
+
+    def records(self) -> list[dict]:
+        """Return every series as a dictionary, spans first.
+
+        Returns:
+            list[dict]: The type, name, labels and values of each series.
+
+        """
+        with self.lock:
+            spans = sorted(self.spans.items())
+            counters = sorted(self.counters.items())
+        return [
+            {
+                "type": "span",
+                "name": name,
+                "labels": dict(labels),
+                "count": count,
+                "seconds": total,
+                "max_seconds": maximum,
+            }
+            for (name, labels), (count, total, maximum) in spans
+        ] + [
+            {"type": "counter", "name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in counters
+        ]
+
+    def to_json_lines(self, script: str) -> str:
+        """Format the run as JSON lines, a run record followed by one line per series.
+
+        Args:
+            script (str): The name of the script that ran.
+
+        Returns:
+            str: The JSON lines.
+
+        """
+        run = {
+            "type": "run",
+            "script": script,
+            "started": datetime.fromtimestamp(self.started, UTC).isoformat(timespec="seconds"),
+            "seconds": time.time() - self.started,
+        }
+        records = [run, *({"script": script, **record} for record in self.records())]
+        return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+    def to_prometheus(self, script: str) -> str:
+        """Format the run in the Prometheus text exposition format.
+
+        Spans become summaries without quantiles, with `_sum` and `_count`
+        series and a separate `_max` gauge. Counters get a `_total` suffix.
+
+        Args:
+            script (str): The name of the script that ran, added as a label.
+
+        Returns:
+            str: The metrics text.
+
+        """
+        lines = []
+        script_label = ("script", script)
+        run_labels = _prometheus_labels((script_label,))
+        for name, value, kind in (
+            ("run_timestamp_seconds", time.time(), "gauge"),
+            ("run_duration_seconds", time.time() - self.started, "gauge"),
+        ):
+            lines += [
+                f"# TYPE {METRIC_PREFIX}_{name} {kind}",
+                f"{METRIC_PREFIX}_{name}{run_labels} {value}",
+            ]
+
+        # Every sample of a metric family must follow its TYPE line without other
+        # families in between, so the samples are grouped by family first.
+        families: dict[str, tuple[str, list[str]]] = {}
+        for record in self.records():
+            labels = _prometheus_labels((script_label, *sorted(record["labels"].items())))
+            if record["type"] == "span":
+                metric = f"{METRIC_PREFIX}_{record['name']}_seconds"
+                families.setdefault(metric, ("summary", []))[1].extend(
+                    [
+                        f"{metric}_sum{labels} {record['seconds']}",
+                        f"{metric}_count{labels} {record['count']}",
+                    ]
+                )
+                families.setdefault(f"{metric}_max", ("gauge", []))[1].append(
+                    f"{metric}_max{labels} {record['max_seconds']}"
+                )
+            else:
+                metric = f"{METRIC_PREFIX}_{record['name']}_total"
+                families.setdefault(metric, ("counter", []))[1].append(
+                    f"{metric}{labels} {record['value']}"
+                )
+        for metric, (kind, samples) in families.items():
+            lines += [f"# TYPE {metric} {kind}", *samples]
+        return "\n".join(lines) + "\n"
+
+    def write(self, file_path: Path, script: str, interval: bool = False) -> None:
+        """Write the metrics of the run to a file.
+
+        A file ending in ".prom" is replaced with Prometheus text through an
+        atomic rename, so a collector never reads a partial file. Any other
+        file gets the run appended as JSON lines.
+
+        Args:
+            file_path (Path): The metrics file.
+            script (str): The name of the script that ran.
+            interval (bool): If True, JSON lines cover only what was recorded
+                since the previous write, and the collection starts over
+                afterwards, so a long-running process can write repeatedly
+                without counting anything twice. Prometheus output stays
+                cumulative, as its counters must.
+
+        """
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        if file_path.suffix == ".prom":
+            temp_path = file_path.with_name(f"{file_path.name}.tmp")
+            temp_path.write_text(self.to_prometheus(script), encoding="utf-8")
+            os.replace(temp_path, file_path)
+        else:
+            with open(file_path, "a", encoding="utf-8") as f:
+                f.write(self.to_json_lines(script))
+            if interval:
+                self.reset()
+
+
+# The metrics of the current run, shared by every module.
+METRICS = Metrics()
+
+
+def write_metrics(file_path: Path | None, script: str, interval: bool = False) -> None:
+    """Write the metrics of the current run if a metrics file is configured.
+
+    Args:
+        file_path (Path | None): The metrics file, or None to write nothing.
+        script (str): The name of the script that ran.
+        interval (bool): If True, JSON lines cover only the time since the
+            previous write. See `Metrics.write`.
+
+    """
+    if file_path is None:
+        return
+    METRICS.write(file_path, script, interval)
+    print(f"Metrics written to '{file_path}'.")
@@ -1,7 +1,16 @@
 """Minecraft Translation Querier."""
 
+import argparse
+import json
+import sys
+from collections.abc import Iterable, Mapping
+from contextlib import redirect_stdout
+from typing import TextIO
+
 from base import LANGUAGE_LIST as LANG_LIST
-from init import language_data
+from extract import LINE_ESCAPES
+from init import get_language_data
+from search import NORMALIZATIONS, TranslationIndex
 
 # Map language codes to human-readable names.
 LANGUAGE_NAMES: dict[str, str] = {
@@ -15,11 +24,79 @@ LANGUAGE_NAMES: dict[str, str] = {
     "vi_vn": "Tiếng Việt (Việt Nam)",
 }
 
+# Query types accepted in batch mode.
+QUERY_TYPES: tuple[str, ...] = ("key", "source", "fuzzy", "translation")
+
+
+def find_keys_by_source_string(
+    language_data: Mapping[str, dict[str, str]],
+    source_str: str,
+    exact_match: bool = True,
+    index: TranslationIndex | None = None,
+    normalization: str = "exact",
+) -> list[str]:
+    """Find the keys whose source English string matches the given string.
+
+    Args:
+        language_data (Mapping[str, dict[str, str]]): The translations of each language.
+        source_str (str): The source string to look for.
+        exact_match (bool): If True, performs an exact match.
+                            If False, performs a case-insensitive substring match.
+        index (TranslationIndex | None): Indexes to use instead of scanning every value.
+            Worth building when running many queries against the same data.
+        normalization (str): For exact matches, how both strings are normalized
+            before comparison: "exact", "casefold", "nfkc" or "nfkc_casefold".
+
+    Returns:
+        list[str]: The matching keys.
+
+    """
+    en_us_data = language_data.get("en_us", {})
+
+    if exact_match:
+        if index is not None:
+            return index.values("en_us", normalization).lookup(source_str)
+        if normalization == "exact":
+            return [k for k, v in en_us_data.items() if v == source_str]
+        normalize = NORMALIZATIONS[normalization]
+        target = normalize(source_str)
+        return [k for k, v in en_us_data.items() if normalize(v) == target]
+    if index is not None:
+        return index.ngram("en_us").search(source_str)
+    return [k for k, v in en_us_data.items() if source_str.lower() in v.lower()]
+
+
+def find_keys_by_translation(
+    language_data: Mapping[str, dict[str, str]],
+    lang_code: str,
+    search_term: str,
+    index: TranslationIndex | None = None,
+) -> list[str]:
+    """Find the keys whose translation in a language contains the given substring.
+
+    Args:
+        language_data (Mapping[str, dict[str, str]]): The translations of each language.
+        lang_code (str): The language to search in.
+        search_term (str): The substring to look for.
+        index (TranslationIndex | None): Indexes to use instead of scanning every value.
+
+    Returns:
+        list[str]: The matching keys.
+
+    """
+    if index is not None:
+        return index.ngram(lang_code).search(search_term, case_sensitive=True)
+    lang_data = language_data.get(lang_code, {})
+    return [k for k, v in lang_data.items() if search_term in v]
+
 
-def print_translations(keys: list[str], languages: list[str]) -> None:
+def print_translations(
+    language_data: Mapping[str, dict[str, str]], keys: list[str], languages: list[str]
+) -> None:
     """Print translations for a given list of keys across specified languages.
 
     Args:
+        language_data (Mapping[str, dict[str, str]]): The translations of each language.
         keys (list[str]): A list of localization keys.
         languages (list[str]): A list of language codes to display.
 
@@ -54,39 +131,47 @@ def get_user_choice(prompt: str, choices: list[int]) -> int:
         print("Invalid input. Please try again.")
 
 
-def query_by_key() -> None:
-    """Query translations by a specific localization key."""
+def query_by_key(language_data: Mapping[str, dict[str, str]]) -> None:
+    """Query translations by a specific localization key.
+
+    Args:
+        language_data (Mapping[str, dict[str, str]]): The translations of each language.
+
+    """
     translation_key = input("\nEnter localization key: ")
     if translation_key in language_data.get("en_us", {}):
-        print_translations([translation_key], LANG_LIST)
+        print_translations(language_data, [translation_key], LANG_LIST)
     else:
         print("Localization key not found. Please check your input.")
 
 
-def query_by_source_string(exact_match: bool = True) -> None:
+def query_by_source_string(
+    language_data: Mapping[str, dict[str, str]], exact_match: bool = True
+) -> None:
     """Query for keys by matching the source English string.
 
     Args:
+        language_data (Mapping[str, dict[str, str]]): The translations of each language.
         exact_match (bool): If True, performs an exact match.
                             If False, performs a case-insensitive substring match.
 
     """
     source_str = input("\nEnter source string (English): ")
-    en_us_data = language_data.get("en_us", {})
-
-    if exact_match:
-        found_keys = [k for k, v in en_us_data.items() if v == source_str]
-    else:
-        found_keys = [k for k, v in en_us_data.items() if source_str.lower() in v.lower()]
+    found_keys = find_keys_by_source_string(language_data, source_str, exact_match)
 
     if found_keys:
-        print_translations(found_keys, LANG_LIST)
+        print_translations(language_data, found_keys, LANG_LIST)
     else:
         print("No matching source string found. Please check your input.")
 
 
-def query_by_translation() -> None:
-    """Query for keys by matching a substring in a translated string."""
+def query_by_translation(language_data: Mapping[str, dict[str, str]]) -> None:
+    """Query for keys by matching a substring in a translated string.
+
+    Args:
+        language_data (Mapping[str, dict[str, str]]): The translations of each language.
+
+    """
     print("\nPlease select a language:")
     # Exclude en_us since we are searching by translation
     searchable_langs = [lang for lang in LANG_LIST if lang != "en_us"]
@@ -98,17 +183,205 @@ def query_by_translation() -> None:
     chosen_lang = searchable_langs[choice_num - 1]
 
     search_term = input(f"\nEnter part of the translated string in {LANGUAGE_NAMES[chosen_lang]}: ")
-    lang_data = language_data.get(chosen_lang, {})
-    found_keys = [k for k, v in lang_data.items() if search_term in v]
+    found_keys = find_keys_by_translation(language_data, chosen_lang, search_term)
 
     if found_keys:
-        print_translations(found_keys, LANG_LIST)
+        print_translations(language_data, found_keys, LANG_LIST)
     else:
         print("No matching translation found. Please check your input.")
 
 
+def parse_batch_query(line: str) -> dict[str, str]:
+    """Parse one line of batch input into a query.
+
+    A line is either a JSON object with "type", "query" and, for translation
+    queries, "lang", or the same fields separated by tabs.
+
+    Args:
+        line (str): The input line, without its line break.
+
+    Returns:
+        dict[str, str]: The query.
+
+    Raises:
+        TypeError: If a JSON query or one of its fields has the wrong type.
+        ValueError: If the line is not a valid query.
+
+    """
+    if line.lstrip().startswith("{"):
+        query = json.loads(line)
+        if not isinstance(query, dict):
+            raise TypeError("A JSON query must be an object.")
+    else:
+        fields = line.split("\t")
+        if len(fields) < 2:
+            raise ValueError("Expected a query type and a query separated by a tab.")
+        query = dict(zip(("type", "query", "lang"), fields, strict=False))
+
+    validate_query(query)
+    return query
+
+
+def validate_query(query: dict[str, str]) -> None:
+    """Check that a query has a known type and the fields that type needs.
+
+    Args:
+        query (dict[str, str]): The query.
+
+    Raises:
+        TypeError: If the query or the language is not a string.
+        ValueError: If the query is not valid.
+
+    """
+    if query.get("type") not in QUERY_TYPES:
+        raise ValueError(f"Unknown query type {query.get('type')!r}.")
+    if not isinstance(query.get("query"), str):
+        raise TypeError("The query must be a string.")
+    if "lang" in query and not isinstance(query["lang"], str):
+        raise TypeError("The language must be a string.")
+    if query["type"] == "translation" and not query.get("lang"):
+        raise ValueError("Translation queries need a language.")
+
+
+def run_query(
+    language_data: Mapping[str, dict[str, str]],
+    query: dict[str, str],
+    index: TranslationIndex | None = None,
+    normalization: str = "exact",
+) -> list[str]:
+    """Run a parsed query and return the matching keys.
+
+    Args:
+        language_data (Mapping[str, dict[str, str]]): The translations of each language.
+        query (dict[str, str]): The query, as returned by `parse_batch_query`.
+        index (TranslationIndex | None): Indexes to use instead of scanning every value.
+        normalization (str): How exact source strings are normalized before comparison.
+
+    Returns:
+        list[str]: The matching keys.
+
+    """
+    query_type, text = query["type"], query["query"]
+    if query_type == "key":
+        return [text] if text in language_data.get("en_us", {}) else []
+    if query_type == "source":
+        return find_keys_by_source_string(language_data, text, True, index, normalization)
+    if query_type == "fuzzy":
+        return find_keys_by_source_string(language_data, text, False, index)
+    return find_keys_by_translation(language_data, query["lang"], text, index)
+
+
+def collect_translations(
+    language_data: Mapping[str, dict[str, str]], keys: list[str], languages: list[str]
+) -> list[dict]:
+    """Gather the translations of keys for structured output.
+
+    Args:
+        language_data (Mapping[str, dict[str, str]]): The translations of each language.
+        keys (list[str]): The localization keys.
+        languages (list[str]): The languages to include.
+
+    Returns:
+        list[dict]: One entry per key with its translation in each language,
+            or None where a language lacks the key.
+
+    """
+    columns = [(lang, language_data[lang]) for lang in languages]
+    return [
+        {"key": key, "translations": {lang: column.get(key) for lang, column in columns}}
+        for key in keys
+    ]
+
+
+def run_batch(
+    lines: Iterable[str],
+    output: TextIO,
+    language_data: Mapping[str, dict[str, str]],
+    languages: list[str],
+    output_format: str = "jsonl",
+    normalization: str = "exact",
+) -> int:
+    """Run many queries against the same data and stream the results.
+
+    The data is shared by every query, and lookup indexes are built on first
+    use and reused for the rest of the batch. Each result is written as soon as
+    its query has run. In JSONL output, every query gives one line holding all
+    of its matches; in TSV output, every match gives one row, with backslashes,
+    line breaks and tabs in fields escaped as in aligned extraction output.
+
+    Args:
+        lines (Iterable[str]): The input lines, one query per line.
+        output (TextIO): Where to write the results.
+        language_data (Mapping[str, dict[str, str]]): The translations of each language.
+        languages (list[str]): The languages to include in the results.
+        output_format (str): "jsonl" or "tsv".
+        normalization (str): How exact source strings are normalized before comparison.
+
+    Returns:
+        int: The number of queries run.
+
+    """
+    index = TranslationIndex(language_data)
+    columns = [language_data[lang] for lang in languages]
+    if output_format == "tsv":
+        output.write("\t".join(["type", "query", "key", *languages]) + "\n")
+
+    count = 0
+    for line_number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        try:
+            query = parse_batch_query(line)
+        except (TypeError, ValueError) as e:
+            print(f"Line {line_number}: {e}", file=sys.stderr)
+            if output_format == "jsonl":
+                output.write(json.dumps({"line": line_number, "error": str(e)}) + "\n")
+            continue
+
+        keys = run_query(language_data, query, index, normalization)
+        count += 1
+        if output_format == "jsonl":
+            results = collect_translations(language_data, keys, languages)
+            output.write(json.dumps({**query, "results": results}, ensure_ascii=False) + "\n")
+        else:
+            for key in keys:
+                row = [query["type"], query["query"], key, *(c.get(key, "") for c in columns)]
+                output.write("\t".join(field.translate(LINE_ESCAPES) for field in row) + "\n")
+    return count
+
+
 def main() -> None:
     """Drive the query interface."""
+    parser = argparse.ArgumentParser(description="Query Minecraft translations.")
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help=(
+            "Run the queries in FILE ('-' for standard input) without prompting. "
+            "Each line is a JSON object or tab-separated fields: type, query and, "
+            f"for translation queries, lang. Types: {', '.join(QUERY_TYPES)}."
+        ),
+    )
+    parser.add_argument(
+        "--format", choices=["jsonl", "tsv"], default="jsonl", help="The batch output format."
+    )
+    parser.add_argument(
+        "--normalization",
+        choices=list(NORMALIZATIONS),
+        default="exact",
+        help="How exact source strings are compared in batch mode.",
+    )
+    args = parser.parse_args()
+
+    if args.batch:
+        # Keep status messages out of the results.
+        with redirect_stdout(sys.stderr):
+            language_data = get_language_data()
+        with open(args.batch, encoding="utf-8") if args.batch != "-" else sys.stdin as lines:
+            run_batch(lines, sys.stdout, language_data, LANG_LIST, args.format, args.normalization)
+        return
+
     print(
         "Select query method:\n"
         "1. By Localization Key\n"
@@ -117,15 +390,16 @@ def main() -> None:
         "4. By Translated String (Fuzzy Match)"
     )
     method = get_user_choice("Enter number: ", [1, 2, 3, 4])
+    language_data = get_language_data()
 
     if method == 1:
-        query_by_key()
+        query_by_key(language_data)
     elif method == 2:
-        query_by_source_string(exact_match=True)
+        query_by_source_string(language_data, exact_match=True)
     elif method == 3:
-        query_by_source_string(exact_match=False)
+        query_by_source_string(language_data, exact_match=False)
     elif method == 4:
-        query_by_translation()
+        query_by_translation(language_data)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,226 @@
+"""Lookup indexes for querying translations."""
+
+import unicodedata
+from array import array
+from collections.abc import Callable, Mapping
+
+# Languages written mostly without spaces, indexed by characters and bigrams
+# instead of trigrams.
+CJK_LANGUAGES: set[str] = {"zh_cn", "zh_hk", "zh_tw", "lzh", "ja_jp", "ko_kr"}
+
+# Once this few candidates remain, they are checked directly instead of
+# intersecting more posting lists.
+MAX_DIRECT_CANDIDATES = 32
+
+
+def _nfkc(text: str) -> str:
+    """Apply NFKC normalization, folding full-width and compatibility forms."""
+    return unicodedata.normalize("NFKC", text)
+
+
+def _nfkc_casefold(text: str) -> str:
+    """Apply NFKC normalization and case folding."""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+# Ways of normalizing values for exact lookups.
+NORMALIZATIONS: dict[str, Callable[[str], str]] = {
+    "exact": str,
+    "casefold": str.casefold,
+    "nfkc": _nfkc,
+    "nfkc_casefold": _nfkc_casefold,
+}
+
+
+def ngram_size(lang_code: str) -> int:
+    """Return the n-gram length used to index a language.
+
+    Args:
+        lang_code (str): The language code.
+
+    Returns:
+        int: 2 for CJK languages, 3 otherwise.
+
+    """
+    return 2 if lang_code in CJK_LANGUAGES else 3
+
+
+def ngrams(text: str, n: int) -> set[str]:
+    """Return the distinct n-grams of a case-folded text.
+
+    Case folding maps every character on its own, so the n-grams of a folded
+    substring are always among the n-grams of the folded text, whether the
+    substring matched with or without regard to case.
+
+    Args:
+        text (str): The text.
+        n (int): The n-gram length.
+
+    Returns:
+        set[str]: The n-grams.
+
+    """
+    folded = text.casefold()
+    return {folded[i : i + n] for i in range(len(folded) - n + 1)}
+
+
+class NgramIndex:
+    """An inverted index from n-grams of case-folded values to the keys containing them.
+
+    A substring query only has to check the keys that contain every n-gram of
+    the query, instead of every value of the language. Single characters can be
+    indexed too, which pays off for CJK scripts where one character is often a
+    whole word. Other queries shorter than one n-gram fall back to a linear
+    scan. Candidates are always checked with
+    the same comparison as a plain scan, so results are identical to one.
+    """
+
+    def __init__(self, data: Mapping[str, str], n: int, index_characters: bool = False) -> None:
+        """Build the index.
+
+        Args:
+            data (Mapping[str, str]): The translations of one language.
+            n (int): The n-gram length.
+            index_characters (bool): If True, single characters are indexed as well.
+
+        """
+        self.n = n
+        self.index_characters = index_characters
+        self.keys: list[str] = []
+        self.values: list[str] = []
+        self.lowered_values: list[str] = []
+        postings: dict[str, list[int]] = {}
+        for key_id, (key, value) in enumerate(data.items()):
+            self.keys.append(key)
+            self.values.append(value)
+            self.lowered_values.append(value.lower())
+            grams = ngrams(value, n)
+            if index_characters:
+                grams.update(value.casefold())
+            for gram in grams:
+                postings.setdefault(gram, []).append(key_id)
+        self.postings: dict[str, array] = {
+            gram: array("I", key_ids) for gram, key_ids in postings.items()
+        }
+
+    def candidates(self, query: str) -> list[int] | range:
+        """Return the IDs of the keys that may contain a query.
+
+        Args:
+            query (str): The query.
+
+        Returns:
+            list[int] | range: The candidate key IDs in ascending order.
+
+        """
+        grams = ngrams(query, self.n)
+        if not grams and self.index_characters:
+            grams = set(query.casefold())
+        if not grams:
+            return range(len(self.keys))
+
+        posting_lists = sorted((self.postings.get(gram, array("I")) for gram in grams), key=len)
+        candidates = list(posting_lists[0])
+        for posting in posting_lists[1:]:
+            if len(candidates) <= MAX_DIRECT_CANDIDATES:
+                break
+            members = set(posting)
+            candidates = [key_id for key_id in candidates if key_id in members]
+        return candidates
+
+    def search(self, query: str, case_sensitive: bool = False) -> list[str]:
+        """Find the keys whose value contains a substring.
+
+        Args:
+            query (str): The substring to look for.
+            case_sensitive (bool): If True, the value must contain the query as is.
+                If False, the comparison ignores case.
+
+        Returns:
+            list[str]: The matching keys, in the order of the language data.
+
+        """
+        values = self.values if case_sensitive else self.lowered_values
+        needle = query if case_sensitive else query.lower()
+        return [self.keys[key_id] for key_id in self.candidates(query) if needle in values[key_id]]
+
+
+class ValueIndex:
+    """A reverse index from normalized values to the keys holding them."""
+
+    def __init__(self, data: Mapping[str, str], normalization: str = "exact") -> None:
+        """Build the index.
+
+        Args:
+            data (Mapping[str, str]): The translations of one language.
+            normalization (str): How values are normalized before comparison,
+                one of the keys of `NORMALIZATIONS`.
+
+        """
+        self.normalize = NORMALIZATIONS[normalization]
+        self.keys_by_value: dict[str, list[str]] = {}
+        for key, value in data.items():
+            self.keys_by_value.setdefault(self.normalize(value), []).append(key)
+
+    def lookup(self, value: str) -> list[str]:
+        """Find the keys whose value equals the given value after normalization.
+
+        Args:
+            value (str): The value to look for.
+
+        Returns:
+            list[str]: The matching keys, in the order of the language data.
+
+        """
+        return list(self.keys_by_value.get(self.normalize(value), ()))
+
+
+class TranslationIndex:
+    """Lookup indexes over language data, each built on first use and then reused."""
+
+    def __init__(self, language_data: Mapping[str, Mapping[str, str]]) -> None:
+        """Initialize the indexes.
+
+        Args:
+            language_data (Mapping[str, Mapping[str, str]]): The translations of each language.
+
+        """
+        self.language_data = language_data
+        self._ngram_indexes: dict[str, NgramIndex] = {}
+        self._value_indexes: dict[tuple[str, str], ValueIndex] = {}
+
+    def ngram(self, lang_code: str) -> NgramIndex:
+        """Return the n-gram index of a language, building it if needed.
+
+        Args:
+            lang_code (str): The language code.
+
+        Returns:
+            NgramIndex: The n-gram index.
+
+        """
+        index = self._ngram_indexes.get(lang_code)
+        if index is None:
+            data = self.language_data.get(lang_code, {})
+            index = self._ngram_indexes[lang_code] = NgramIndex(
+                data, ngram_size(lang_code), index_characters=lang_code in CJK_LANGUAGES
+            )
+        return index
+
+    def values(self, lang_code: str, normalization: str = "exact") -> ValueIndex:
+        """Return the reverse value index of a language, building it if needed.
+
+        Args:
+            lang_code (str): The language code.
+            normalization (str): How values are normalized, one of the keys of
+                `NORMALIZATIONS`.
+
+        Returns:
+            ValueIndex: The reverse value index.
+
+        """
+        index = self._value_indexes.get((lang_code, normalization))
+        if index is None:
+            data = self.language_data.get(lang_code, {})
+            index = self._value_indexes[lang_code, normalization] = ValueIndex(data, normalization)
+        return index
@@ -0,0 +1,227 @@
+"""Resident Minecraft translation query server.
+
+Loads the language data once, builds the lookup indexes, and answers queries
+over a local HTTP/JSON API, one thread per connection. The language files are
+watched, and changed data is loaded in the background and swapped in without
+interrupting requests.
+
+Endpoints, all GET and returning JSON:
+
+    /key?q=<key>
+    /source?q=<string>[&normalization=exact|casefold|nfkc|nfkc_casefold]
+    /fuzzy?q=<substring>
+    /translation?lang=<code>&q=<substring>
+    /health
+"""
+
+import argparse
+import json
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlsplit
+
+from base import LANGUAGE_LIST, get_lang_dir
+from compact import CompactTranslationStore, load_compact_store
+from init import check_language_files
+from query import QUERY_TYPES, collect_translations, run_query, validate_query
+from search import NORMALIZATIONS, TranslationIndex
+from snapshot import source_stats
+
+
+class QueryState(NamedTuple):
+    """The data served at one point in time, replaced as a whole on reload."""
+
+    language_data: CompactTranslationStore
+    index: TranslationIndex
+    stats: list[tuple[int, int]]
+
+
+class QueryService:
+    """Answers queries against language data that is reloaded when its files change."""
+
+    def __init__(self, lang_list: list[str], lang_dir: Path) -> None:
+        """Load the data and build the indexes.
+
+        Args:
+            lang_list (list[str]): The languages to serve.
+            lang_dir (Path): The directory containing language files.
+
+        """
+        self.lang_list = lang_list
+        self.lang_dir = lang_dir
+        self.state = self.load()
+
+    def load(self) -> QueryState:
+        """Load the language files and build every index.
+
+        Returns:
+            QueryState: The new state.
+
+        """
+        stats = source_stats(self.lang_list, self.lang_dir)
+        language_data = load_compact_store(self.lang_list, self.lang_dir)
+        index = TranslationIndex(language_data)
+        index.values("en_us")
+        for lang_code in self.lang_list:
+            index.ngram(lang_code)
+        return QueryState(language_data, index, stats)
+
+    def reload_if_changed(self) -> bool:
+        """Reload the data if any language file has changed since it was loaded.
+
+        The old state keeps serving requests until the new one is complete. If the
+        files cannot be read, for instance while they are being rewritten, the old
+        state is kept and the reload is retried on the next call.
+
+        Returns:
+            bool: True if new data was swapped in, False otherwise.
+
+        """
+        try:
+            if source_stats(self.lang_list, self.lang_dir) == self.state.stats:
+                return False
+            state = self.load()
+        except (OSError, ValueError) as e:
+            print(f"Could not reload language files: {e}")
+            return False
+        self.state = state
+        print("Language files changed. Reloaded.")
+        return True
+
+    def watch(self, interval: float, stop: threading.Event) -> None:
+        """Check the language files for changes until stopped.
+
+        Args:
+            interval (float): The number of seconds between checks.
+            stop (threading.Event): Set to end the loop.
+
+        """
+        while not stop.wait(interval):
+            self.reload_if_changed()
+
+    def handle(self, endpoint: str, params: dict[str, str]) -> tuple[HTTPStatus, dict]:
+        """Answer one request.
+
+        Args:
+            endpoint (str): The request path without the leading slash.
+            params (dict[str, str]): The query string parameters.
+
+        Returns:
+            tuple[HTTPStatus, dict]: The response status and JSON body.
+
+        """
+        state = self.state
+        if endpoint == "health":
+            return HTTPStatus.OK, {
+                "status": "ok",
+                "languages": self.lang_list,
+                "keys": len(state.language_data.key_table),
+            }
+        if endpoint not in QUERY_TYPES:
+            return HTTPStatus.NOT_FOUND, {"error": f"Unknown endpoint '/{endpoint}'."}
+
+        query = {"type": endpoint, "query": params.get("q")}
+        if "lang" in params:
+            query["lang"] = params["lang"]
+        normalization = params.get("normalization", "exact")
+        try:
+            validate_query(query)
+            if normalization not in NORMALIZATIONS:
+                raise ValueError(f"Unknown normalization {normalization!r}.")
+            if endpoint == "translation" and query["lang"] not in state.language_data:
+                raise ValueError(f"Language {query['lang']!r} is not served.")
+        except (TypeError, ValueError) as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+
+        keys = run_query(state.language_data, query, state.index, normalization)
+        results = collect_translations(state.language_data, keys, self.lang_list)
+        return HTTPStatus.OK, {**query, "results": results}
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """Translates HTTP requests into calls to the query service."""
+
+    # Keep connections open between requests, and send the headers and body
+    # without waiting for the client to acknowledge the first packet.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "QueryServer"
+
+    def do_GET(self) -> None:
+        """Answer a GET request with a JSON body."""
+        url = urlsplit(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        status, payload = self.server.service.handle(url.path.strip("/"), params)
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        """Log requests only when the server is verbose."""
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class QueryServer(ThreadingHTTPServer):
+    """An HTTP server that handles each connection in its own thread."""
+
+    daemon_threads = True
+
+    def __init__(
+        self, address: tuple[str, int], service: QueryService, verbose: bool = False
+    ) -> None:
+        """Bind the server.
+
+        Args:
+            address (tuple[str, int]): The host and port to listen on. Port 0
+                picks a free port.
+            service (QueryService): The service answering queries.
+            verbose (bool): If True, every request is logged.
+
+        """
+        super().__init__(address, QueryRequestHandler)
+        self.service = service
+        self.verbose = verbose
+
+
+def main() -> None:
+    """Serve queries for the configured version until interrupted."""
+    parser = argparse.ArgumentParser(description="Serve Minecraft translation queries.")
+    parser.add_argument("--host", default="127.0.0.1", help="The address to listen on.")
+    parser.add_argument("--port", type=int, default=8080, help="The port to listen on.")
+    parser.add_argument(
+        "--reload-interval",
+        type=float,
+        default=2.0,
+        help="Seconds between checks for changed language files.",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Log every request.")
+    args = parser.parse_args()
+
+    lang_dir = get_lang_dir()
+    check_language_files(LANGUAGE_LIST, lang_dir)
+    print("Loading language files and building indexes...")
+    service = QueryService(LANGUAGE_LIST, lang_dir)
+
+    stop = threading.Event()
+    watcher = threading.Thread(target=service.watch, args=(args.reload_interval, stop), daemon=True)
+    watcher.start()
+    with QueryServer((args.host, args.port), service, args.verbose) as server:
+        host, port = server.server_address[:2]
+        print(f"Serving translations on http://{host}:{port}/ (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nStopping server.")
+        finally:
+            stop.set()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,513 @@
+"""Precompiled binary snapshots of a version's language files.
+
+A snapshot holds every language of a version in a single file that is opened
+with mmap. Keys and values are stored as UTF-8 blobs addressed by offset
+tables, so opening a snapshot parses nothing and strings are only decoded when
+they are looked up. The SHA1 hash of every source JSON file is recorded in the
+snapshot, and a snapshot whose sources have changed is rebuilt automatically.
+The size and modification time of each source are recorded as well, so the
+hashes only need to be recomputed when a file has been touched.
+
+Layout, with all integers as native-endian unsigned 32-bit values except the
+64-bit source sizes and modification times:
+
+    header          magic, format version, byte order mark, language count L, key count K
+    languages       L x (language code padded to 16 bytes, SHA1, size and mtime of the
+                    source, number of keys N in the language)
+    key offsets     K + 1 absolute offsets of the keys, in key ID order
+    sorted key IDs  K key IDs in the byte order of their keys, for binary search
+    value offsets   L x (K + 1) absolute offsets of the values
+    key orders      L x K key IDs, the first N of each in the order of the source file
+    presence        L x K bytes, 1 where the language has a value for the key
+    key blob        the UTF-8 encoded keys
+    value blobs     the UTF-8 encoded values of each language
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections.abc import ItemsView, Iterator, Mapping
+from itertools import islice
+from pathlib import Path
+from typing import Self
+
+from base import LANGUAGE_LIST, get_lang_dir
+from compact import load_compact_store
+from init import check_language_files, find_language_file
+
+# The name of the snapshot file inside a version directory.
+SNAPSHOT_FILE_NAME = "translations.snapshot"
+
+MAGIC = b"MCTS"
+FORMAT_VERSION = 2
+BYTE_ORDER_MARK = 0x01020304
+HEADER = struct.Struct("=4sIIII")
+# The number of bytes a language code is padded to.
+LANG_CODE_SIZE = 16
+LANGUAGE_ENTRY = struct.Struct(f"={LANG_CODE_SIZE}s20sQQI")
+# The size and modification time of a source, at this offset in its language entry.
+SOURCE_STAT = struct.Struct("=QQ")
+SOURCE_STAT_OFFSET = LANG_CODE_SIZE + 20
+
+
+def _align(offset: int) -> int:
+    """Round an offset up to a multiple of four bytes."""
+    return (offset + 3) & ~3
+
+
+def source_stats(lang_list: list[str], lang_dir: Path) -> list[tuple[int, int]]:
+    """Read the size and modification time of each language file.
+
+    Args:
+        lang_list (list[str]): The language codes.
+        lang_dir (Path): The directory containing language files.
+
+    Returns:
+        list[tuple[int, int]]: The size in bytes and the modification time in
+            nanoseconds of each file, in the order of `lang_list`.
+
+    """
+    stats = []
+    for lang_code in lang_list:
+        stat = find_language_file(lang_dir, lang_code).stat()
+        stats.append((stat.st_size, stat.st_mtime_ns))
+    return stats
+
+
+def source_hashes(lang_list: list[str], lang_dir: Path) -> list[bytes]:
+    """Compute the SHA1 digest of each language file.
+
+    Args:
+        lang_list (list[str]): The language codes.
+        lang_dir (Path): The directory containing language files.
+
+    Returns:
+        list[bytes]: The digest of each file, in the order of `lang_list`.
+
+    """
+    digests = []
+    for lang_code in lang_list:
+        with open(find_language_file(lang_dir, lang_code), "rb") as f:
+            digests.append(hashlib.file_digest(f, "sha1").digest())
+    return digests
+
+
+def build_snapshot(lang_list: list[str], lang_dir: Path, snapshot_path: Path | None = None) -> Path:
+    """Compile the language files of a version into a snapshot.
+
+    Args:
+        lang_list (list[str]): The language codes to include.
+        lang_dir (Path): The directory containing language files.
+        snapshot_path (Path | None): Where to write the snapshot. Defaults to
+            `SNAPSHOT_FILE_NAME` inside `lang_dir`.
+
+    Returns:
+        Path: The path of the written snapshot.
+
+    Raises:
+        ValueError: If a language code is longer than `LANG_CODE_SIZE` bytes,
+            or the language files are too large for a snapshot.
+
+    """
+    snapshot_path = snapshot_path or lang_dir / SNAPSHOT_FILE_NAME
+    for lang_code in lang_list:
+        # A longer code would be silently truncated by the fixed-size field.
+        if len(lang_code.encode()) > LANG_CODE_SIZE:
+            raise ValueError(
+                f"The language code {lang_code!r} is longer than {LANG_CODE_SIZE} bytes."
+            )
+    # Hash before loading, so a file changing in between makes the snapshot stale, not wrong.
+    stats = source_stats(lang_list, lang_dir)
+    digests = source_hashes(lang_list, lang_dir)
+    store = load_compact_store(lang_list, lang_dir)
+    keys = store.key_table.keys
+    key_count = len(keys)
+
+    encoded_keys = [key.encode() for key in keys]
+    sorted_ids = array("I", sorted(range(key_count), key=encoded_keys.__getitem__))
+
+    # The tables have fixed sizes, so the blobs start right after them.
+    tables_start = _align(HEADER.size + LANGUAGE_ENTRY.size * len(lang_list))
+    table_size = (
+        4 * (key_count + 1)
+        + 4 * key_count
+        + 4 * (key_count + 1) * len(lang_list)
+        + 4 * key_count * len(lang_list)
+    )
+    position = _align(tables_start + table_size + key_count * len(lang_list))
+
+    def blob_with_offsets(strings: list[bytes], start: int) -> tuple[bytes, array]:
+        offsets = array("I", [start])
+        for string in strings:
+            offsets.append(offsets[-1] + len(string))
+        return b"".join(strings), offsets
+
+    key_blob, key_offsets = blob_with_offsets(encoded_keys, position)
+    position += len(key_blob)
+
+    value_blobs: list[bytes] = []
+    value_offsets: list[array] = []
+    key_orders: list[array] = []
+    presence = bytearray()
+    for lang_code in lang_list:
+        column = store.columns[lang_code]
+        column = column + [None] * (key_count - len(column))
+        presence.extend(value is not None for value in column)
+        order = store.orders.get(lang_code)
+        if order is None:
+            order = array("I", (key_id for key_id, value in enumerate(column) if value is not None))
+        key_orders.append(order)
+        blob, offsets = blob_with_offsets([(value or "").encode() for value in column], position)
+        position += len(blob)
+        value_blobs.append(blob)
+        value_offsets.append(offsets)
+
+    if position > 0xFFFFFFFF:
+        raise ValueError("The language files are too large for a snapshot.")
+
+    # Several processes may build the same snapshot at once, so each writes its
+    # own temporary file and the last complete one wins.
+    fd, temp_name = tempfile.mkstemp(
+        dir=snapshot_path.parent, prefix=f"{snapshot_path.name}.", suffix=".tmp"
+    )
+    temp_path = Path(temp_name)
+    try:
+        with open(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER_MARK, len(lang_list), key_count))
+            for lang_code, digest, stat, order in zip(
+                lang_list, digests, stats, key_orders, strict=True
+            ):
+                f.write(LANGUAGE_ENTRY.pack(lang_code.encode(), digest, *stat, len(order)))
+            f.write(b"\0" * (tables_start - f.tell()))
+            f.write(key_offsets.tobytes())
+            f.write(sorted_ids.tobytes())
+            for offsets in value_offsets:
+                f.write(offsets.tobytes())
+            for order in key_orders:
+                f.write(order.tobytes())
+                f.write(bytes(4 * (key_count - len(order))))
+            f.write(presence)
+            f.write(b"\0" * (key_offsets[0] - f.tell()))
+            f.write(key_blob)
+            for blob in value_blobs:
+                f.write(blob)
+        os.replace(temp_path, snapshot_path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return snapshot_path
+
+
+class SnapshotLanguage(Mapping[str, str]):
+    """A read-only view of one language in a snapshot, usable like its dictionary."""
+
+    __slots__ = ("index", "snapshot")
+
+    def __init__(self, snapshot: "TranslationSnapshot", index: int) -> None:
+        """Initialize the view.
+
+        Args:
+            snapshot (TranslationSnapshot): The snapshot holding the language.
+            index (int): The position of the language in the snapshot.
+
+        """
+        self.snapshot = snapshot
+        self.index = index
+
+    def __getitem__(self, key: str) -> str:
+        """Return the translation of a key."""
+        key_id = self.snapshot.key_id(key)
+        if key_id is None:
+            raise KeyError(key)
+        value = self.snapshot.value(self.index, key_id)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the keys translated in this language, in its file order."""
+        return map(self.snapshot.key, self.snapshot.key_order(self.index))
+
+    def __len__(self) -> int:
+        """Return the number of keys translated in this language."""
+        return self.snapshot.key_counts[self.index]
+
+    def items(self) -> "SnapshotItems":
+        """Return a view of the translated keys and their values."""
+        return SnapshotItems(self)
+
+
+class SnapshotItems(ItemsView[str, str]):
+    """An items view of a snapshot language that walks it without key lookups."""
+
+    _mapping: SnapshotLanguage
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        """Iterate over the translated keys and their values in the language's file order."""
+        snapshot = self._mapping.snapshot
+        index = self._mapping.index
+        for key_id in snapshot.key_order(index):
+            yield snapshot.key(key_id), snapshot.value(index, key_id)
+
+
+class TranslationSnapshot(Mapping[str, SnapshotLanguage]):
+    """A memory-mapped snapshot, usable like a dictionary of language dictionaries."""
+
+    def __init__(self, snapshot_path: Path) -> None:
+        """Open a snapshot.
+
+        Args:
+            snapshot_path (Path): The path of the snapshot.
+
+        Raises:
+            ValueError: If the file is not a valid snapshot for this platform.
+
+        """
+        with open(snapshot_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = buffer = memoryview(self._mmap)
+        try:
+            magic, version, byte_order, lang_count, key_count = HEADER.unpack_from(buffer)
+            if (magic, version, byte_order) != (MAGIC, FORMAT_VERSION, BYTE_ORDER_MARK):
+                raise ValueError("Unknown format or byte order.")
+
+            self.key_count = key_count
+            self.lang_list: list[str] = []
+            self.digests: list[bytes] = []
+            self.stats: list[tuple[int, int]] = []
+            self.key_counts: list[int] = []
+            for i in range(lang_count):
+                code, digest, size, mtime_ns, count = LANGUAGE_ENTRY.unpack_from(
+                    buffer, HEADER.size + i * LANGUAGE_ENTRY.size
+                )
+                self.lang_list.append(code.rstrip(b"\0").decode())
+                self.digests.append(digest)
+                self.stats.append((size, mtime_ns))
+                self.key_counts.append(count)
+
+            position = _align(HEADER.size + LANGUAGE_ENTRY.size * lang_count)
+
+            def take(size: int, fmt: str = "B") -> memoryview:
+                nonlocal position
+                view = buffer[position : position + size * struct.calcsize(fmt)].cast(fmt)
+                position += size * struct.calcsize(fmt)
+                return view
+
+            self.key_offsets = take(key_count + 1, "I")
+            self.sorted_ids = take(key_count, "I")
+            self.value_offsets = [take(key_count + 1, "I") for _ in range(lang_count)]
+            self.key_orders = [take(key_count, "I") for _ in range(lang_count)]
+            self.presence = [take(key_count) for _ in range(lang_count)]
+        except (struct.error, TypeError, ValueError) as e:
+            self.close()
+            raise ValueError(f"'{snapshot_path}' is not a valid snapshot.") from e
+        self._lang_index = {lang_code: i for i, lang_code in enumerate(self.lang_list)}
+
+    def key(self, key_id: int) -> str:
+        """Decode the key with the given ID.
+
+        Args:
+            key_id (int): The key ID.
+
+        Returns:
+            str: The localization key.
+
+        """
+        return self._mmap[self.key_offsets[key_id] : self.key_offsets[key_id + 1]].decode()
+
+    def key_order(self, lang_index: int) -> Iterator[int]:
+        """Iterate over the key IDs of a language in the order of its source file.
+
+        Args:
+            lang_index (int): The position of the language in the snapshot.
+
+        Returns:
+            Iterator[int]: The key IDs.
+
+        """
+        return islice(self.key_orders[lang_index], self.key_counts[lang_index])
+
+    def key_id(self, key: str) -> int | None:
+        """Find the ID of a key by binary search, without decoding other keys.
+
+        Args:
+            key (str): The localization key.
+
+        Returns:
+            int | None: The key ID, or None if the key is not in the snapshot.
+
+        """
+        encoded = key.encode()
+        offsets = self.key_offsets
+        sorted_ids = self.sorted_ids
+        data = self._mmap
+
+        def key_bytes(i: int) -> bytes:
+            key_id = sorted_ids[i]
+            return data[offsets[key_id] : offsets[key_id + 1]]
+
+        i = bisect_left(range(self.key_count), encoded, key=key_bytes)
+        if i < self.key_count and key_bytes(i) == encoded:
+            return sorted_ids[i]
+        return None
+
+    def value(self, lang_index: int, key_id: int) -> str | None:
+        """Decode the value of a key in a language.
+
+        Args:
+            lang_index (int): The position of the language in the snapshot.
+            key_id (int): The key ID.
+
+        Returns:
+            str | None: The translation, or None if the language lacks the key.
+
+        """
+        if not self.presence[lang_index][key_id]:
+            return None
+        offsets = self.value_offsets[lang_index]
+        return self._mmap[offsets[key_id] : offsets[key_id + 1]].decode()
+
+    def row(self, key: str) -> tuple[str | None, ...] | None:
+        """Return the translations of a key in every language.
+
+        Args:
+            key (str): The localization key.
+
+        Returns:
+            tuple[str | None, ...] | None: The translation in each language, in the
+                snapshot's language order, or None if the key is unknown.
+
+        """
+        key_id = self.key_id(key)
+        if key_id is None:
+            return None
+        return tuple(self.value(i, key_id) for i in range(len(self.lang_list)))
+
+    def __getitem__(self, lang_code: str) -> SnapshotLanguage:
+        """Return a view of the translations of a language."""
+        return SnapshotLanguage(self, self._lang_index[lang_code])
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the language codes in the snapshot."""
+        return iter(self.lang_list)
+
+    def __len__(self) -> int:
+        """Return the number of languages in the snapshot."""
+        return len(self.lang_list)
+
+    def __contains__(self, lang_code: object) -> bool:
+        """Check whether a language is in the snapshot."""
+        return lang_code in self._lang_index
+
+    def close(self) -> None:
+        """Release the memory mapping."""
+        for view in (
+            getattr(self, "key_offsets", None),
+            getattr(self, "sorted_ids", None),
+            *getattr(self, "value_offsets", []),
+            *getattr(self, "key_orders", []),
+            *getattr(self, "presence", []),
+            getattr(self, "_buffer", None),
+        ):
+            if view is not None:
+                view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> Self:
+        """Return the snapshot for use in a with statement."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close the snapshot at the end of a with statement."""
+        self.close()
+
+
+def _update_source_stats(snapshot_path: Path, stats: list[tuple[int, int]]) -> None:
+    """Overwrite the recorded size and modification time of each source in place.
+
+    A reader opening the snapshot at the same time at worst sees stats that do
+    not match, and falls back to comparing hashes. A failure to write is
+    ignored for the same reason.
+    """
+    try:
+        with open(snapshot_path, "r+b") as f:
+            for i, stat in enumerate(stats):
+                f.seek(HEADER.size + i * LANGUAGE_ENTRY.size + SOURCE_STAT_OFFSET)
+                f.write(SOURCE_STAT.pack(*stat))
+    except OSError:
+        pass
+
+
+def open_snapshot(
+    lang_list: list[str], lang_dir: Path, snapshot_path: Path | None = None
+) -> TranslationSnapshot | None:
+    """Open a snapshot if it is up to date with the language files.
+
+    Args:
+        lang_list (list[str]): The language codes the snapshot must hold.
+        lang_dir (Path): The directory containing language files.
+        snapshot_path (Path | None): The path of the snapshot. Defaults to
+            `SNAPSHOT_FILE_NAME` inside `lang_dir`.
+
+    Returns:
+        TranslationSnapshot | None: The snapshot, or None if it is missing,
+            invalid, or built from different files.
+
+    """
+    snapshot_path = snapshot_path or lang_dir / SNAPSHOT_FILE_NAME
+    try:
+        snapshot = TranslationSnapshot(snapshot_path)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        stats = source_stats(lang_list, lang_dir)
+        up_to_date = snapshot.lang_list == lang_list and (
+            snapshot.stats == stats or snapshot.digests == source_hashes(lang_list, lang_dir)
+        )
+    except OSError:
+        up_to_date = False
+
+    if not up_to_date:
+        snapshot.close()
+        return None
+    if snapshot.stats != stats:
+        # The files were touched without changing. Recording their new stats
+        # spares the next open from hashing them again.
+        _update_source_stats(snapshot_path, stats)
+        snapshot.stats = stats
+    return snapshot
+
+
+def load_snapshot(lang_list: list[str], lang_dir: Path) -> TranslationSnapshot:
+    """Open the snapshot of a version, building or rebuilding it if needed.
+
+    Args:
+        lang_list (list[str]): The language codes to load.
+        lang_dir (Path): The directory containing language files.
+
+    Returns:
+        TranslationSnapshot: The up-to-date snapshot.
+
+    """
+    snapshot = open_snapshot(lang_list, lang_dir)
+    if snapshot is None:
+        print("Building translation snapshot...\n")
+        snapshot = TranslationSnapshot(build_snapshot(lang_list, lang_dir))
+    return snapshot
+
+
+def main() -> None:
+    """Build the snapshot of the configured version."""
+    lang_dir = get_lang_dir()
+    check_language_files(LANGUAGE_LIST, lang_dir)
+    snapshot_path = build_snapshot(LANGUAGE_LIST, lang_dir)
+    print(f"Snapshot saved to '{snapshot_path}'.")
+
+
+if __name__ == "__main__":
+    main()
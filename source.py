@@ -1,121 +1,233 @@
 """Minecraft language file downloader."""
 
-import hashlib
 import sys
+from collections.abc import Callable
 from pathlib import Path
 from zipfile import ZipFile
 
-import requests as r
+from base import (
+    HTTP_POOL_SIZE,
+    LANGUAGE_LIST,
+    MANIFEST_CACHE_DIR,
+    MAX_CONCURRENT_DOWNLOADS,
+    METRICS_FILE,
+    OBJECTS_DIR,
+    REMOVE_CLIENT_JAR,
+    get_lang_dir,
+    get_version_info,
+    is_legacy_version,
+)
+from downloader import (
+    REQUEST_LOG,
+    RESOURCES_URL,
+    DownloadTask,
+    ObjectStore,
+    RemoteZipError,
+    asset_url,
+    cache_file_name,
+    configure_http,
+    download_files,
+    download_zip_member,
+    fetch_json,
+)
+from metrics import METRICS, write_metrics
+
+# The path of the en_us language file inside client.jar.
+EN_US_JAR_PATH = "assets/minecraft/lang/en_us.json"
+
+# The file in a version's directory recording the SHA1 of the client.jar that
+# en_us.json was extracted from.
+CLIENT_SHA1_FILE_NAME = "client.jar.sha1"
+
+
+def en_us_is_current(lang_dir: Path, client_sha1: str) -> bool:
+    """Check whether en_us.json was already extracted from the given client.jar.
 
-from base import LANG_DIR, LANGUAGE_LIST, REMOVE_CLIENT_JAR, version_info
+    Args:
+        lang_dir (Path): The directory of the version's language files.
+        client_sha1 (str): The SHA1 hash of the version's client.jar.
 
+    Returns:
+        bool: True if en_us.json is present and came from that client.jar.
 
-def get_response(url: str) -> r.Response:
-    """Send a GET request to the specified URL and return the response.
+    """
+    try:
+        recorded = (lang_dir / CLIENT_SHA1_FILE_NAME).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return False
+    return recorded == client_sha1 and (lang_dir / "en_us.json").is_file()
+
+
+def download_version(
+    version_info: dict,
+    lang_dir: Path,
+    lang_list: list[str] = LANGUAGE_LIST,
+    store: ObjectStore | None = None,
+    resources_url: str = RESOURCES_URL,
+    on_file: Callable[[str, Path], object] | None = None,
+    cache_dir: Path = MANIFEST_CACHE_DIR,
+) -> dict[Path, bool] | None:
+    """Download the language files of a version.
 
     Args:
-        url (str): The URL to request.
+        version_info (dict): The manifest entry of the version.
+        lang_dir (Path): The directory to write the language files to.
+        lang_list (list[str]): The languages to download.
+        store (ObjectStore | None): The object store to reuse and fill.
+        resources_url (str): The base URL of the asset server.
+        on_file (Callable[[str, Path], object] | None): Called with the language
+            code and path of each language file as soon as it is in place,
+            possibly from a download thread.
+        cache_dir (Path): The directory to cache client manifests and asset
+            indexes in.
 
     Returns:
-        r.Response: The response object.
+        dict[Path, bool] | None: Whether each queued file was downloaded
+            successfully, or None if the client manifest or asset index could
+            not be fetched.
 
     """
-    try:
-        resp = r.get(url, timeout=60)
-        resp.raise_for_status()
-        return resp
-    except r.exceptions.RequestException as e:
-        print(f"An error occurred during the request: {e}")
-        sys.exit()
+    lang_dir.mkdir(parents=True, exist_ok=True)
+
+    # Fetch client manifest
+    client_manifest_url = version_info["url"]
+    client_manifest_sha1 = version_info.get("sha1")
+    client_filename = client_manifest_url.rsplit("/", 1)[-1]
+    print(f"Fetching client manifest '{client_filename}'...")
+    client_manifest = fetch_json(
+        client_manifest_url,
+        cache_dir / "versions" / cache_file_name(client_manifest_url, client_manifest_sha1),
+        expected_sha1=client_manifest_sha1,
+    )
+    if client_manifest is None:
+        return None
+
+    # Fetch asset index
+    asset_index_url = client_manifest["assetIndex"]["url"]
+    asset_index_sha1 = client_manifest["assetIndex"].get("sha1")
+    asset_index_filename = asset_index_url.rsplit("/", 1)[-1]
+    print(f"Fetching asset index '{asset_index_filename}'...\n")
+    asset_index_json = fetch_json(
+        asset_index_url,
+        cache_dir / "indexes" / cache_file_name(asset_index_url, asset_index_sha1),
+        expected_sha1=asset_index_sha1,
+    )
+    if asset_index_json is None:
+        return None
+    asset_index = asset_index_json["objects"]
+
+    # Read en_us.json straight out of the remote client.jar if the archive is not
+    # kept anyway, and fall back to downloading the whole archive. Neither is
+    # needed if en_us.json was already extracted from the same archive.
+    client_url = client_manifest["downloads"]["client"]["url"]
+    client_sha1 = client_manifest["downloads"]["client"]["sha1"]
+    client_path = lang_dir / "client.jar"
+    en_us_path = lang_dir / "en_us.json"
+    download_tasks = []
+    need_client = not REMOVE_CLIENT_JAR
+    if REMOVE_CLIENT_JAR and en_us_is_current(lang_dir, client_sha1):
+        print("'en_us.json' is already up to date.\n")
+        if on_file is not None:
+            on_file("en_us", en_us_path)
+    elif REMOVE_CLIENT_JAR:
+        print("Reading 'en_us.json' from the remote client.jar...")
+        try:
+            with METRICS.span("stage", stage="remote_extract"):
+                extracted = download_zip_member(client_url, [(EN_US_JAR_PATH, en_us_path)])
+            if extracted:
+                print("Extracted 'en_us.json' without downloading client.jar.\n")
+                (lang_dir / CLIENT_SHA1_FILE_NAME).write_text(client_sha1, encoding="utf-8")
+                if on_file is not None:
+                    on_file("en_us", en_us_path)
+            else:
+                print("'en_us.json' was not found in client.jar.\n")
+        except RemoteZipError as e:
+            print(f"{e} Falling back to downloading client.jar.\n")
+            need_client = True
+
+    # Queue client.jar and the other specified language files for download. A
+    # client.jar kept from an earlier run is verified instead of downloaded again.
+    if need_client:
+        print(f"Queueing client archive 'client.jar' ({client_sha1})...")
+        # The client archive is usually removed after extraction, so it is not kept in the store.
+        download_tasks.append(
+            DownloadTask(client_url, "client.jar", client_path, client_sha1, shared=False)
+        )
 
+    lang_codes = {}
+    for lang_code in lang_list:
+        if lang_code == "en_us":
+            continue
+
+        lang_filename = f"{lang_code}.json"
+        lang_asset_key = f"minecraft/lang/{lang_filename}"
+        lang_asset = asset_index.get(lang_asset_key)
+
+        if lang_asset:
+            file_hash = lang_asset["hash"]
+            print(f"Queueing language file '{lang_filename}' ({file_hash})...")
+            download_tasks.append(
+                DownloadTask(
+                    asset_url(file_hash, resources_url),
+                    lang_filename,
+                    lang_dir / lang_filename,
+                    file_hash,
+                )
+            )
+            lang_codes[lang_dir / lang_filename] = lang_code
+        else:
+            print(f"Language file '{lang_filename}' not found in asset index.")
+
+    def file_done(task: DownloadTask, ok: bool) -> None:
+        if ok and on_file is not None and task.file_path in lang_codes:
+            on_file(lang_codes[task.file_path], task.file_path)
+
+    print(f"\nDownloading {len(download_tasks)} files ({MAX_CONCURRENT_DOWNLOADS} at a time)...\n")
+    with METRICS.span("stage", stage="download"):
+        results = download_files(
+            download_tasks, MAX_CONCURRENT_DOWNLOADS, store or ObjectStore(OBJECTS_DIR), file_done
+        )
 
-def download_file(url: str, file_name: str, file_path: Path, expected_sha1: str) -> None:
-    """Download a file, verify its SHA1 checksum, and retry on failure.
+    # Extract en_us.json from client.jar
+    if client_path.exists():
+        with METRICS.span("stage", stage="jar_extract"), ZipFile(client_path) as client_zip:
+            print("Extracting 'en_us.json' from client.jar...")
+            with (
+                client_zip.open(EN_US_JAR_PATH) as source,
+                open(en_us_path, "wb") as target,
+            ):
+                target.write(source.read())
+        (lang_dir / CLIENT_SHA1_FILE_NAME).write_text(client_sha1, encoding="utf-8")
+        if on_file is not None:
+            on_file("en_us", en_us_path)
+
+    # Clean up client.jar if configured
+    if REMOVE_CLIENT_JAR and client_path.exists():
+        print("Removing client.jar...\n")
+        client_path.unlink()
+
+    return results
+
+
+def main() -> None:
+    """Download the language files of the configured version."""
+    configure_http(HTTP_POOL_SIZE)
+    version_info = get_version_info()
+    if is_legacy_version(version_info):
+        print("Selected version uses the legacy .lang format for language files.")
+        print("Please download it with download_legacy.py, or choose version 18w02a or newer.")
+        sys.exit()
+    # The metrics are written even if the download fails or is interrupted.
+    try:
+        if download_version(version_info, get_lang_dir()) is None:
+            sys.exit()
 
-    Args:
-        url (str): The URL to download from.
-        file_name (str): The name of the file for logging purposes.
-        file_path (Path): The path to save the file.
-        expected_sha1 (str): The expected SHA1 hash of the file.
+        print("Download process completed.\n")
+        print("HTTP requests by host:")
+        REQUEST_LOG.print_summary()
+    finally:
+        write_metrics(METRICS_FILE, "source")
 
-    """
-    for attempt in range(3):
-        with open(file_path, "wb") as f:
-            f.write(get_response(url).content)
-
-        with open(file_path, "rb") as f:
-            actual_sha1 = hashlib.file_digest(f, "sha1").hexdigest()
-
-        if actual_sha1 == expected_sha1:
-            size_in_bytes = file_path.stat().st_size
-            size_mb = round(size_in_bytes / 1048576, 2)
-            size_kb = round(size_in_bytes / 1024, 2)
-            size_str = f"{size_mb} MB" if size_in_bytes > 1048576 else f"{size_kb} KB"
-            print(f"SHA1 checksum consistent. File size: {size_in_bytes} B ({size_str})\n")
-            return
-
-        print(f"SHA1 checksum mismatch for {file_name}. Retrying (Attempt {attempt + 2}/3).\n")
-    else:
-        print(f"Failed to download '{file_name}' correctly after 3 attempts.\n")
-        file_path.unlink()  # Clean up failed download
-
-
-LANG_DIR.mkdir(exist_ok=True)
-
-# Fetch client manifest
-client_manifest_url = version_info["url"]
-client_filename = client_manifest_url.rsplit("/", 1)[-1]
-print(f"Fetching client manifest '{client_filename}'...")
-client_manifest = get_response(client_manifest_url).json()
-
-# Fetch asset index
-asset_index_url = client_manifest["assetIndex"]["url"]
-asset_index_filename = asset_index_url.rsplit("/", 1)[-1]
-print(f"Fetching asset index '{asset_index_filename}'...\n")
-asset_index = get_response(asset_index_url).json()["objects"]
-
-# Download client.jar
-client_url = client_manifest["downloads"]["client"]["url"]
-client_sha1 = client_manifest["downloads"]["client"]["sha1"]
-client_path = LANG_DIR / "client.jar"
-print(f"Downloading client archive 'client.jar' ({client_sha1})...")
-download_file(client_url, "client.jar", client_path, client_sha1)
-
-# Extract en_us.json from client.jar
-if client_path.exists():
-    with ZipFile(client_path) as client_zip:
-        print("Extracting 'en_us.json' from client.jar...")
-        with (
-            client_zip.open("assets/minecraft/lang/en_us.json") as source,
-            open(LANG_DIR / "en_us.json", "wb") as target,
-        ):
-            target.write(source.read())
-
-# Clean up client.jar if configured
-if REMOVE_CLIENT_JAR and client_path.exists():
-    print("Removing client.jar...\n")
-    client_path.unlink()
-
-# Download other specified language files
-if "en_us" in LANGUAGE_LIST:
-    LANGUAGE_LIST.remove("en_us")
-
-for lang_code in LANGUAGE_LIST:
-    lang_filename = f"{lang_code}.json"
-    lang_asset_key = f"minecraft/lang/{lang_filename}"
-    lang_asset = asset_index.get(lang_asset_key)
-
-    if lang_asset:
-        file_hash = lang_asset["hash"]
-        print(f"Downloading language file '{lang_filename}' ({file_hash})...")
-        download_url = f"https://resources.download.minecraft.net/{file_hash[:2]}/{file_hash}"
-        download_file(
-            download_url,
-            lang_filename,
-            LANG_DIR / lang_filename,
-            file_hash,
-        )
-    else:
-        print(f"Language file '{lang_filename}' not found in asset index.\n")
 
-print("Download process completed.")
+if __name__ == "__main__":
+    main()
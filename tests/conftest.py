@@ -0,0 +1,62 @@
+"""Fixtures shared by the tests."""
+
+import json
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pytest
+
+from fake_mojang import FakeMojangServer
+
+# The translations of a small version, by language.
+TRANSLATIONS = {
+    "en_us": {"block.minecraft.stone": "Stone", "item.minecraft.stick": "Stick"},
+    "zh_cn": {"block.minecraft.stone": "石头", "item.minecraft.stick": "木棍"},
+    "ja_jp": {"block.minecraft.stone": "石", "item.minecraft.stick": "棒"},
+}
+
+
+@pytest.fixture
+def server() -> Iterator[FakeMojangServer]:
+    """Serve an empty fake Mojang server without latency."""
+    server = FakeMojangServer(latency=0)
+    server.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def write_version(tmp_path: Path) -> Callable[[str, dict[str, dict[str, str]]], Path]:
+    """Return a function writing the JSON language files of a version."""
+
+    def write(name: str, translations: dict[str, dict[str, str]]) -> Path:
+        lang_dir = tmp_path / "source" / name
+        lang_dir.mkdir(parents=True)
+        for lang_code, data in translations.items():
+            with open(lang_dir / f"{lang_code}.json", "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        return lang_dir
+
+    return write
+
+
+@pytest.fixture
+def translations() -> dict[str, dict[str, str]]:
+    """Return a copy of the translations of the small version, free to change."""
+    return {lang_code: dict(data) for lang_code, data in TRANSLATIONS.items()}
+
+
+@pytest.fixture
+def lang_dir(
+    write_version: Callable[[str, dict[str, dict[str, str]]], Path],
+    translations: dict[str, dict[str, str]],
+) -> Path:
+    """Write the language files of the small version."""
+    return write_version("small", translations)
+
+
+@pytest.fixture
+def lang_list(translations: dict[str, dict[str, str]]) -> list[str]:
+    """Return the languages of the small version."""
+    return list(translations)
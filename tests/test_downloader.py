@@ -0,0 +1,111 @@
+"""Tests for resumed downloads and remote zip reads against the fake server."""
+
+import hashlib
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from downloader import RemoteZipError, download_file, download_zip_member
+from fake_mojang import FakeMojangServer
+
+# The body of the downloaded file, larger than one streamed chunk.
+BODY = bytes(range(256)) * 1024
+
+
+def test_download_resumes_partial_file(
+    server: FakeMojangServer, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    url = server.add("/file.bin", BODY)
+    file_path = tmp_path / "file.bin"
+    file_path.with_name("file.bin.part").write_bytes(BODY[:100000])
+
+    assert download_file(url, "file.bin", file_path, hashlib.sha1(BODY).hexdigest())
+
+    assert file_path.read_bytes() == BODY
+    assert not file_path.with_name("file.bin.part").exists()
+    assert "Resuming 'file.bin'" in capsys.readouterr().out
+
+
+def test_download_checks_complete_partial_file_on_416(
+    server: FakeMojangServer, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    url = server.add("/file.bin", BODY)
+    file_path = tmp_path / "file.bin"
+    file_path.with_name("file.bin.part").write_bytes(BODY)
+
+    assert download_file(url, "file.bin", file_path, hashlib.sha1(BODY).hexdigest())
+
+    assert file_path.read_bytes() == BODY
+    assert "Resuming" not in capsys.readouterr().out
+
+
+def test_download_restarts_corrupt_partial_file_after_416(
+    server: FakeMojangServer, tmp_path: Path
+) -> None:
+    url = server.add("/file.bin", BODY)
+    file_path = tmp_path / "file.bin"
+    file_path.with_name("file.bin.part").write_bytes(bytes(len(BODY)))
+
+    assert download_file(url, "file.bin", file_path, hashlib.sha1(BODY).hexdigest())
+
+    assert file_path.read_bytes() == BODY
+
+
+def test_download_fails_on_checksum_mismatch(server: FakeMojangServer, tmp_path: Path) -> None:
+    url = server.add("/file.bin", BODY)
+    file_path = tmp_path / "file.bin"
+
+    assert not download_file(url, "file.bin", file_path, "0" * 40, attempts=1)
+
+    assert not file_path.exists()
+    assert not file_path.with_name("file.bin.part").exists()
+
+
+def corrupt_archive(member_data: bytes, compression: int) -> bytes:
+    """Build a zip archive and overwrite the middle of its only member's data.
+
+    Args:
+        member_data (bytes): The content of the member.
+        compression (int): The compression method of the member.
+
+    Returns:
+        bytes: The archive, whose member fails its CRC-32 check if stored, or
+            cannot be decompressed if deflated.
+
+    """
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", compression) as zip_file:
+        zip_file.writestr("en_us.json", member_data)
+        info = zip_file.getinfo("en_us.json")
+    data = bytearray(archive.getvalue())
+    start = info.header_offset + 30 + len(info.orig_filename.encode())
+    middle = start + info.compress_size // 2
+    data[middle : middle + 8] = b"\xff" * 8
+    return bytes(data)
+
+
+def test_zip_member_is_read_with_ranges(server: FakeMojangServer, tmp_path: Path) -> None:
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("other.bin", bytes(100000))
+        zip_file.writestr("en_us.json", BODY)
+    url = server.add("/client.jar", archive.getvalue())
+
+    member = download_zip_member(url, [("en_us.json", tmp_path / "en_us.json")])
+
+    assert member == "en_us.json"
+    assert (tmp_path / "en_us.json").read_bytes() == BODY
+
+
+@pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_corrupt_zip_member_raises(
+    server: FakeMojangServer, tmp_path: Path, compression: int
+) -> None:
+    url = server.add("/client.jar", corrupt_archive(BODY, compression))
+
+    with pytest.raises(RemoteZipError):
+        download_zip_member(url, [("en_us.json", tmp_path / "en_us.json")])
+
+    assert not (tmp_path / "en_us.json").exists()
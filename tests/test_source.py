@@ -0,0 +1,78 @@
+"""Tests for downloading a version's language files from the fake server."""
+
+import hashlib
+import json
+from pathlib import Path
+
+import pytest
+
+import source
+from downloader import ObjectStore, download_zip_member
+from fake_mojang import FakeMojangServer
+from source import CLIENT_SHA1_FILE_NAME, download_version
+
+
+def test_download_version(
+    server: FakeMojangServer, lang_dir: Path, lang_list: list[str], tmp_path: Path
+) -> None:
+    server.add_release("25w01a", lang_dir, lang_list)
+    version_dir = tmp_path / "versions" / "25w01a"
+    handled = {}
+
+    results = download_version(
+        server.versions[0],
+        version_dir,
+        lang_list,
+        ObjectStore(tmp_path / "objects"),
+        server.url("/objects"),
+        lambda lang_code, lang_file: handled.setdefault(lang_code, lang_file),
+        tmp_path / "versions" / "manifests",
+    )
+
+    assert results is not None and all(results.values())
+    assert sorted(handled) == sorted(lang_list)
+    for lang_code in lang_list:
+        assert json.loads((version_dir / f"{lang_code}.json").read_bytes()) == json.loads(
+            (lang_dir / f"{lang_code}.json").read_bytes()
+        )
+    assert not (version_dir / "client.jar").exists()
+
+
+def test_corrupt_remote_member_falls_back_to_client_jar(
+    server: FakeMojangServer,
+    lang_dir: Path,
+    lang_list: list[str],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    server.add_release("25w01a", lang_dir, lang_list)
+    jar_url = server.url("/clients/25w01a.jar")
+    jar = bytearray(server.files["/clients/25w01a.jar"])
+    # The members are stored uncompressed, so the text is found as is.
+    member_offset = jar.index(b"Stone")
+    jar[member_offset : member_offset + 5] = b"Stane"
+    corrupt_url = server.add("/clients/corrupt.jar", bytes(jar))
+    # Range reads see the corrupt copy, and the full download the original.
+    monkeypatch.setattr(
+        source,
+        "download_zip_member",
+        lambda url, members: download_zip_member(corrupt_url if url == jar_url else url, members),
+    )
+    version_dir = tmp_path / "versions" / "25w01a"
+
+    results = download_version(
+        server.versions[0],
+        version_dir,
+        lang_list,
+        ObjectStore(tmp_path / "objects"),
+        server.url("/objects"),
+        cache_dir=tmp_path / "versions" / "manifests",
+    )
+
+    assert results is not None and all(results.values())
+    assert version_dir / "client.jar" in results
+    assert "Falling back to downloading client.jar" in capsys.readouterr().out
+    assert (version_dir / "en_us.json").read_bytes() == (lang_dir / "en_us.json").read_bytes()
+    client_sha1 = hashlib.sha1(server.files["/clients/25w01a.jar"]).hexdigest()
+    assert (version_dir / CLIENT_SHA1_FILE_NAME).read_text(encoding="utf-8") == client_sha1
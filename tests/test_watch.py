@@ -0,0 +1,54 @@
+"""Tests for polling the fake server's version manifest."""
+
+from collections.abc import Callable
+from pathlib import Path
+
+from downloader import ObjectStore
+from fake_mojang import FakeMojangServer
+from watch import CHANGELOG_FILE_NAME, poll, read_state
+
+
+def test_poll_processes_new_versions(
+    server: FakeMojangServer,
+    lang_dir: Path,
+    lang_list: list[str],
+    tmp_path: Path,
+    translations: dict[str, dict[str, str]],
+    write_version: Callable[[str, dict[str, dict[str, str]]], Path],
+) -> None:
+    versions_dir = tmp_path / "versions"
+    output_root = tmp_path / "output"
+    state_path = versions_dir / "watch_state.json"
+    store = ObjectStore(tmp_path / "objects")
+
+    def poll_once() -> int:
+        return poll(
+            server.url("/version_manifest_v2.json"),
+            ["snapshot"],
+            lang_list,
+            store,
+            server.url("/objects"),
+            1,
+            versions_dir,
+            output_root,
+            state_path,
+        )
+
+    server.add_release("25w01a", lang_dir, lang_list)
+    assert poll_once() == 1
+    assert read_state(state_path) == {"snapshot": "25w01a"}
+    for lang_code in lang_list:
+        lines = (output_root / "25w01a" / f"{lang_code}.txt").read_text(encoding="utf-8")
+        assert lines.splitlines() == list(translations[lang_code].values())
+    assert not (output_root / "25w01a" / CHANGELOG_FILE_NAME).exists()
+
+    assert poll_once() == 0
+
+    translations["zh_cn"]["block.minecraft.stone"] = "石块"
+    server.add_release("25w02a", write_version("25w02a", translations), lang_list)
+    assert poll_once() == 1
+    assert read_state(state_path) == {"snapshot": "25w02a"}
+    changelog = (output_root / "25w02a" / CHANGELOG_FILE_NAME).read_text(encoding="utf-8")
+    assert "## zh_cn" in changelog
+    assert "石块" in changelog
+    assert "## ja_jp" not in changelog
@@ -0,0 +1,332 @@
+"""Watcher that downloads and extracts new Minecraft versions as they are published.
+
+Polls the version manifest on an interval. The cached copy is revalidated with
+a conditional request, so a poll with no new version costs a 304 response. When
+the latest snapshot or release changes, the new version is downloaded and
+extracted as one job: each language file is handed to a worker process as soon
+as it is in place, while the others are still downloading. Language files
+already in the object store are reused without a request.
+
+Each new version is compared with the previously processed version of its
+channel, and the changes are written to a Markdown changelog in its output
+directory. Only one language is held in memory at a time, and nothing is kept
+between versions, so the watcher can run unattended.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from base import (
+    HTTP_POOL_SIZE,
+    LANGUAGE_LIST,
+    MANIFEST_CACHE_DIR,
+    METRICS_FILE,
+    OBJECTS_DIR,
+    OUTPUT_DIR,
+    VERSIONS_DIR,
+    is_legacy_version,
+)
+from changelog import diff_version_dirs, filter_delta, write_markdown_changelog
+from downloader import (
+    RESOURCES_URL,
+    VERSION_MANIFEST_URL,
+    ObjectStore,
+    cache_file_name,
+    configure_http,
+    fetch_json,
+)
+from extract import (
+    MANIFEST_FILE_NAME,
+    bulk_manifest,
+    extract_language,
+    fingerprint_inputs,
+    write_text_atomic,
+)
+from metrics import METRICS, write_metrics
+from source import download_version
+
+# The channels of the version manifest that can be watched.
+CHANNELS = ("snapshot", "release")
+
+# The default number of seconds between polls.
+DEFAULT_INTERVAL = 300
+
+# The file recording the last processed version of each channel.
+WATCH_STATE_PATH = VERSIONS_DIR / "watch_state.json"
+
+# The file in a version's output directory listing its changes.
+CHANGELOG_FILE_NAME = "changelog.md"
+
+
+def read_state(state_path: Path) -> dict[str, str]:
+    """Read the last processed version of each channel.
+
+    Args:
+        state_path (Path): The state file.
+
+    Returns:
+        dict[str, str]: The version ID of each channel, empty if nothing was
+            processed yet or the file is unreadable.
+
+    """
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def new_versions(manifest: dict, state: dict[str, str], channels: list[str]) -> list[dict]:
+    """Find the latest versions of the watched channels that were not processed yet.
+
+    Args:
+        manifest (dict): The version manifest.
+        state (dict[str, str]): The last processed version of each channel.
+        channels (list[str]): The watched channels.
+
+    Returns:
+        list[dict]: The manifest entries of the new versions, each listed once
+            even if it is the latest of several channels.
+
+    """
+    entries = {version["id"]: version for version in manifest["versions"]}
+    found = {}
+    for channel in channels:
+        version_id = manifest["latest"].get(channel)
+        if version_id in entries and state.get(channel) != version_id:
+            found[version_id] = entries[version_id]
+    return list(found.values())
+
+
+def process_version(
+    version_info: dict,
+    previous_id: str | None,
+    lang_list: list[str],
+    store: ObjectStore,
+    resources_url: str,
+    workers: int,
+    versions_dir: Path = VERSIONS_DIR,
+    output_root: Path = OUTPUT_DIR,
+) -> bool:
+    """Download and extract a version, and write its changelog.
+
+    The output has the same layout as `extract.py --all-versions`, manifest
+    included, so a later bulk extraction treats the version as up to date.
+
+    Args:
+        version_info (dict): The manifest entry of the version.
+        previous_id (str | None): The version to compare with, if any.
+        lang_list (list[str]): The languages to process.
+        store (ObjectStore): The object store to reuse and fill.
+        resources_url (str): The base URL of the asset server.
+        workers (int): The number of extraction processes.
+        versions_dir (Path): The directory to download versions to.
+        output_root (Path): The directory to write each version's output to.
+
+    Returns:
+        bool: True if every language file was downloaded and extracted.
+
+    """
+    version_id = version_info["id"]
+    lang_dir = versions_dir / version_id
+    output_dir = output_root / version_id
+    start = time.perf_counter()
+    futures: dict[str, Future] = {}
+    # Workers start while downloads are running, and forking a process with
+    # running threads is unsafe, so they are spawned instead.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+
+        def extract_file(lang_code: str, lang_file: Path) -> None:
+            futures[lang_code] = executor.submit(
+                extract_language, lang_file, lang_code, output_dir, lang_code == "en_us"
+            )
+
+        results = download_version(
+            version_info,
+            lang_dir,
+            lang_list,
+            store,
+            resources_url,
+            extract_file,
+            versions_dir / MANIFEST_CACHE_DIR.name,
+        )
+        complete = results is not None and all(results.values())
+        key_count = 0
+        for lang_code, future in futures.items():
+            try:
+                key_count += future.result()[0]
+            except (OSError, ValueError) as e:
+                print(f"Failed to extract {lang_code} of {version_id}: {e}")
+                complete = False
+    elapsed = time.perf_counter() - start
+    METRICS.observe("stage", elapsed, stage="process_version")
+    if not complete:
+        print(f"Could not process {version_id}. It is retried on the next poll.")
+        return False
+
+    extracted = [lang_code for lang_code in lang_list if lang_code in futures]
+    inputs = fingerprint_inputs(extracted, lang_dir, {})
+    output_dir.mkdir(parents=True, exist_ok=True)
+    write_text_atomic(
+        output_dir / MANIFEST_FILE_NAME, json.dumps(bulk_manifest(inputs), indent=2) + "\n"
+    )
+    print(
+        f"Processed {version_id}: {key_count} keys in {len(extracted)} languages "
+        f"in {elapsed:.2f} s."
+    )
+
+    previous_dir = versions_dir / previous_id if previous_id else None
+    if previous_dir is None or not previous_dir.is_dir():
+        print("No previous version to compare with.")
+        return True
+    changes = (
+        (lang_code, filter_delta(delta))
+        for lang_code, delta in diff_version_dirs(previous_dir, lang_dir, lang_list)
+    )
+    with open(output_dir / CHANGELOG_FILE_NAME, "w", encoding="utf-8") as f:
+        counts = write_markdown_changelog(f, previous_id, version_id, changes)
+    details = ", ".join(f"{lang_code} {count}" for lang_code, count in counts.items())
+    print(
+        f"Changes from {previous_id} to {version_id}: {sum(counts.values())} in "
+        f"{len(counts)} of {len(lang_list)} languages" + (f" ({details})." if details else ".")
+    )
+    return True
+
+
+def poll(
+    manifest_url: str,
+    channels: list[str],
+    lang_list: list[str],
+    store: ObjectStore,
+    resources_url: str,
+    workers: int,
+    versions_dir: Path = VERSIONS_DIR,
+    output_root: Path = OUTPUT_DIR,
+    state_path: Path = WATCH_STATE_PATH,
+) -> int:
+    """Check the version manifest once and process every new version.
+
+    Args:
+        manifest_url (str): The URL of the version manifest.
+        channels (list[str]): The watched channels.
+        lang_list (list[str]): The languages to process.
+        store (ObjectStore): The object store to reuse and fill.
+        resources_url (str): The base URL of the asset server.
+        workers (int): The number of extraction processes.
+        versions_dir (Path): The directory to download versions to.
+        output_root (Path): The directory to write each version's output to.
+        state_path (Path): The file recording the last processed versions.
+
+    Returns:
+        int: The number of versions processed.
+
+    """
+    # The copy is named after the URL, so a manifest from another server never
+    # replaces the one the other scripts use. A zero age revalidates it on every poll.
+    manifest = fetch_json(
+        manifest_url,
+        versions_dir / MANIFEST_CACHE_DIR.name / cache_file_name(manifest_url),
+        max_age=0,
+    )
+    if manifest is None:
+        return 0
+    state = read_state(state_path)
+    processed = 0
+    for version_info in new_versions(manifest, state, channels):
+        version_id = version_info["id"]
+        version_channels = [c for c in channels if manifest["latest"].get(c) == version_id]
+        print(f"New {' and '.join(version_channels)}: {version_id}")
+        if is_legacy_version(version_info):
+            print(f"{version_id} uses the legacy .lang format. Skipping.")
+        else:
+            previous_id = next((state[c] for c in version_channels if state.get(c)), None)
+            if not process_version(
+                version_info,
+                previous_id,
+                lang_list,
+                store,
+                resources_url,
+                workers,
+                versions_dir,
+                output_root,
+            ):
+                continue
+            processed += 1
+        state.update(dict.fromkeys(version_channels, version_id))
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        write_text_atomic(state_path, json.dumps(state, indent=2) + "\n")
+    return processed
+
+
+def main() -> None:
+    """Poll the version manifest and process new versions until interrupted."""
+    parser = argparse.ArgumentParser(description="Download and extract new versions.")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL,
+        help="Seconds between polls of the version manifest.",
+    )
+    parser.add_argument("--once", action="store_true", help="Poll once and exit.")
+    parser.add_argument(
+        "--channel",
+        nargs="+",
+        choices=CHANNELS,
+        default=list(CHANNELS),
+        help="The channels to watch.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="The number of extraction processes (default: the number of cores).",
+    )
+    parser.add_argument(
+        "--manifest-url", default=VERSION_MANIFEST_URL, help="The URL of the version manifest."
+    )
+    parser.add_argument(
+        "--resources-url", default=RESOURCES_URL, help="The base URL of the asset server."
+    )
+    args = parser.parse_args()
+
+    configure_http(HTTP_POOL_SIZE)
+    store = ObjectStore(OBJECTS_DIR)
+    print(f"Watching the latest {' and '.join(args.channel)} (Ctrl+C to stop)...")
+    try:
+        while True:
+            METRICS.count("polls")
+            try:
+                poll(
+                    args.manifest_url,
+                    args.channel,
+                    LANGUAGE_LIST,
+                    store,
+                    args.resources_url,
+                    args.jobs,
+                )
+            except (OSError, KeyError, ValueError, RuntimeError) as e:
+                # A malformed manifest, a full disk or a crashed worker process
+                # must not end an unattended run.
+                print(f"Poll failed: {e}")
+                METRICS.count("poll_failures")
+            # Every poll is recorded, idle and failed ones included, so a
+            # monitor can tell a quiet watcher from a stuck one.
+            write_metrics(METRICS_FILE, "watch", interval=True)
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\nStopping watcher.")
+        sys.exit()
+
+
+if __name__ == "__main__":
+    main()